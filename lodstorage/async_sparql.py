@@ -0,0 +1,206 @@
+"""
+async_sparql.py
+
+asyncio counterpart of lodstorage.sparql.SPARQL running many queries
+concurrently against one endpoint under a shared rate budget
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import asyncio
+import time
+from typing import Dict, List, Optional, Sequence
+
+from lodstorage.params import Params
+from lodstorage.sparql import SPARQL
+
+
+class AsyncTokenBucket:
+    """
+    token bucket rate limiter that awaits instead of blocking the thread
+    """
+
+    def __init__(self, calls_per_minute: int, burst: Optional[int] = None):
+        """
+        constructor
+
+        Args:
+            calls_per_minute (int): the sustained number of calls per minute
+            burst (int): the maximum number of calls that may be made at once - default: 1
+        """
+        self.rate = calls_per_minute / 60.0
+        self.capacity = float(burst or 1)
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.waited = 0.0
+        self.lock = None
+        self.loop = None
+
+    def get_lock(self) -> asyncio.Lock:
+        """
+        get the lock serializing the waiters - bound to the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        if self.lock is None or self.loop is not loop:
+            self.lock = asyncio.Lock()
+            self.loop = loop
+        return self.lock
+
+    def refill(self):
+        """
+        add the tokens accumulated since the last refill
+        """
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.last_refill) * self.rate
+        )
+        self.last_refill = now
+
+    async def acquire(self):
+        """
+        wait until a token is available and take it
+        """
+        # the lock serializes the waiters so that tokens are handed out in order
+        async with self.get_lock():
+            self.refill()
+            if self.tokens < 1.0:
+                delay = (1.0 - self.tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
+                self.refill()
+            self.tokens -= 1.0
+
+
+class AsyncSPARQL:
+    """
+    asynchronous SPARQL client - the blocking SPARQLWrapper calls run in
+    worker threads while the calls_per_minute budget of the endpoint is
+    enforced by an AsyncTokenBucket
+    """
+
+    def __init__(
+        self,
+        url: str,
+        calls_per_minute: int = None,
+        max_concurrency: int = 8,
+        burst: int = None,
+        method: str = "POST",
+        debug: bool = False,
+    ):
+        """
+        constructor
+
+        Args:
+            url (str): the url of the SPARQL endpoint
+            calls_per_minute (int): the rate budget of the endpoint - default 60
+            max_concurrency (int): the maximum number of queries in flight
+            burst (int): the number of calls that may be made at once
+            method (str): the HTTP method to be used 'POST' or 'GET'
+            debug (bool): True if debugging is to be activated
+        """
+        calls_per_minute = calls_per_minute or 60
+        self.sparql = SPARQL(
+            url, debug=debug, method=method, calls_per_minute=calls_per_minute
+        )
+        self.token_bucket = AsyncTokenBucket(calls_per_minute, burst=burst)
+        self.max_concurrency = max_concurrency
+        self.semaphore = None
+        self.loop = None
+
+    @classmethod
+    def fromEndpointConf(cls, endpointConf, max_concurrency: int = 8) -> "AsyncSPARQL":
+        """
+        create an AsyncSPARQL client from the given endpoint configuration
+
+        Args:
+            endpointConf (Endpoint): the endpoint configuration to be used
+            max_concurrency (int): the maximum number of queries in flight
+        """
+        if not endpointConf:
+            raise ValueError("endpointConf must be specified")
+        async_sparql = cls(
+            url=endpointConf.endpoint,
+            calls_per_minute=endpointConf.calls_per_minute,
+            max_concurrency=max_concurrency,
+            method=endpointConf.method,
+        )
+        return async_sparql
+
+    def get_semaphore(self) -> asyncio.Semaphore:
+        """
+        get the semaphore limiting the queries in flight - created lazily
+        to be bound to the running event loop
+        """
+        loop = asyncio.get_running_loop()
+        if self.semaphore is None or self.loop is not loop:
+            self.semaphore = asyncio.Semaphore(self.max_concurrency)
+            self.loop = loop
+        return self.semaphore
+
+    def query_bindings(self, query: str) -> list:
+        """
+        blocking query running in a worker thread
+
+        Args:
+            query (str): the SPARQL query
+
+        Returns:
+            list: the bindings
+        """
+        query_result = self.sparql.rawQueryThreadSafe(
+            query, method=self.sparql.method, rateLimited=False
+        )
+        bindings = self.sparql.getBindings(query_result)
+        return bindings
+
+    async def query_as_lod(
+        self,
+        query: str,
+        fixNone: bool = False,
+        sampleCount: int = None,
+        param_dict: Dict = None,
+    ) -> List[dict]:
+        """
+        get a list of dicts for the given query
+
+        Args:
+            query (str): the SPARQL query to execute
+            fixNone (bool): if True add None values for empty columns in Dict
+            sampleCount (int): the number of samples to check
+            param_dict (dict): dictionary of parameter names and values to be applied to the query
+
+        Returns:
+            list: a list of Dicts
+        """
+        params = Params(query)
+        query = params.apply_parameters_with_check(param_dict)
+        async with self.get_semaphore():
+            await self.token_bucket.acquire()
+            bindings = await asyncio.to_thread(self.query_bindings, query)
+        lod = self.sparql.asListOfDicts(
+            bindings, fixNone=fixNone, sampleCount=sampleCount
+        )
+        return lod
+
+    async def gather(
+        self,
+        queries: Sequence[str],
+        fixNone: bool = False,
+        return_exceptions: bool = False,
+    ) -> List:
+        """
+        run the given queries concurrently
+
+        Args:
+            queries (list): the SPARQL queries to execute
+            fixNone (bool): if True add None values for empty columns in Dict
+            return_exceptions (bool): if True failed queries return their exception instead of raising it
+
+        Returns:
+            list: the list of dicts per query in the order of the queries
+        """
+        tasks = [self.query_as_lod(query, fixNone=fixNone) for query in queries]
+        results = await asyncio.gather(*tasks, return_exceptions=return_exceptions)
+        return results
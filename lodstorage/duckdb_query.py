@@ -9,11 +9,14 @@ Created on 2026-02-21
 """
 
 import logging
-from typing import Any, Generator
+import time
+from typing import Any, Generator, Optional, Union
 
 import duckdb
 
 from lodstorage.query import Endpoint
+from lodstorage.query_log import QueryLog
+from lodstorage.row_format import RowFactory, RowFormat
 
 
 class DuckDBQuery:
@@ -23,6 +26,7 @@ class DuckDBQuery:
     Attributes:
         path (str): path to the DuckDB database file, or ':memory:'.
         debug (bool): flag to enable debugging.
+        query_log (QueryLog): optional slow query log
     """
 
     RAM = ":memory:"
@@ -39,8 +43,15 @@ class DuckDBQuery:
         self.path = endpoint.database or DuckDBQuery.RAM
         self.debug = debug
         self.con = duckdb.connect(self.path)
-
-    def query(self, sql: str, params: Any = None, commit: bool = False) -> list[dict]:
+        self.query_log: Optional[QueryLog] = None
+
+    def query(
+        self,
+        sql: str,
+        params: Any = None,
+        commit: bool = False,
+        row_format: Union[str, RowFormat] = "dict",
+    ) -> list:
         """
         Execute an SQL query and return all results eagerly.
 
@@ -49,42 +60,103 @@ class DuckDBQuery:
             params: optional positional parameters (list or tuple)
             commit: if True, commit the connection after execution
                 (required for DDL/DML statements such as CREATE/INSERT/UPDATE)
+            row_format: dict, tuple, namedtuple or slots
 
         Returns:
-            list of dicts, one per row
+            list of dicts (or rows in the given row_format), one per row
         """
         if self.debug:
             logging.debug(f"DuckDBQuery.query: {sql!r} params={params}")
+        start_time = time.perf_counter()
         rel = self.con.execute(sql, params or [])
         if rel.description is None:
             if commit:
                 self.con.commit()
+            self.log_query(sql, params, start_time, 0)
             return []
-        cols = [d[0] for d in rel.description]
+        row_factory = RowFactory.of_description(rel.description, row_format)
         rows = rel.fetchall()
-        result = [dict(zip(cols, row)) for row in rows]
+        if row_factory.row_format == RowFormat.TUPLE:
+            result = rows
+        else:
+            result = [row_factory.convert(row) for row in rows]
         if commit:
             self.con.commit()
+        self.log_query(sql, params, start_time, len(result))
         return result
 
-    def query_gen(self, sql: str, params: Any = None) -> Generator[dict, None, None]:
+    def query_gen(
+        self,
+        sql: str,
+        params: Any = None,
+        row_format: Union[str, RowFormat] = "dict",
+        fetch_size: int = 1000,
+    ) -> Generator[Any, None, None]:
         """
         Execute an SQL query and yield results one row at a time.
 
         Args:
             sql: the SQL query string to execute
             params: optional positional parameters (list or tuple)
+            row_format: dict, tuple, namedtuple or slots
+            fetch_size: the number of rows to fetch at once
 
         Yields:
-            one dict per row
+            one dict (or row in the given row_format) per row
         """
         if self.debug:
             logging.debug(f"DuckDBQuery.query_gen: {sql!r} params={params}")
+        start_time = time.perf_counter()
         rel = self.con.execute(sql, params or [])
-        cols = [d[0] for d in rel.description]
-        while True:
-            row = rel.fetchone()
-            if row is None:
-                break
-            record = dict(zip(cols, row))
-            yield record
+        if rel.description is None:
+            self.log_query(sql, params, start_time, 0)
+            return
+        row_factory = RowFactory.of_description(rel.description, row_format)
+        rows = row_factory.iter_cursor(rel, fetch_size)
+        if self.query_log is not None:
+            rows = self.query_log.track(
+                "duckdb",
+                sql,
+                params,
+                rows,
+                explain=lambda: self.explain(sql, params),
+                start_time=start_time,
+            )
+        yield from rows
+
+    def log_query(self, sql: str, params: Any, start_time: float, rows: int):
+        """
+        record the given statement in the query log if enabled
+
+        Args:
+            sql: the SQL query string that was executed
+            params: the parameters of the query
+            start_time: the time.perf_counter() value at the start of the query
+            rows: the number of rows returned
+        """
+        if self.query_log is not None:
+            elapsed = time.perf_counter() - start_time
+            self.query_log.record(
+                "duckdb",
+                sql,
+                params,
+                elapsed,
+                rows,
+                explain=lambda: self.explain(sql, params),
+            )
+
+    def explain(self, sql: str, params: Any = None) -> str:
+        """
+        get the EXPLAIN output for the given query
+
+        Args:
+            sql: the SQL query string to explain
+            params: optional positional parameters (list or tuple)
+
+        Returns:
+            str: the physical plan as text
+        """
+        rel = self.con.execute(f"EXPLAIN {sql}", params or [])
+        # rows are (explain_key, explain_value) - the value holds the plan
+        plan = "\n".join(row[1] for row in rel.fetchall())
+        return plan
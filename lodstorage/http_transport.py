@@ -0,0 +1,195 @@
+"""
+http_transport.py
+
+pooled keep-alive HTTP transport shared by the SPARQL query paths
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import io
+import threading
+import urllib.error
+import urllib.parse
+from typing import Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+from SPARQLWrapper import SPARQLWrapper2
+from SPARQLWrapper.SPARQLExceptions import (
+    EndPointInternalError,
+    EndPointNotFound,
+    QueryBadFormed,
+    Unauthorized,
+    URITooLong,
+)
+from SPARQLWrapper.Wrapper import DIGEST
+
+from lodstorage.version import Version
+
+
+class HttpTransport:
+    """
+    a requests Session with a connection pool per endpoint host
+    keeping the connections alive between requests
+    """
+
+    # the timeout in seconds or as (connect, read) tuple - None waits without
+    # limit as urllib did for SPARQLWrapper since e.g. QLever or Blazegraph
+    # send no bytes before a long running query is finished
+    default_timeout: Optional[Union[float, Tuple[float, float]]] = None
+    pool_maxsize: int = 10
+    instances: Dict[str, "HttpTransport"] = {}
+    lock = threading.Lock()
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: Union[float, Tuple[float, float]] = None,
+        pool_maxsize: int = None,
+    ):
+        """
+        constructor
+
+        Args:
+            base_url (str): the scheme and host of the endpoint e.g. https://query.wikidata.org
+            timeout: the default timeout in seconds or as (connect, read) tuple - default: default_timeout
+            pool_maxsize (int): the maximum number of pooled connections
+        """
+        self.base_url = base_url
+        self.timeout = timeout if timeout is not None else HttpTransport.default_timeout
+        pool_maxsize = pool_maxsize or HttpTransport.pool_maxsize
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers.update(
+            {
+                "Accept-Encoding": "gzip, deflate",
+                "Connection": "keep-alive",
+                "User-Agent": f"{Version.name}/{Version.version}",
+            }
+        )
+
+    @staticmethod
+    def get_base_url(url: str) -> str:
+        """
+        get the scheme and host part of the given url
+        """
+        parts = urllib.parse.urlsplit(url)
+        base_url = f"{parts.scheme}://{parts.netloc}"
+        return base_url
+
+    @classmethod
+    def get_instance(cls, url: str) -> "HttpTransport":
+        """
+        get the shared transport for the host of the given url
+
+        Args:
+            url (str): the url of the endpoint
+        """
+        base_url = cls.get_base_url(url)
+        with cls.lock:
+            transport = cls.instances.get(base_url)
+            if transport is None:
+                transport = cls(base_url)
+                cls.instances[base_url] = transport
+        return transport
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: Union[float, Tuple[float, float]] = None,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        send a request via my pooled session
+
+        Args:
+            method (str): the HTTP method
+            url (str): the url
+            timeout: the timeout - default: my timeout which is None (no limit) unless configured
+            **kwargs: further arguments of requests.Session.request
+
+        Returns:
+            requests.Response: the response
+        """
+        if timeout is None:
+            timeout = self.timeout
+        response = self.session.request(method, url, timeout=timeout, **kwargs)
+        return response
+
+    def close(self):
+        """
+        close my pooled connections
+        """
+        self.session.close()
+
+
+class TransportResponse(io.BytesIO):
+    """
+    file like urllib style response of a requests.Response as
+    expected by SPARQLWrapper's QueryResult
+    """
+
+    def __init__(self, response: requests.Response):
+        super().__init__(response.content)
+        self.headers = response.headers
+        self.url = response.url
+        self.status = response.status_code
+        self.code = response.status_code
+
+    def info(self):
+        return self.headers
+
+    def geturl(self) -> str:
+        return self.url
+
+    def getcode(self) -> int:
+        return self.code
+
+
+class PooledSPARQLWrapper2(SPARQLWrapper2):
+    """
+    SPARQLWrapper2 sending its requests via the pooled HttpTransport
+    instead of a fresh urllib connection per query
+    """
+
+    def _query(self):
+        # urllib installs a global opener for DIGEST authentication
+        if self.user and self.passwd and self.http_auth == DIGEST:
+            return super()._query()
+        request = self._createRequest()
+        transport = HttpTransport.get_instance(request.full_url)
+        timeout: Optional[float] = self.timeout if self.timeout else None
+        response = transport.request(
+            request.get_method(),
+            request.full_url,
+            data=request.data,
+            headers=dict(request.header_items()),
+            timeout=timeout,
+        )
+        code = response.status_code
+        if code >= 400:
+            content = response.content
+            if code == 400:
+                raise QueryBadFormed(content)
+            elif code == 404:
+                raise EndPointNotFound(content)
+            elif code == 401:
+                raise Unauthorized(content)
+            elif code == 414:
+                raise URITooLong(content)
+            elif code == 500:
+                raise EndPointInternalError(content)
+            else:
+                raise urllib.error.HTTPError(
+                    response.url,
+                    code,
+                    response.reason,
+                    response.headers,
+                    io.BytesIO(content),
+                )
+        return TransportResponse(response), self.returnFormat
@@ -0,0 +1,365 @@
+"""
+index_advisor.py
+
+Index advisor for SQLDB - watches the WHERE/JOIN/ORDER BY columns of the
+executed queries and the attributes used for LOD lookups and suggests
+(or creates) indexes for the columns that are filtered on most.
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import math
+import re
+import threading
+import weakref
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+from lodstorage.lod import LOD
+
+
+@dataclass
+class IndexSuggestion:
+    """
+    a suggested single column index
+    """
+
+    table: str
+    column: str
+    hits: int
+    rows: int
+    benefit: float  # estimated number of rows not scanned
+
+    @property
+    def ddl(self) -> str:
+        """
+        the CREATE INDEX command for this suggestion
+        """
+        ddl = f"CREATE INDEX IF NOT EXISTS idx_{self.table}_{self.column} ON {self.table}({self.column})"
+        return ddl
+
+
+class AdvisedResult(list):
+    """
+    the result of a query of a database with an index advisor that watches
+    lookups - remembers the advisor and the columns of the queried tables
+    so that lookups on the result can be credited without database access
+
+    :ivar advisor(weakref): reference to the IndexAdvisor that produced me
+    :ivar columns(dict): the column names of the queried tables by table name
+    :ivar thread_id(int): the ident of the thread that ran the query
+    """
+
+    __slots__ = ("advisor", "columns", "thread_id")
+
+
+class IndexAdvisor:
+    """
+    suggest indexes for a SQLDB based on observed queries and lookups
+    """
+
+    # end of a FROM/JOIN table list
+    TABLE_END = r"(?=\b(?:WHERE|ON|USING|JOIN|LEFT|RIGHT|INNER|OUTER|CROSS|NATURAL|GROUP|ORDER|LIMIT|HAVING|UNION)\b|\)|;|$)"
+    TABLE_RE = re.compile(r"\b(?:FROM|JOIN)\s+(.*?)" + TABLE_END, re.I | re.S)
+    CLAUSE_RES = [
+        re.compile(
+            r"\bWHERE\b(.*?)(?=\b(?:GROUP|ORDER|LIMIT|HAVING|UNION)\b|;|$)", re.I | re.S
+        ),
+        re.compile(
+            r"\bON\b(.*?)(?=\b(?:WHERE|JOIN|LEFT|RIGHT|INNER|CROSS|NATURAL|GROUP|ORDER|LIMIT|UNION)\b|;|$)",
+            re.I | re.S,
+        ),
+        re.compile(r"\bORDER\s+BY\b(.*?)(?=\b(?:LIMIT)\b|\)|;|$)", re.I | re.S),
+    ]
+    COLUMN_RE = re.compile(r"(?:([A-Za-z_]\w*)\.)?([A-Za-z_]\w*)")
+    LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+
+    def __init__(
+        self,
+        sql_db,
+        min_hits: int = 2,
+        min_rows: int = 1000,
+        auto_apply: bool = False,
+    ):
+        """
+        constructor
+
+        Args:
+            sql_db (SQLDB): the database to advise
+            min_hits (int): the minimum number of observed uses of a column
+            min_rows (int): the minimum number of rows of a table to be worth an index
+            auto_apply (bool): if True create an index as soon as a column qualifies
+        """
+        self.sql_db = sql_db
+        self.min_hits = min_hits
+        self.min_rows = min_rows
+        self.auto_apply = auto_apply
+        self.hits = Counter()
+        self.applied: List[str] = []
+        # (table, column) pairs known to be indexed - not checked again by count
+        self.indexed: Set[Tuple[str, str]] = set()
+        # (table, column) pairs qualified by lookups in other threads - see count
+        self.pending: Set[Tuple[str, str]] = set()
+        self.watching = False
+
+    def get_tables(self) -> Dict[str, Set[str]]:
+        """
+        get the column names of the tables of my database
+        """
+        tables = {}
+        for table in self.sql_db.getTableList():
+            tables[table["name"]] = {column["name"] for column in table["columns"]}
+        return tables
+
+    def get_indexed_columns(self, table: str) -> Set[str]:
+        """
+        get the columns of the given table that already lead an index
+
+        Args:
+            table (str): the name of the table
+        """
+        index_query = """SELECT ii.name FROM pragma_index_list(?) AS il
+JOIN pragma_index_info(il.name) AS ii WHERE ii.seqno=0"""
+        rows = self.sql_db.c.execute(index_query, (table,)).fetchall()
+        indexed = {row[0] for row in rows}
+        # INTEGER PRIMARY KEY columns are aliases of the rowid
+        pk_query = (
+            "SELECT name FROM pragma_table_info(?) WHERE pk=1 AND upper(type)='INTEGER'"
+        )
+        for row in self.sql_db.c.execute(pk_query, (table,)).fetchall():
+            indexed.add(row[0])
+        return indexed
+
+    def get_row_count(self, table: str) -> int:
+        """
+        get the number of rows of the given table
+        """
+        count = self.sql_db.c.execute(f'SELECT COUNT(*) FROM "{table}"').fetchone()[0]
+        return count
+
+    @classmethod
+    def get_aliases(cls, sql: str, tables: Dict[str, Set[str]]) -> Dict[str, str]:
+        """
+        get the tables of the FROM and JOIN clauses of the given query
+
+        Args:
+            sql (str): the SQL query
+            tables (dict): the column names by table name
+
+        Returns:
+            dict: the table names by alias (and by table name)
+        """
+        aliases = {}
+        for match in cls.TABLE_RE.finditer(sql):
+            for part in match.group(1).split(","):
+                tokens = part.split()
+                if not tokens:
+                    continue
+                name = tokens[0].strip('"`[]')
+                if name in tables:
+                    aliases[name] = name
+                    aliases[tokens[-1].strip('"`[]')] = name
+        return aliases
+
+    @classmethod
+    def parse(cls, sql: str, tables: Dict[str, Set[str]]) -> List[Tuple[str, str]]:
+        """
+        get the (table, column) pairs used in the WHERE, JOIN ... ON
+        and ORDER BY clauses of the given query
+
+        Args:
+            sql (str): the SQL query
+            tables (dict): the column names by table name
+
+        Returns:
+            list: the (table, column) tuples - one per use
+        """
+        sql = cls.LITERAL_RE.sub("''", sql)
+        aliases = cls.get_aliases(sql, tables)
+        query_tables = set(aliases.values())
+        uses = []
+        for clause_re in cls.CLAUSE_RES:
+            for clause in clause_re.finditer(sql):
+                for qualifier, column in cls.COLUMN_RE.findall(clause.group(1)):
+                    if qualifier:
+                        table = aliases.get(qualifier)
+                        if table is not None and column in tables[table]:
+                            uses.append((table, column))
+                    else:
+                        for table in sorted(query_tables):
+                            if column in tables[table]:
+                                uses.append((table, column))
+                                break
+        return uses
+
+    def observe(self, sql: str):
+        """
+        observe the given executed query
+
+        Args:
+            sql (str): the SQL query
+        """
+        for table, column in list(self.pending):
+            self.check_apply(table, column)
+        if not self.sql_db.isCacheable(sql):
+            return
+        tables = self.get_tables()
+        for table, column in set(self.parse(sql, tables)):
+            self.count(table, column)
+
+    def tag(self, sql: str, rows: list) -> list:
+        """
+        tag the given result rows of the given query so that lookups
+        on them can be observed - only while watching lookups
+
+        Args:
+            sql (str): the SQL query
+            rows (list): the result rows of the query
+
+        Returns:
+            list: an AdvisedResult with the rows or the rows themselves
+        """
+        if not self.watching:
+            return rows
+        tables = self.get_tables()
+        query_tables = set(
+            self.get_aliases(self.LITERAL_RE.sub("''", sql), tables).values()
+        )
+        if not query_tables:
+            return rows
+        result = AdvisedResult(rows)
+        result.advisor = weakref.ref(self)
+        result.columns = {table: tables[table] for table in query_tables}
+        result.thread_id = threading.get_ident()
+        return result
+
+    def observe_lookup(self, lod: list, attr_name: str):
+        """
+        observe a LOD.getLookup for the given attribute - only lookups on
+        results of my queries are credited to the queried tables having
+        a column with the name of the attribute
+
+        Args:
+            lod (list): the list of dicts the lookup is created for
+            attr_name (str): the attribute to lookup
+        """
+        if not isinstance(lod, AdvisedResult) or lod.advisor() is not self:
+            return
+        # the database connection may only be used by the thread of the query
+        apply = lod.thread_id == threading.get_ident()
+        for table, columns in lod.columns.items():
+            if attr_name in columns:
+                self.count(table, attr_name, apply=apply)
+
+    def count(self, table: str, column: str, apply: bool = True):
+        """
+        count a use of the given column
+
+        Args:
+            table (str): the name of the table
+            column (str): the name of the column
+            apply (bool): False if the database may not be used by the current
+                thread - a qualifying column is then applied on the next observed query
+        """
+        key = (table, column)
+        self.hits[key] += 1
+        if (
+            self.auto_apply
+            and self.hits[key] >= self.min_hits
+            and key not in self.indexed
+        ):
+            if apply:
+                self.check_apply(table, column)
+            else:
+                self.pending.add(key)
+
+    def check_apply(self, table: str, column: str):
+        """
+        create the index for the given column if it is worthwhile
+        """
+        key = (table, column)
+        self.pending.discard(key)
+        # the table might have grown above min_rows since the last use
+        if column in self.get_indexed_columns(table):
+            self.indexed.add(key)
+            return
+        suggestion = self.get_suggestion(table, column)
+        if suggestion is not None:
+            self.apply([suggestion])
+
+    def watch_lookups(self):
+        """
+        start observing LOD.getLookup calls on the results of my queries -
+        the registration is weak and ends when I am garbage collected
+        or unwatch_lookups is called
+        """
+        self.watching = True
+        LOD.addLookupObserver(self.observe_lookup)
+
+    def unwatch_lookups(self):
+        """
+        stop observing LOD.getLookup calls
+        """
+        self.watching = False
+        LOD.removeLookupObserver(self.observe_lookup)
+
+    def get_suggestion(self, table: str, column: str) -> Optional[IndexSuggestion]:
+        """
+        get a suggestion for the given column if an index is worthwhile
+
+        Args:
+            table (str): the name of the table
+            column (str): the name of the column
+
+        Returns:
+            IndexSuggestion: the suggestion or None
+        """
+        hits = self.hits[(table, column)]
+        if hits < self.min_hits:
+            return None
+        if column in self.get_indexed_columns(table):
+            return None
+        rows = self.get_row_count(table)
+        if rows < self.min_rows:
+            return None
+        # a full scan reads all rows - an index seek about log2(rows)
+        benefit = hits * (rows - math.log2(rows))
+        suggestion = IndexSuggestion(
+            table=table, column=column, hits=hits, rows=rows, benefit=benefit
+        )
+        return suggestion
+
+    def suggest(self) -> List[IndexSuggestion]:
+        """
+        get the index suggestions - highest benefit first
+        """
+        suggestions = []
+        for table, column in self.hits:
+            suggestion = self.get_suggestion(table, column)
+            if suggestion is not None:
+                suggestions.append(suggestion)
+        suggestions.sort(key=lambda s: s.benefit, reverse=True)
+        return suggestions
+
+    def apply(self, suggestions: List[IndexSuggestion] = None) -> List[str]:
+        """
+        create the indexes for the given suggestions
+
+        Args:
+            suggestions (list): the suggestions to apply - default: all current suggestions
+
+        Returns:
+            list: the CREATE INDEX commands executed
+        """
+        if suggestions is None:
+            suggestions = self.suggest()
+        commands = []
+        for suggestion in suggestions:
+            command = self.sql_db.createIndex(suggestion.table, [suggestion.column])
+            commands.append(command)
+            self.indexed.add((suggestion.table, suggestion.column))
+        self.applied.extend(commands)
+        return commands
@@ -4,12 +4,20 @@ Created on 2021-01-31
 @author: wf
 """
 
+import weakref
+
+from lodstorage.exception_handler import ExceptionHandler
+
 
 class LOD(object):
     """
     list of Dict aka Table
     """
 
+    # weak references to the callbacks (lod, attrName) notified on getLookup
+    # e.g. by the IndexAdvisor - see addLookupObserver
+    lookupObservers = []
+
     def __init__(self, name):
         """
         Constructor
@@ -133,6 +141,46 @@ class LOD(object):
                 lookupResult = record
         lookup[value] = lookupResult
 
+    @staticmethod
+    def addLookupObserver(observer):
+        """
+        notify the given callback (lod, attrName) on getLookup
+
+        only a weak reference is kept so that the observer (and e.g. the
+        database it refers to) does not stay alive because of this registration
+
+        Args:
+            observer(callable): a function or bound method
+        """
+        if LOD.getLookupObserverRef(observer) is None:
+            if hasattr(observer, "__self__"):
+                ref = weakref.WeakMethod(observer)
+            else:
+                ref = weakref.ref(observer)
+            LOD.lookupObservers.append(ref)
+
+    @staticmethod
+    def removeLookupObserver(observer):
+        """
+        stop notifying the given callback on getLookup
+
+        Args:
+            observer(callable): a function or bound method added with addLookupObserver
+        """
+        ref = LOD.getLookupObserverRef(observer)
+        if ref is not None:
+            LOD.lookupObservers.remove(ref)
+
+    @staticmethod
+    def getLookupObserverRef(observer):
+        """
+        get the weak reference of the given lookup observer if registered
+        """
+        for ref in LOD.lookupObservers:
+            if ref() == observer:
+                return ref
+        return None
+
     @staticmethod
     def getLookup(lod: list, attrName: str, withDuplicates: bool = False):
         """
@@ -146,6 +194,17 @@ class LOD(object):
         Return:
             a dictionary for lookup
         """
+        for ref in list(LOD.lookupObservers):
+            observer = ref()
+            if observer is None:
+                # the observer has been garbage collected
+                LOD.lookupObservers.remove(ref)
+            else:
+                try:
+                    observer(lod, attrName)
+                except Exception as ex:
+                    # an observer must never break the lookup
+                    ExceptionHandler.handle("lookup observer failed", ex)
         lookup = {}
         duplicates = []
         for record in lod:
@@ -6,11 +6,14 @@ MySQL and MariaDB support
 """
 
 import logging
-from typing import Any, Dict, Generator, List
+import time
+from typing import Any, Dict, Generator, List, Optional, Sequence, Tuple, Union
 
 import pymysql
 
 from lodstorage.query import Endpoint
+from lodstorage.query_log import QueryLog
+from lodstorage.row_format import RowFactory, RowFormat
 
 
 class MySqlQuery:
@@ -20,6 +23,7 @@ class MySqlQuery:
     Attributes:
         endpoint_info (Endpoint): endpoint configuration.
         debug (bool): Flag to enable debugging.
+        query_log (QueryLog): optional slow query log.
     """
 
     def __init__(self, endpoint: Endpoint, debug: bool = False):
@@ -41,16 +45,34 @@ class MySqlQuery:
         }
 
         self.debug = debug
+        self.query_log: Optional[QueryLog] = None
 
-    def get_cursor(self, query: str):
+    def get_cursor(self, query: str, dict_cursor: bool = True):
         if self.debug:
             logging.debug(f"Executing query: {query}")
             logging.debug(f"With connection parameters: {self.db_params}")
 
         connection = pymysql.connect(**self.db_params)
-        cursor = connection.cursor(pymysql.cursors.DictCursor)
+        if dict_cursor:
+            cursor = connection.cursor(pymysql.cursors.DictCursor)
+        else:
+            cursor = connection.cursor()
         return connection, cursor
 
+    def decode_value(self, value: Any) -> Any:
+        """
+        Converts a binary value to a UTF-8 string.
+
+        Args:
+            value (Any): Raw database value
+
+        Returns:
+            Any: the value with binary content decoded to a string
+        """
+        if isinstance(value, bytes):
+            value = value.decode("utf-8", errors="replace")
+        return value
+
     def decode_record(self, record: Dict[str, Any]) -> Dict[str, Any]:
         """
         Converts binary values to UTF-8 strings.
@@ -63,15 +85,27 @@ class MySqlQuery:
         """
         decoded_record = {}
         for key, value in record.items():
-            if isinstance(value, bytes):
-                decoded_record[key] = value.decode("utf-8", errors="replace")
-            else:
-                decoded_record[key] = value
+            decoded_record[key] = self.decode_value(value)
         return decoded_record
 
+    def decode_row(self, row: Sequence[Any]) -> Tuple[Any, ...]:
+        """
+        Converts binary values of a row tuple to UTF-8 strings.
+
+        Args:
+            row (Sequence[Any]): Raw database row tuple
+
+        Returns:
+            Tuple[Any, ...]: the row with binary values decoded to strings
+        """
+        return tuple(self.decode_value(value) for value in row)
+
     def execute_sql_query(
-        self, query: str, commit: bool = False
-    ) -> List[Dict[str, Any]]:
+        self,
+        query: str,
+        commit: bool = False,
+        row_format: Union[str, RowFormat] = "dict",
+    ) -> List[Any]:
         """
         Executes an SQL query using the provided connection parameters.
 
@@ -79,13 +113,18 @@ class MySqlQuery:
             query (str): The SQL query to execute.
             commit (bool): if True, commit the connection before closing
                 (required for DDL/DML statements such as CREATE/INSERT/UPDATE)
+            row_format: dict, tuple, namedtuple or slots
 
         Returns:
-            list: A list of dictionaries representing the query results.
+            list: A list of dictionaries (or rows in the given row_format) representing the query results.
         """
-        connection, cursor = self.get_cursor(query)
+        row_format = RowFormat.of(row_format)
+        dict_cursor = row_format == RowFormat.DICT
+        start_time = time.perf_counter()
+        connection, cursor = self.get_cursor(query, dict_cursor=dict_cursor)
         cursor.execute(query)
-        if cursor.description is None:
+        description = cursor.description
+        if description is None:
             raw_lod = []
         else:
             raw_lod = cursor.fetchall()
@@ -93,32 +132,106 @@ class MySqlQuery:
             connection.commit()
         connection.close()
         lod = []
-        for raw_row in raw_lod:
-            row = self.decode_record(raw_row)
-            lod.append(row)
+        if dict_cursor:
+            for raw_row in raw_lod:
+                row = self.decode_record(raw_row)
+                lod.append(row)
+        elif raw_lod:
+            row_factory = RowFactory.of_description(description, row_format)
+            for raw_row in raw_lod:
+                row = row_factory.convert(self.decode_row(raw_row))
+                lod.append(row)
+        self.log_query(query, start_time, len(lod))
         return lod
 
-    def query_generator(self, query: str) -> Generator[Dict[str, Any], None, None]:
+    def query_generator(
+        self,
+        query: str,
+        row_format: Union[str, RowFormat] = "dict",
+        fetch_size: int = 1000,
+    ) -> Generator[Any, None, None]:
         """
-        Generator for fetching records one by one from a SQL query.
+        Generator for fetching records in batches of fetch_size from a SQL query.
         """
-        connection, cursor = self.get_cursor(query)
+        row_format = RowFormat.of(row_format)
+        dict_cursor = row_format == RowFormat.DICT
+        start_time = time.perf_counter()
+        row_count = 0
+        connection, cursor = self.get_cursor(query, dict_cursor=dict_cursor)
         try:
             cursor.execute(query)
-            while True:
-                raw_record = cursor.fetchone()
-                if not raw_record:
-                    break
-                record = self.decode_record(raw_record)
-                yield record
+            if cursor.description is not None:
+                if dict_cursor:
+                    while True:
+                        raw_records = cursor.fetchmany(fetch_size)
+                        if not raw_records:
+                            break
+                        for raw_record in raw_records:
+                            record = self.decode_record(raw_record)
+                            row_count += 1
+                            yield record
+                else:
+                    row_factory = RowFactory.of_description(
+                        cursor.description, row_format
+                    )
+                    for row in row_factory.iter_cursor(
+                        cursor, fetch_size, decode=self.decode_row
+                    ):
+                        row_count += 1
+                        yield row
 
         finally:
             cursor.close()
             connection.close()
+            self.log_query(query, start_time, row_count)
+
+    def log_query(self, query: str, start_time: float, rows: int):
+        """
+        Records the given statement in the query log if enabled.
+
+        Args:
+            query (str): The SQL query that was executed.
+            start_time (float): the time.perf_counter() value at the start of the query
+            rows (int): the number of rows returned
+        """
+        if self.query_log is not None:
+            elapsed = time.perf_counter() - start_time
+            self.query_log.record(
+                "mysql",
+                query,
+                None,
+                elapsed,
+                rows,
+                explain=lambda: self.explain(query),
+            )
+
+    def explain(self, query: str) -> str:
+        """
+        Gets the EXPLAIN output for the given query.
+
+        Args:
+            query (str): The SQL query to explain.
+
+        Returns:
+            str: the query plan - one line per row of the EXPLAIN result
+        """
+        explain_query = f"EXPLAIN {query}"
+        connection, cursor = self.get_cursor(explain_query, dict_cursor=False)
+        try:
+            cursor.execute(explain_query)
+            plan = QueryLog.format_plan(cursor.fetchall())
+        finally:
+            cursor.close()
+            connection.close()
+        return plan
 
     def query(
-        self, sql: str, params: Any = None, commit: bool = False
-    ) -> List[Dict[str, Any]]:
+        self,
+        sql: str,
+        params: Any = None,
+        commit: bool = False,
+        row_format: Union[str, RowFormat] = "dict",
+    ) -> List[Any]:
         """
         SQLBackend protocol alias for execute_sql_query.
 
@@ -127,23 +240,30 @@ class MySqlQuery:
             params: ignored (not yet supported at the pymysql layer)
             commit: if True, commit the connection after execution
                 (required for DDL/DML statements such as CREATE/INSERT/UPDATE)
+            row_format: dict, tuple, namedtuple or slots
 
         Returns:
-            list of dicts, one per row
+            list of dicts (or rows in the given row_format), one per row
         """
-        return self.execute_sql_query(sql, commit=commit)
+        return self.execute_sql_query(sql, commit=commit, row_format=row_format)
 
     def query_gen(
-        self, sql: str, params: Any = None
-    ) -> Generator[Dict[str, Any], None, None]:
+        self,
+        sql: str,
+        params: Any = None,
+        row_format: Union[str, RowFormat] = "dict",
+        fetch_size: int = 1000,
+    ) -> Generator[Any, None, None]:
         """
         SQLBackend protocol alias for query_generator.
 
         Args:
             sql: the SQL query to execute
             params: ignored (not yet supported at the pymysql layer)
+            row_format: dict, tuple, namedtuple or slots
+            fetch_size: the number of rows to fetch at once
 
         Yields:
-            one dict per row
+            one dict (or row in the given row_format) per row
         """
-        return self.query_generator(sql)
+        return self.query_generator(sql, row_format=row_format, fetch_size=fetch_size)
@@ -717,6 +717,9 @@ class Endpoint:
         None  # if false data_seeded is the most recent state of data
     )
     mtriples: Optional[int] = None  # Dataset size in millions of triples
+    mirrors: Optional[List[str]] = (
+        None  # names of endpoints serving the same data e.g. for failover
+    )
 
     @classmethod
     def getSamples(cls):
@@ -0,0 +1,199 @@
+"""
+query_log.py
+
+Slow query log for the SQL backends of pyLoDStorage - records the
+latency and row count of each executed statement and captures the
+backend's EXPLAIN output for statements above a threshold.
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import datetime
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Iterable, List, Optional
+
+
+@dataclass
+class QueryLogEntry:
+    """
+    a single executed statement
+    """
+
+    timestamp: datetime.datetime
+    backend: str
+    sql: str
+    params: Optional[str]
+    elapsed: float  # seconds
+    rows: int
+    slow: bool
+    explain: Optional[str] = None
+
+    @classmethod
+    def sample(cls) -> "QueryLogEntry":
+        """
+        get a sample entry with all columns set e.g. for deriving a table
+        """
+        entry = cls(
+            timestamp=datetime.datetime.now(),
+            backend="sqlite",
+            sql="SELECT 1",
+            params="",
+            elapsed=0.0,
+            rows=1,
+            slow=False,
+            explain="",
+        )
+        return entry
+
+
+class QueryLog:
+    """
+    ring buffer of the most recent QueryLogEntries
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        threshold: float = 0.5,
+        with_explain: bool = True,
+    ):
+        """
+        constructor
+
+        Args:
+            max_entries (int): the size of the ring buffer
+            threshold (float): the latency in seconds above which a statement is considered slow
+            with_explain (bool): if True capture the EXPLAIN output of slow statements
+        """
+        self.entries = deque(maxlen=max_entries)
+        self.threshold = threshold
+        self.with_explain = with_explain
+
+    def record(
+        self,
+        backend: str,
+        sql: str,
+        params: Any,
+        elapsed: float,
+        rows: int,
+        explain: Callable[[], str] = None,
+    ) -> QueryLogEntry:
+        """
+        record the given statement execution
+
+        Args:
+            backend (str): the name of the backend e.g. sqlite, duckdb, mysql, postgresql
+            sql (str): the statement
+            params: the statement's parameters if any
+            elapsed (float): the latency in seconds
+            rows (int): the number of rows returned
+            explain: callback returning the EXPLAIN output of the statement
+
+        Returns:
+            QueryLogEntry: the recorded entry
+        """
+        slow = elapsed >= self.threshold
+        explain_text = None
+        if slow and self.with_explain and explain is not None:
+            try:
+                explain_text = explain()
+            except Exception as ex:
+                explain_text = f"EXPLAIN failed: {ex}"
+        entry = QueryLogEntry(
+            timestamp=datetime.datetime.now(),
+            backend=backend,
+            sql=sql,
+            params=None if params is None else repr(params),
+            elapsed=elapsed,
+            rows=rows,
+            slow=slow,
+            explain=explain_text,
+        )
+        self.entries.append(entry)
+        return entry
+
+    def track(
+        self,
+        backend: str,
+        sql: str,
+        params: Any,
+        rows: Iterable[Any],
+        explain: Callable[[], str] = None,
+        start_time: float = None,
+    ):
+        """
+        generator passing through the given rows and recording the statement
+        when the rows are exhausted (or the generator is closed)
+
+        Args:
+            backend (str): the name of the backend
+            sql (str): the statement
+            params: the statement's parameters if any
+            rows: the rows of the statement's result
+            explain: callback returning the EXPLAIN output of the statement
+            start_time (float): the time.perf_counter() value at the start of the statement
+        """
+        if start_time is None:
+            start_time = time.perf_counter()
+        count = 0
+        try:
+            for row in rows:
+                count += 1
+                yield row
+        finally:
+            elapsed = time.perf_counter() - start_time
+            self.record(backend, sql, params, elapsed, count, explain)
+
+    def slow_queries(self) -> List[QueryLogEntry]:
+        """
+        get the slow entries - slowest first
+        """
+        slow = [entry for entry in self.entries if entry.slow]
+        slow.sort(key=lambda entry: entry.elapsed, reverse=True)
+        return slow
+
+    def as_lod(self) -> List[dict]:
+        """
+        get my entries as a list of dicts
+        """
+        lod = [asdict(entry) for entry in self.entries]
+        return lod
+
+    def clear(self):
+        """
+        remove all entries
+        """
+        self.entries.clear()
+
+    def to_sqldb(self, sql_db, table_name: str = "query_log"):
+        """
+        append my entries to the given log table - the table is created if needed
+
+        Args:
+            sql_db (SQLDB): the SQLite database to store the log in
+            table_name (str): the name of the log table
+        """
+        # local import to avoid a circular import - sql.py uses the QueryLog
+        from lodstorage.sql import EntityInfo
+
+        entity_info = EntityInfo(
+            [asdict(QueryLogEntry.sample())], table_name, quiet=True
+        )
+        if table_name not in sql_db.getTableDict():
+            sql_db.createTable4EntityInfo(entity_info)
+        sql_db.store(self.as_lod(), entity_info, executeMany=True)
+
+    @staticmethod
+    def format_plan(rows: Iterable[Iterable[Any]]) -> str:
+        """
+        format the given EXPLAIN result rows as text - one line per row
+
+        Args:
+            rows: the result rows of an EXPLAIN statement
+        """
+        lines = [" | ".join(str(value) for value in row) for row in rows]
+        return "\n".join(lines)
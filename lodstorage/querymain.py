@@ -14,11 +14,13 @@ from argparse import ArgumentParser, RawDescriptionHelpFormatter
 
 import requests
 
+from lodstorage.http_transport import HttpTransport
 from lodstorage.prefix_config import PrefixConfigs
 from lodstorage.query import Endpoint, EndpointManager, Format, ValueFormatter
 from lodstorage.query_cmd import QueryCmd
 from lodstorage.rate_limiter import RateLimiter
 from lodstorage.sparql import SPARQL
+from lodstorage.sparql_paginator import SparqlPaginator
 from lodstorage.sql_backend import get_sql_backend
 from lodstorage.version import Version
 
@@ -75,6 +77,8 @@ class QueryMain(QueryCmd):
                     self.queryCode += f"\nLIMIT {self.query.limit}"
             if args.language == "sparql":
                 sparql = SPARQL.fromEndpointConf(endpointConf)
+                if getattr(args, "cache", False):
+                    sparql.enableCache(ttl=args.cacheTTL)
                 if args.prefixes and endpointConf is not None:
                     prefix_configs = PrefixConfigs.get_instance()
                     if args.prefixesPath:
@@ -93,7 +97,17 @@ class QueryMain(QueryCmd):
                     return
                 if "wikidata" in args.endpointName and self.formats is None:
                     self.formats = ["*:wikidata"]
-                qlod = sparql.queryAsListOfDicts(self.queryCode)
+                if getattr(args, "pageSize", None):
+                    paginator = SparqlPaginator(
+                        sparql,
+                        page_size=args.pageSize,
+                        max_workers=args.maxWorkers,
+                        keyset=args.keyset,
+                        state_path=args.resume,
+                    )
+                    qlod = list(paginator.query_gen(self.queryCode))
+                else:
+                    qlod = sparql.queryAsListOfDicts(self.queryCode)
             elif args.language == "sql":
                 backend = get_sql_backend(endpointConf, debug=args.debug)
                 qlod = backend.query(self.queryCode, commit=args.commit)
@@ -147,7 +161,8 @@ class QueryMain(QueryCmd):
             data = None
 
         try:
-            response = requests.request(
+            transport = HttpTransport.get_instance(endpoint)
+            response = transport.request(
                 method,
                 endpoint,
                 headers=headers,
@@ -267,6 +282,36 @@ USAGE
             action="store_true",
             help="return the raw query result from the endpoint. (MIME type defined over -f or -m)",
         )
+        parser.add_argument(
+            "--cache",
+            action="store_true",
+            help="cache SPARQL query results persistently in the lodstorage cache directory",
+        )
+        parser.add_argument(
+            "--cacheTTL",
+            type=float,
+            default=24 * 3600,
+            help="time to live of cached SPARQL query results in seconds [default: %(default)s]",
+        )
+        parser.add_argument(
+            "--pageSize",
+            type=int,
+            help="fetch SPARQL query results in pages of the given number of rows",
+        )
+        parser.add_argument(
+            "--maxWorkers",
+            type=int,
+            default=4,
+            help="number of pages fetched concurrently in paged mode [default: %(default)s]",
+        )
+        parser.add_argument(
+            "--keyset",
+            help="variable with unique values to page by instead of OFFSET in paged mode",
+        )
+        parser.add_argument(
+            "--resume",
+            help="path of a state file to resume an interrupted paged query from",
+        )
         parser.add_argument(
             "--commit",
             action="store_true",
@@ -4,28 +4,362 @@ Created on 2024-08-24
 @author: wf
 """
 
+import email.utils
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
 from functools import wraps
+from typing import Any, Callable, Dict, Optional, Tuple
 
-from ratelimit import limits, sleep_and_retry
+from lodstorage.storageconfig import StorageConfig
+
+
+@dataclass
+class BucketState:
+    """
+    the state of a token bucket - tokens may become negative for
+    calls that have reserved a future token and are waiting for it
+    """
+
+    tokens: float
+    updated: float  # wall clock time of the last update
+    rate: float  # current tokens per second - lowered when throttled
+    blocked_until: float = 0.0  # no calls before this time e.g. after Retry-After
+
+
+class MemoryBucketStore:
+    """
+    bucket states of the current process
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.states: Dict[str, BucketState] = {}
+
+    def update(
+        self,
+        key: str,
+        modify: Callable[[Optional[BucketState]], Tuple[BucketState, Any]],
+    ) -> Any:
+        """
+        atomically modify the state of the bucket with the given key
+
+        Args:
+            key (str): the key of the bucket
+            modify: function getting the current state (or None) and returning the new state and a result
+
+        Returns:
+            the result of modify
+        """
+        with self.lock:
+            state, result = modify(self.states.get(key))
+            self.states[key] = state
+        return result
+
+
+class SqliteBucketStore:
+    """
+    bucket states shared by all processes using the same SQLite file
+    """
+
+    def __init__(self, db_path: str = None, timeout: float = 30.0):
+        """
+        constructor
+
+        Args:
+            db_path (str): the path of the SQLite file - default: rate_limits.db in the StorageConfig cache path
+            timeout (float): the seconds to wait for the lock of another process
+        """
+        if db_path is None:
+            cache_path = StorageConfig.getDefault().getCachePath()
+            db_path = os.path.join(cache_path, "rate_limits.db")
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        # autocommit mode - transactions are started explicitly
+        self.connection = sqlite3.connect(
+            db_path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS rate_bucket (
+  key TEXT PRIMARY KEY,
+  tokens REAL,
+  updated REAL,
+  rate REAL,
+  blocked_until REAL
+)""")
+
+    def update(
+        self,
+        key: str,
+        modify: Callable[[Optional[BucketState]], Tuple[BucketState, Any]],
+    ) -> Any:
+        """
+        atomically modify the state of the bucket with the given key
+        in an immediate transaction locking out the other processes
+        """
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.connection.execute(
+                    "SELECT tokens,updated,rate,blocked_until FROM rate_bucket WHERE key=?",
+                    (key,),
+                ).fetchone()
+                state = BucketState(*row) if row else None
+                state, result = modify(state)
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO rate_bucket VALUES (?,?,?,?,?)",
+                    (key, state.tokens, state.updated, state.rate, state.blocked_until),
+                )
+                self.connection.execute("COMMIT")
+            except BaseException:
+                self.connection.execute("ROLLBACK")
+                raise
+        return result
+
+    def close(self):
+        self.connection.close()
 
 
 class RateLimiter:
     """
-    Wrap the @limits decorator in a new decorator
+    token bucket rate limiter - the bucket state lives in a store that may
+    be shared between processes and the rate backs off when the server
+    answers with 429/503 or a Retry-After header and recovers on success
     """
 
-    def __init__(self, calls_per_minute: int = None):
+    throttle_codes = (429, 503)
+
+    def __init__(
+        self,
+        calls_per_minute: int = None,
+        burst: int = None,
+        store=None,
+        key: str = "default",
+        backoff_factor: float = 0.5,
+        recovery_factor: float = 1.1,
+        max_retries: int = 3,
+    ):
+        """
+        constructor
+
+        Args:
+            calls_per_minute (int): the sustained number of calls per minute - default: unlimited
+            burst (int): the number of calls that may be made at once - default: calls_per_minute
+            store: the bucket store - default: a MemoryBucketStore of this process
+            key (str): the key of the bucket in the store e.g. the endpoint host
+            backoff_factor (float): the factor to lower the rate by when throttled
+            recovery_factor (float): the factor to raise a lowered rate by per successful call
+            max_retries (int): the number of retries of a throttled call
+        """
         if calls_per_minute is None:
             calls_per_minute = 60 * 1000 * 1000  # use an irrationally high value
         self.calls_per_minute = calls_per_minute
+        self.rate = calls_per_minute / 60.0
+        self.min_rate = self.rate / 64
+        self.capacity = float(burst or calls_per_minute)
+        self.store = store or MemoryBucketStore()
+        self.key = key
+        self.backoff_factor = backoff_factor
+        self.recovery_factor = recovery_factor
+        self.max_retries = max_retries
+        # the shared rate as seen by the last reservation
+        self.current_rate = self.rate
+        self.stats_lock = threading.Lock()
+        self.calls = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.throttled = 0
+
+    def share(self, db_path: str = None, key: str = None):
+        """
+        share my budget with all processes using the given SQLite file
+
+        Args:
+            db_path (str): the path of the SQLite file see SqliteBucketStore
+            key (str): the key of the bucket e.g. the endpoint host
+        """
+        self.store = SqliteBucketStore(db_path)
+        if key is not None:
+            self.key = key
+
+    def new_state(self, now: float) -> BucketState:
+        return BucketState(tokens=self.capacity, updated=now, rate=self.rate)
+
+    def reserve(self) -> float:
+        """
+        take a token - a missing token is reserved in the future
+
+        Returns:
+            float: the seconds to wait before the call may be made
+        """
+
+        def modify(state: Optional[BucketState]):
+            now = time.time()
+            if state is None:
+                state = self.new_state(now)
+            elapsed = max(now - state.updated, 0.0)
+            state.tokens = min(self.capacity, state.tokens + elapsed * state.rate)
+            state.updated = now
+            state.tokens -= 1.0
+            wait = 0.0
+            if state.tokens < 0.0:
+                wait = -state.tokens / state.rate
+            wait = max(wait, state.blocked_until - now)
+            return state, (wait, state.rate)
+
+        wait, self.current_rate = self.store.update(self.key, modify)
+        return wait
+
+    def acquire(self) -> float:
+        """
+        wait until a call may be made
+
+        Returns:
+            float: the seconds waited
+        """
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+        with self.stats_lock:
+            self.calls += 1
+            if wait > 0:
+                self.waits += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+        return wait
+
+    def penalize(self, retry_after: float = None):
+        """
+        lower the rate after the server throttled a call
+
+        Args:
+            retry_after (float): the seconds the server asked to wait
+        """
+
+        def modify(state: Optional[BucketState]):
+            now = time.time()
+            if state is None:
+                state = self.new_state(now)
+            state.rate = max(self.min_rate, state.rate * self.backoff_factor)
+            if retry_after:
+                state.blocked_until = max(state.blocked_until, now + retry_after)
+            return state, None
+
+        with self.stats_lock:
+            self.throttled += 1
+        self.store.update(self.key, modify)
+
+    def reward(self):
+        """
+        raise a lowered rate again after a successful call
+        """
+
+        def modify(state: Optional[BucketState]):
+            if state is None:
+                state = self.new_state(time.time())
+            state.rate = min(self.rate, state.rate * self.recovery_factor)
+            self.current_rate = state.rate
+            return state, None
+
+        self.store.update(self.key, modify)
+
+    @staticmethod
+    def parse_retry_after(value: Optional[str]) -> Optional[float]:
+        """
+        parse the given Retry-After header value
+
+        Args:
+            value (str): delay seconds or an HTTP date
+
+        Returns:
+            float: the seconds to wait or None
+        """
+        if not value:
+            return None
+        try:
+            return max(float(value), 0.0)
+        except ValueError:
+            pass
+        try:
+            retry_time = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        return max(retry_time.timestamp() - time.time(), 0.0)
+
+    def check_throttled(self, status: Optional[int], headers) -> bool:
+        """
+        check whether the given HTTP status signals throttling and penalize if so
+
+        Args:
+            status (int): the HTTP status code
+            headers: the response headers
+
+        Returns:
+            bool: True if the call was throttled
+        """
+        if status not in self.throttle_codes:
+            return False
+        retry_after = None
+        if headers is not None:
+            retry_after = self.parse_retry_after(headers.get("Retry-After"))
+        self.penalize(retry_after)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        get the wait time statistics and the current state of the bucket
+        """
+
+        def read(state: Optional[BucketState]):
+            if state is None:
+                state = self.new_state(time.time())
+            return state, state
+
+        state = self.store.update(self.key, read)
+        with self.stats_lock:
+            stats = {
+                "calls": self.calls,
+                "waits": self.waits,
+                "total_wait": self.total_wait,
+                "max_wait": self.max_wait,
+                "mean_wait": self.total_wait / self.calls if self.calls else 0.0,
+                "throttled": self.throttled,
+            }
+        stats.update(asdict(state))
+        stats["calls_per_minute"] = state.rate * 60.0
+        return stats
 
     def rate_limited(self, f: callable):
-        # build the throttled decorator once so its call-budget state persists
-        # across invocations (otherwise the budget resets on every call)
-        throttle = sleep_and_retry(limits(calls=self.calls_per_minute, period=60)(f))
+        """
+        decorate the given function to wait for a token before each call and
+        to retry calls throttled with HTTP 429/503 - the status is taken from the
+        status_code of a returned response or the code of a raised HTTPError
+        """
 
         @wraps(f)
         def wrapper(*args, **kwargs):
-            return throttle(*args, **kwargs)
+            for attempt in range(self.max_retries + 1):
+                last_attempt = attempt == self.max_retries
+                self.acquire()
+                try:
+                    result = f(*args, **kwargs)
+                except Exception as ex:
+                    status = getattr(ex, "code", None)
+                    headers = getattr(ex, "headers", None)
+                    if not self.check_throttled(status, headers) or last_attempt:
+                        raise
+                    continue
+                status = getattr(result, "status_code", None)
+                headers = getattr(result, "headers", None)
+                if not self.check_throttled(status, headers):
+                    if self.current_rate < self.rate:
+                        self.reward()
+                    return result
+                if last_attempt:
+                    return result
+                if hasattr(result, "close"):
+                    result.close()
 
         return wrapper
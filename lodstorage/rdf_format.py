@@ -18,6 +18,8 @@ class RdfFormat(Enum):
     RDF_XML = ("rdf-xml", "application/rdf+xml", ".rdf", RDF)
     N3 = ("n3", "text/n3", ".n3", N3)
     JSON_LD = ("json-ld", "application/ld+json", ".jsonld", JSON)
+    # N-Triples are a subset of Turtle
+    N_TRIPLES = ("n-triples", "application/n-triples", ".nt", TURTLE)
 
     def __init__(self, label: str, mime_type: str, extension: str, sparql_format):
         self.label = label
@@ -25,6 +27,12 @@ class RdfFormat(Enum):
         self.extension = extension
         self.sparql_format = sparql_format
 
+    @property
+    def rdflib_format(self) -> str:
+        """the format name of the rdflib parser plugin"""
+        rdflib_formats = {"rdf-xml": "xml", "n-triples": "nt"}
+        return rdflib_formats.get(self.label, self.label)
+
     @classmethod
     def by_label(cls, label: str):
         """Get format by label"""
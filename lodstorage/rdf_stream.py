@@ -0,0 +1,141 @@
+"""
+rdf_stream.py
+
+streaming of large RDF results e.g. of SPARQL CONSTRUCT queries to a
+file or into an rdflib Graph without buffering the whole document
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import io
+import os
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+from rdflib import Graph
+from rdflib.plugins.parsers.ntriples import NTGraphSink, W3CNTriplesParser
+
+from lodstorage.rdf_format import RdfFormat
+
+
+@dataclass
+class TransferStats:
+    """
+    statistics of a streamed transfer
+    """
+
+    bytes: int = 0
+    triples: Optional[int] = None
+    start_time: float = field(default_factory=time.perf_counter)
+    seconds: float = 0.0
+
+    def add(self, size: int):
+        self.bytes += size
+        self.seconds = time.perf_counter() - self.start_time
+
+    @property
+    def bytes_per_second(self) -> float:
+        if self.seconds <= 0:
+            return 0.0
+        return self.bytes / self.seconds
+
+    def __str__(self) -> str:
+        text = f"{self.bytes} bytes in {self.seconds:.2f} s ({self.bytes_per_second / 1024 / 1024:.2f} MB/s)"
+        if self.triples is not None:
+            text += f" {self.triples} triples"
+        return text
+
+
+class ChunkReader(io.RawIOBase):
+    """
+    readable raw stream over an iterable of byte chunks counting the bytes read
+    """
+
+    def __init__(self, chunks: Iterable[bytes], stats: TransferStats):
+        self.chunks: Iterator[bytes] = iter(chunks)
+        self.stats = stats
+        # the unread rest of the current chunk - a view to avoid copies
+        self.pending = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return 0
+            self.stats.add(len(chunk))
+            self.pending = memoryview(chunk)
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+        return size
+
+
+class RdfStreamer:
+    """
+    write RDF byte chunks to a file or parse them into an rdflib Graph
+    """
+
+    def __init__(self, chunks: Iterable[bytes], rdf_format: RdfFormat):
+        """
+        constructor
+
+        Args:
+            chunks (Iterable[bytes]): the chunks of the RDF document e.g. response.iter_content()
+            rdf_format (RdfFormat): the format of the document
+        """
+        self.chunks = chunks
+        self.rdf_format = rdf_format
+        self.stats = TransferStats()
+
+    def to_file(self, path: str) -> TransferStats:
+        """
+        write the document to the given file
+
+        Args:
+            path (str): the path of the file
+
+        Returns:
+            TransferStats: the statistics of the transfer
+        """
+        with open(path, "wb") as rdf_file:
+            for chunk in self.chunks:
+                rdf_file.write(chunk)
+                self.stats.add(len(chunk))
+        return self.stats
+
+    def to_graph(self, graph: Graph) -> TransferStats:
+        """
+        parse the document into the given graph - N-Triples are parsed line by
+        line while the other formats are spooled to a temporary file first
+
+        Args:
+            graph (Graph): the graph to add the triples to
+
+        Returns:
+            TransferStats: the statistics of the transfer
+        """
+        triples_before = len(graph)
+        if self.rdf_format == RdfFormat.N_TRIPLES:
+            reader = ChunkReader(self.chunks, self.stats)
+            text = io.TextIOWrapper(io.BufferedReader(reader), encoding="utf-8")
+            parser = W3CNTriplesParser(NTGraphSink(graph))
+            # one blank node context for the whole document
+            parser.parse(text, bnode_context={})
+        else:
+            fd, path = tempfile.mkstemp(suffix=self.rdf_format.extension)
+            os.close(fd)
+            try:
+                self.to_file(path)
+                graph.parse(path, format=self.rdf_format.rdflib_format)
+            finally:
+                os.remove(path)
+        self.stats.triples = len(graph) - triples_before
+        self.stats.seconds = time.perf_counter() - self.stats.start_time
+        return self.stats
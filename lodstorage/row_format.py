@@ -0,0 +1,177 @@
+"""
+row_format.py
+
+Row formats for the results of the SQL backends of pyLoDStorage.
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+from collections import namedtuple
+from enum import Enum
+from functools import lru_cache
+from typing import Any, Callable, Iterator, Sequence, Tuple, Union
+
+
+class RowFormat(Enum):
+    """
+    the possible formats of result rows
+
+    DICT: one dict per row (default)
+    TUPLE: the raw row tuples as delivered by the database driver
+    NAMEDTUPLE: a namedtuple class cached per column list
+    SLOTS: a __slots__ based row class cached per column list
+    """
+
+    DICT = "dict"
+    TUPLE = "tuple"
+    NAMEDTUPLE = "namedtuple"
+    SLOTS = "slots"
+
+    @classmethod
+    def of(cls, row_format: Union[str, "RowFormat", None]) -> "RowFormat":
+        """
+        get the RowFormat for the given label or RowFormat
+
+        Args:
+            row_format: a RowFormat, its label e.g. "tuple" or None for the default DICT format
+
+        Returns:
+            RowFormat: the row format
+        """
+        if row_format is None:
+            return cls.DICT
+        if isinstance(row_format, RowFormat):
+            return row_format
+        for candidate in cls:
+            if candidate.value == row_format:
+                return candidate
+        raise ValueError(f"Unknown row format: {row_format}")
+
+
+class SlotsRow:
+    """
+    base class for the __slots__ based rows created by RowFactory
+    """
+
+    __slots__ = ()
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            setattr(self, name, value)
+
+    def __iter__(self):
+        for name in self.__slots__:
+            yield getattr(self, name)
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({values})"
+
+    def _asdict(self) -> dict:
+        """
+        get my values as a dict
+        """
+        return dict(zip(self.__slots__, self))
+
+
+class RowFactory:
+    """
+    converts the raw row tuples of a cursor to the requested RowFormat
+    """
+
+    def __init__(
+        self, columns: Sequence[str], row_format: Union[str, RowFormat] = "dict"
+    ):
+        """
+        construct me for the given column names and row format
+
+        Args:
+            columns: the column names of the result e.g. from cursor.description
+            row_format: the RowFormat or its label
+        """
+        self.columns = tuple(columns)
+        self.row_format = RowFormat.of(row_format)
+        self.convert = self.get_converter()
+
+    @classmethod
+    def of_description(
+        cls, description, row_format: Union[str, RowFormat] = "dict"
+    ) -> "RowFactory":
+        """
+        create a RowFactory from the given DB-API cursor description
+
+        Args:
+            description: the cursor description - one sequence per column with the name first
+            row_format: the RowFormat or its label
+        """
+        columns = [d[0] for d in description]
+        return cls(columns, row_format)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def namedtuple_class(columns: Tuple[str, ...]) -> type:
+        """
+        get the namedtuple class for the given columns - invalid
+        or duplicate column names are renamed to _<index>
+        """
+        return namedtuple("Row", columns, rename=True)
+
+    @staticmethod
+    @lru_cache(maxsize=256)
+    def slots_class(columns: Tuple[str, ...]) -> type:
+        """
+        get the __slots__ based row class for the given columns
+        """
+        fields = RowFactory.namedtuple_class(columns)._fields
+        return type("Row", (SlotsRow,), {"__slots__": fields})
+
+    def get_converter(self) -> Callable[[Sequence[Any]], Any]:
+        """
+        get the function converting a raw row tuple to my row format
+        """
+        if self.row_format == RowFormat.DICT:
+            columns = self.columns
+            return lambda row: dict(zip(columns, row))
+        elif self.row_format == RowFormat.TUPLE:
+            return tuple
+        elif self.row_format == RowFormat.NAMEDTUPLE:
+            return RowFactory.namedtuple_class(self.columns)._make
+        else:
+            row_class = RowFactory.slots_class(self.columns)
+            return lambda row: row_class(*row)
+
+    def iter_cursor(
+        self,
+        cursor,
+        fetch_size: int = 1000,
+        decode: Callable[[Sequence[Any]], Sequence[Any]] = None,
+    ) -> Iterator[Any]:
+        """
+        fetch the rows of the given cursor in batches of fetch_size and
+        yield them in my row format
+
+        Args:
+            cursor: a DB-API cursor with a pending result
+            fetch_size: the number of rows to fetch at once via fetchmany
+            decode: optional function to apply to each raw row first
+        """
+        convert = self.convert
+        while True:
+            rows = cursor.fetchmany(fetch_size)
+            if not rows:
+                break
+            if decode is not None:
+                rows = [decode(row) for row in rows]
+            if self.row_format == RowFormat.TUPLE and decode is None:
+                yield from rows
+            else:
+                for row in rows:
+                    yield convert(row)
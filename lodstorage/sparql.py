@@ -4,21 +4,57 @@ Created on 2020-08-14
 @author: wf
 """
 
+import copy
 import datetime
+import re
+import threading
 import time
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from sys import stderr
+from typing import Any, Generator, List, Union
 
 import requests
+from rdflib import Graph
 from SPARQLWrapper import SPARQLWrapper2
-from SPARQLWrapper.Wrapper import POST, POSTDIRECTLY
+from SPARQLWrapper.SPARQLExceptions import EndPointInternalError
+from SPARQLWrapper.Wrapper import POST, POSTDIRECTLY, URLENCODED
 
+from lodstorage.http_transport import HttpTransport, PooledSPARQLWrapper2
 from lodstorage.lod import LOD
-from lodstorage.params import Params
+from lodstorage.params import Param, Params
 from lodstorage.rate_limiter import RateLimiter
 from lodstorage.rdf_format import RdfFormat
+from lodstorage.rdf_stream import RdfStreamer, TransferStats
+from lodstorage.row_format import RowFactory, RowFormat
+from lodstorage.sparql_batch import SparqlValuesBatcher
+from lodstorage.sparql_cache import SparqlResultCache
+from lodstorage.sparql_json import SparqlJsonDecoder, SparqlJsonStreamParser
+from lodstorage.sparql_paginator import SparqlPaginator
+from lodstorage.sparql_tsv import SparqlTsvDecoder
 from lodstorage.version import Version
 
 
+@dataclass
+class BatchResult:
+    """
+    the result of inserting a single batch of records
+    """
+
+    batchIndex: int  # index of the first record of the batch
+    rows: int = 0  # number of serialized records - without the ones in errors
+    bytes: int = 0
+    latency: float = 0.0  # seconds for the successful (or last) attempt
+    attempts: int = 0
+    error: str = None
+    errors: List[str] = field(default_factory=list)  # serialization errors
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
 class SPARQL(object):
     """
     wrapper for SPARQL e.g. Apache Jena, Virtuoso, Blazegraph
@@ -28,8 +64,9 @@ class SPARQL(object):
     :ivar debug: True if debugging is active
     :ivar typedLiterals: True if INSERT should be done with typedLiterals
     :ivar profile(boolean): True if profiling / timing information should be displayed
-    :ivar sparql: the SPARQLWrapper2 instance to be used
+    :ivar sparql: the SPARQLWrapper2 instance to be used - sending its requests via the pooled HttpTransport
     :ivar method(str): the HTTP method to be used 'POST' or 'GET'
+    :ivar timeout(float): the timeout in seconds per request - None for no limit
     """
 
     def __init__(
@@ -43,6 +80,7 @@ class SPARQL(object):
         agent=None,
         method="POST",
         calls_per_minute: int = None,
+        timeout: float = None,
     ):
         """
         Construct a SPARQL wrapper
@@ -55,6 +93,9 @@ class SPARQL(object):
             profile (boolean): True if profiling / timing information should be displayed
             agent (string): the User agent to use
             method (string): the HTTP method to be used 'POST' or 'GET'
+            calls_per_minute (int): the rate limit - default: 60
+            timeout (float): the timeout in seconds per request - default: None i.e. no limit
+                since long running queries may not send any bytes before they are finished
         """
         if isFuseki:
             self.url = f"{url}/{mode}"
@@ -66,17 +107,29 @@ class SPARQL(object):
         self.profile = profile
         if agent is None:
             agent = self.get_user_agent()
-        self.sparql = SPARQLWrapper2(url)
+        self.sparql = PooledSPARQLWrapper2(url)
         self.sparql.agent = agent
+        # not via setTimeout which truncates to int
+        self.sparql.timeout = timeout
+        self.timeout = timeout
         self.method = method
+        # (entityType, key) -> predicate see getPredicate
+        self.predicateCache = {}
+        # optional persistent result cache see enableCache
+        self.cache = None
+        # datatype aware conversion of result values
+        self.decoder = SparqlJsonDecoder(debug=debug)
+        self.tsvDecoder = SparqlTsvDecoder(self.decoder)
         self.rate_limiter = RateLimiter(
             calls_per_minute=calls_per_minute or 60
         )  # Default 1/sec safe for Wikidata
         # rate limited query call (see issue #165) - built once so the
         # limiter's call budget persists across queries
-        self._rate_limited_query = self.rate_limiter.rate_limited(
-            lambda: self.sparql.query()
-        )
+        # all calls share the budget of _rate_limited_call
+        self._rate_limited_call = self.rate_limiter.rate_limited(lambda call: call())
+        self._rate_limited_query = lambda: self._rate_limited_call(self.sparql.query)
+        # per thread copies of the SPARQLWrapper see getThreadSPARQL
+        self.threadLocal = threading.local()
 
     @classmethod
     def get_user_agent(cls) -> str:
@@ -113,6 +166,36 @@ class SPARQL(object):
             )
         return sparql
 
+    def enableCache(
+        self,
+        ttl: float = 24 * 3600,
+        maxBytes: int = 256 * 1024 * 1024,
+        dbPath: str = None,
+    ) -> SparqlResultCache:
+        """
+        enable the persistent result cache for queryAsListOfDicts -
+        a previously enabled cache is closed
+
+        Args:
+            ttl(float): the time to live of the cached results in seconds
+            maxBytes(int): the maximum size of the cache - least recently used entries are evicted
+            dbPath(str): the path of the SQLite cache file - default: in the StorageConfig cache path
+
+        Returns:
+            SparqlResultCache: the cache
+        """
+        self.disableCache()
+        self.cache = SparqlResultCache(db_path=dbPath, ttl=ttl, max_bytes=maxBytes)
+        return self.cache
+
+    def disableCache(self):
+        """
+        disable and close the persistent result cache
+        """
+        if self.cache is not None:
+            self.cache.close()
+        self.cache = None
+
     def addAuthentication(self, username: str, password: str, method: str = "BASIC"):
         """
         Add Http Authentication credentials to the sparql wrapper
@@ -177,7 +260,8 @@ class SPARQL(object):
         # Wrap the actual HTTP call with rate limiting
         @self.rate_limiter.rate_limited
         def _do_request():
-            return requests.post(
+            return HttpTransport.get_instance(self.url).request(
+                "POST",
                 self.url,
                 data={"query": query},
                 headers=headers,
@@ -192,6 +276,182 @@ class SPARQL(object):
 
         return response.text.strip()
 
+    def post_query_stream(
+        self,
+        query: str,
+        rdf_format: str = "n-triples",
+        timeout: int = 60,
+        chunk_size: int = 64 * 1024,
+    ) -> RdfStreamer:
+        """
+        Fetch the RDF response of a CONSTRUCT query as a stream via direct HTTP POST.
+
+        Args:
+            query: SPARQL CONSTRUCT query
+            rdf_format: RDF format label (e.g. 'n-triples', 'turtle', 'rdf-xml', 'json-ld', 'n3')
+            timeout: timeout in seconds (default: 60)
+            chunk_size: the number of bytes to read at once
+
+        Returns:
+            RdfStreamer: the streamer to write the response to a file or a graph
+
+        Raises:
+            Exception if HTTP request fails
+        """
+        rdf_format = RdfFormat.by_label(rdf_format)
+        headers = {
+            "Accept": rdf_format.mime_type,
+            "User-Agent": SPARQL.get_user_agent(),
+        }
+        transport = HttpTransport.get_instance(self.url)
+        response = self._rate_limited_call(
+            lambda: transport.request(
+                "POST",
+                self.url,
+                data={"query": query},
+                headers=headers,
+                auth=self.getAuth(),
+                stream=True,
+                timeout=timeout,
+            )
+        )
+        if response.status_code != 200:
+            msg = f"HTTP {response.status_code}: {response.text}"
+            response.close()
+            raise Exception(msg)
+
+        def chunks():
+            try:
+                yield from response.iter_content(chunk_size=chunk_size)
+            finally:
+                response.close()
+
+        streamer = RdfStreamer(chunks(), rdf_format)
+        return streamer
+
+    def post_query_to_file(
+        self, query: str, path: str, rdf_format: str = "n-triples", timeout: int = 60
+    ) -> TransferStats:
+        """
+        stream the RDF response of a CONSTRUCT query to the given file
+
+        Args:
+            query: SPARQL CONSTRUCT query
+            path: the path of the file to write
+            rdf_format: RDF format label
+            timeout: timeout in seconds (default: 60)
+
+        Returns:
+            TransferStats: the bytes, seconds and bytes per second of the transfer
+        """
+        streamer = self.post_query_stream(query, rdf_format=rdf_format, timeout=timeout)
+        stats = streamer.to_file(path)
+        if self.debug:
+            print(f"{path}: {stats}")
+        return stats
+
+    def post_query_to_graph(
+        self,
+        query: str,
+        graph: Graph,
+        rdf_format: str = "n-triples",
+        timeout: int = 60,
+    ) -> TransferStats:
+        """
+        stream the RDF response of a CONSTRUCT query into the given rdflib graph
+
+        Args:
+            query: SPARQL CONSTRUCT query
+            graph: the graph to add the triples to
+            rdf_format: RDF format label - n-triples are parsed incrementally
+            timeout: timeout in seconds (default: 60)
+
+        Returns:
+            TransferStats: the bytes, triples, seconds and bytes per second of the transfer
+        """
+        streamer = self.post_query_stream(query, rdf_format=rdf_format, timeout=timeout)
+        stats = streamer.to_graph(graph)
+        if self.debug:
+            print(f"{self.url}: {stats}")
+        return stats
+
+    def shareRateLimit(self, dbPath: str = None):
+        """
+        share the rate budget of my endpoint host with all processes
+        using the same SQLite rate limit file
+
+        Args:
+            dbPath(str): the path of the SQLite file - default: rate_limits.db in the cache directory
+        """
+        key = HttpTransport.get_base_url(self.url)
+        self.rate_limiter.share(dbPath, key=key)
+
+    def getAuth(self):
+        """
+        get the requests authentication matching the credentials of my SPARQLWrapper
+
+        Returns:
+            the requests auth or None if no credentials are set
+        """
+        auth = None
+        if self.sparql.user:
+            if self.sparql.http_auth == "DIGEST":
+                auth = requests.auth.HTTPDigestAuth(
+                    self.sparql.user, self.sparql.passwd
+                )
+            else:
+                auth = requests.auth.HTTPBasicAuth(self.sparql.user, self.sparql.passwd)
+        return auth
+
+    def requestQuery(
+        self,
+        queryString: str,
+        accept: str = "application/sparql-results+json",
+        stream: bool = False,
+        timeout: float = None,
+    ) -> requests.Response:
+        """
+        send the given query via the pooled HttpTransport bypassing SPARQLWrapper
+
+        Args:
+            queryString(str): the SPARQL query to be performed
+            accept(str): the mime type of the requested result format
+            stream(bool): if True the response body is not read in advance
+            timeout(float): the timeout in seconds - default: my timeout
+
+        Returns:
+            requests.Response: the response
+
+        Raises:
+            requests.HTTPError: if the endpoint does not answer with HTTP 200
+        """
+        headers = {"Accept": accept, "User-Agent": SPARQL.get_user_agent()}
+        if self.method == "GET":
+            params = {"query": queryString}
+            data = None
+        else:
+            params = None
+            data = {"query": queryString}
+        transport = HttpTransport.get_instance(self.url)
+        response = self._rate_limited_call(
+            lambda: transport.request(
+                self.method,
+                self.url,
+                params=params,
+                data=data,
+                headers=headers,
+                auth=self.getAuth(),
+                stream=stream,
+                timeout=timeout if timeout is not None else self.timeout,
+            )
+        )
+        if response.status_code != 200:
+            msg = f"HTTP {response.status_code}: {response.text}"
+            response.close()
+            # keeps the response so that callers can check the status_code
+            raise requests.HTTPError(msg, response=response)
+        return response
+
     def rawQuery(self, queryString: str, method=POST):
         """
         query with the given query string
@@ -388,6 +648,542 @@ class SPARQL(object):
                 )
             return errors
 
+    def getThreadSPARQL(self) -> SPARQLWrapper2:
+        """
+        get a copy of my SPARQLWrapper for the current thread since the
+        wrapper keeps the query as state and can not be shared
+        """
+        threadSparql = getattr(self.threadLocal, "sparql", None)
+        if threadSparql is None:
+            threadSparql = copy.deepcopy(self.sparql)
+            self.threadLocal.sparql = threadSparql
+        return threadSparql
+
+    def rawQueryThreadSafe(
+        self, queryString: str, method=POST, rateLimited: bool = True
+    ):
+        """
+        query with the SPARQLWrapper of the current thread
+
+        Args:
+            queryString(str): the SPARQL query to be performed
+            method(str): POST or GET
+            rateLimited(bool): if False the caller is responsible for the rate limit
+
+        Returns:
+            the raw query result
+        """
+        threadSparql = self.getThreadSPARQL()
+        threadSparql.setRequestMethod(URLENCODED)
+        threadSparql.setQuery(self.fix_comments(queryString))
+        threadSparql.method = method
+        if rateLimited:
+            queryResult = self._rate_limited_call(threadSparql.query)
+        else:
+            queryResult = threadSparql.query()
+        return queryResult
+
+    def insertThreadSafe(self, insertCommand: str):
+        """
+        run an insert with the SPARQLWrapper of the current thread
+
+        Args:
+            insertCommand(string): the SPARQL INSERT command
+
+        Returns:
+            tuple: the response and the exception if any
+        """
+        threadSparql = self.getThreadSPARQL()
+        threadSparql.setRequestMethod(POSTDIRECTLY)
+        threadSparql.setQuery(self.fix_comments(insertCommand))
+        threadSparql.method = POST
+        response = None
+        exception = None
+        try:
+            response = self._rate_limited_call(threadSparql.query)
+            # dummy read the body see insert
+            response.response.read()
+        except Exception as ex:
+            exception = ex
+            if self.debug:
+                print(ex)
+        return response, exception
+
+    @staticmethod
+    def isRetryable(ex: Exception) -> bool:
+        """
+        check whether a request that failed with the given exception might
+        succeed when retried: connection errors, timeouts, HTTP 429 (too many
+        requests) and 5xx server errors - not e.g. a 400 for a malformed update
+
+        Args:
+            ex(Exception): the exception of the failed request
+
+        Returns:
+            bool: True if the request should be retried
+        """
+        if isinstance(ex, EndPointInternalError):
+            return True
+        status = None
+        if isinstance(ex, urllib.error.HTTPError):
+            status = ex.code
+        elif isinstance(ex, requests.HTTPError) and ex.response is not None:
+            status = ex.response.status_code
+        if status is not None:
+            return status == 429 or status >= 500
+        retryable = isinstance(
+            ex,
+            (
+                requests.ConnectionError,
+                requests.Timeout,
+                urllib.error.URLError,
+                ConnectionError,
+                TimeoutError,
+            ),
+        )
+        return retryable
+
+    def insertBatchWithRetry(
+        self,
+        listOfDicts,
+        entityType,
+        primaryKey,
+        prefixes,
+        batchIndex: int = 0,
+        maxRetries: int = 3,
+        backoff: float = 1.0,
+    ) -> BatchResult:
+        """
+        insert a batch of records retrying failed attempts with exponential backoff -
+        only failures that are retryable see isRetryable are retried
+
+        Args:
+            listOfDicts(list): the records of the batch
+            entityType(string): the entityType to use as a
+            primaryKey(string): the name of the primary key attribute to use
+            prefixes(string): any PREFIX statements to be used
+            batchIndex(int): the start index of the batch
+            maxRetries(int): the maximum number of retries
+            backoff(float): the initial delay in seconds between retries - doubled for each retry
+
+        Returns:
+            BatchResult: the result of the batch
+        """
+        result = BatchResult(batchIndex=batchIndex)
+        parts = list(
+            self.insertDataGen(
+                listOfDicts, entityType, primaryKey, prefixes, result.errors
+            )
+        )
+        # the header and the footer enclose one part per serialized record
+        result.rows = len(parts) - 2
+        insertCommand = "".join(parts)
+        result.bytes = len(insertCommand.encode("utf-8"))
+        for attempt in range(maxRetries + 1):
+            if attempt > 0:
+                time.sleep(backoff * 2 ** (attempt - 1))
+            result.attempts = attempt + 1
+            attemptStartTime = time.time()
+            response, ex = self.insertThreadSafe(insertCommand)
+            result.latency = time.time() - attemptStartTime
+            if ex is None:
+                result.error = None
+                break
+            result.error = str(ex)
+            if not SPARQL.isRetryable(ex):
+                break
+        return result
+
+    def insertListOfDictsParallel(
+        self,
+        listOfDicts,
+        entityType,
+        primaryKey,
+        prefixes,
+        batchSize: int = 1000,
+        maxWorkers: int = 4,
+        maxRetries: int = 3,
+        backoff: float = 1.0,
+        batchIndices: List[int] = None,
+    ) -> List[BatchResult]:
+        """
+        insert the given list of dicts with up to maxWorkers batches in flight -
+        all requests share my rate limiter
+
+        Args:
+            listOfDicts(list): the records to insert
+            entityType(string): the entityType to use as a
+            primaryKey(string): the name of the primary key attribute to use
+            prefixes(string): any PREFIX statements to be used
+            batchSize(int): number of records to send per request
+            maxWorkers(int): the maximum number of concurrent requests
+            maxRetries(int): the maximum number of retries per batch
+            backoff(float): the initial delay in seconds between retries
+            batchIndices(list): the start indices of the batches to insert e.g. the
+                batchIndex values of the failed BatchResults to resume a load - default: all
+
+        Returns:
+            list: the BatchResults ordered by batchIndex
+        """
+        total = len(listOfDicts)
+        if batchIndices is None:
+            batchIndices = range(0, total, batchSize)
+        startTime = time.time()
+
+        def insertBatch(batchIndex: int) -> BatchResult:
+            result = self.insertBatchWithRetry(
+                listOfDicts[batchIndex : batchIndex + batchSize],
+                entityType,
+                primaryKey,
+                prefixes,
+                batchIndex=batchIndex,
+                maxRetries=maxRetries,
+                backoff=backoff,
+            )
+            if self.profile:
+                status = "ok" if result.ok else f"failed: {result.error}"
+                print(
+                    "%7s for %9d - %9d of %9d %s in %6.1f s (%d attempts) %s"
+                    % (
+                        "batch",
+                        batchIndex + 1,
+                        batchIndex + result.rows,
+                        total,
+                        entityType,
+                        result.latency,
+                        result.attempts,
+                        status,
+                    ),
+                    flush=True,
+                )
+            return result
+
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            results = list(executor.map(insertBatch, batchIndices))
+        if self.profile:
+            rows = sum(result.rows for result in results)
+            print(
+                "insertListOfDictsParallel for %9d records in %6.1f secs"
+                % (rows, time.time() - startTime),
+                flush=True,
+            )
+        return results
+
+    def getPredicate(self, entityType: str, key: str) -> str:
+        """
+        get the (cached) predicate for the given entityType and key
+
+        Args:
+            entityType(str): the entityType
+            key(str): the key of the record
+
+        Returns:
+            str: the predicate
+        """
+        cacheKey = (entityType, key)
+        predicate = self.predicateCache.get(cacheKey)
+        if predicate is None:
+            predicate = f"{entityType}_{self.getLocalName(key)}"
+            self.predicateCache[cacheKey] = predicate
+        return predicate
+
+    def getObjectFormatters(self) -> dict:
+        """
+        get the functions to format the values of records as
+        SPARQL objects by python type
+
+        Returns:
+            dict: the formatter function by type
+        """
+        if self.typedLiterals:
+            formatInt = (
+                lambda value: '"%d"^^<http://www.w3.org/2001/XMLSchema#integer>' % value
+            )
+            formatFloat = (
+                lambda value: '"%s"^^<http://www.w3.org/2001/XMLSchema#decimal>' % value
+            )
+        else:
+            formatInt = str
+            formatFloat = str
+        formatters = {
+            str: lambda value: '"%s"' % value.translate(SPARQL.controlEscapeTable),
+            int: formatInt,
+            float: formatFloat,
+            bool: str,
+            datetime.date: lambda value: '"%s"^^<http://www.w3.org/2001/XMLSchema#date>'
+            % value,
+            datetime.datetime: lambda value: '"%s"^^<http://www.w3.org/2001/XMLSchema#dateTime>'
+            % value,
+        }
+        return formatters
+
+    def recordTriplesGen(
+        self,
+        listOfDicts,
+        entityType,
+        primaryKey,
+        formatters: dict,
+        errors: list,
+    ):
+        """
+        generate the subject and the (predicate, object) tuples for each
+        valid record of the given listOfDicts
+
+        Args:
+            listOfDicts(list): the records to convert
+            entityType(string): the entityType to use as a
+            primaryKey(string): the name of the primary key attribute to use
+            formatters(dict): the object formatter function by python type
+            errors(list): list to append the errors to
+
+        Yields:
+            tuple: the subject and the list of (predicate, object) tuples of a record
+        """
+        for index, record in enumerate(listOfDicts):
+            if not primaryKey in record:
+                errors.append(f"missing primary key {primaryKey} in record {index}")
+                continue
+            primaryValue = record[primaryKey]
+            if primaryValue is None:
+                errors.append(
+                    f"primary key {primaryKey} value is None in record {index}"
+                )
+                continue
+            encodedPrimaryValue = self.getLocalName(primaryValue)
+            tSubject = f"{entityType}__{encodedPrimaryValue}"
+            predicateObjects = []
+            for key, value in record.items():
+                valueType = type(value)
+                if self.debug:
+                    print("%s(%s)=%s" % (key, valueType, value))
+                formatter = formatters.get(valueType)
+                if formatter is None:
+                    errors.append(
+                        "can't handle type %s in record %d" % (valueType, index)
+                    )
+                    continue
+                tPredicate = self.getPredicate(entityType, key)
+                predicateObjects.append((tPredicate, formatter(value)))
+            yield tSubject, predicateObjects
+
+    def insertDataGen(
+        self,
+        listOfDicts,
+        entityType,
+        primaryKey,
+        prefixes,
+        errors: list = None,
+    ):
+        """
+        generate the INSERT DATA payload for the given listOfDicts
+        as a stream of string parts - one part per record
+
+        Args:
+            listOfDicts(list): the records to insert
+            entityType(string): the entityType to use as a
+            primaryKey(string): the name of the primary key attribute to use
+            prefixes(string): any PREFIX statements to be used
+            errors(list): list to append the errors to (if any)
+
+        Yields:
+            str: the parts of the INSERT DATA command
+        """
+        if errors is None:
+            errors = []
+        formatters = self.getObjectFormatters()
+        rdfprefix = "PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\n"
+        yield f"{rdfprefix}{prefixes}\nINSERT DATA {{\n"
+        for tSubject, predicateObjects in self.recordTriplesGen(
+            listOfDicts, entityType, primaryKey, formatters, errors
+        ):
+            lines = [f'  {tSubject} rdf:type "{entityType}".\n']
+            for tPredicate, tObject in predicateObjects:
+                lines.append(f"  {tSubject} {tPredicate} {tObject}.\n")
+            yield "".join(lines)
+        yield "\n}"
+
+    @staticmethod
+    def getPrefixMap(prefixes: str) -> dict:
+        """
+        get the namespaces of the given PREFIX declarations
+
+        Args:
+            prefixes(str): PREFIX declarations e.g. PREFIX foaf: <http://xmlns.com/foaf/0.1/>
+
+        Returns:
+            dict: the namespace IRI by prefix
+        """
+        prefixMap = dict(re.findall(r"PREFIX\s+([\w-]*):\s*<([^>]*)>", prefixes, re.I))
+        return prefixMap
+
+    def getNTriplesFormatters(self) -> dict:
+        """
+        get the functions to format the values of records as N-Triples
+        literals by python type - the datatypes are the ones of the
+        typed literals of INSERT DATA
+
+        Returns:
+            dict: the formatter function by type
+        """
+        xsd = "http://www.w3.org/2001/XMLSchema#"
+        formatters = {
+            str: lambda value: '"%s"' % value.translate(SPARQL.nTriplesEscapeTable),
+            int: lambda value: f'"{value}"^^<{xsd}integer>',
+            float: lambda value: f'"{value}"^^<{xsd}decimal>',
+            bool: lambda value: f'"{str(value).lower()}"^^<{xsd}boolean>',
+            datetime.date: lambda value: f'"{value.isoformat()}"^^<{xsd}date>',
+            datetime.datetime: lambda value: f'"{value.isoformat()}"^^<{xsd}dateTime>',
+        }
+        return formatters
+
+    def nTriplesGen(
+        self,
+        listOfDicts,
+        entityType,
+        primaryKey,
+        prefixes,
+        errors: list = None,
+    ):
+        """
+        generate N-Triples for the given listOfDicts with the type mapping
+        of insertListOfDicts - one string part per record
+
+        Args:
+            listOfDicts(list): the records to convert
+            entityType(string): the prefixed entityType e.g. foaf:Person
+            primaryKey(string): the name of the primary key attribute to use
+            prefixes(string): the PREFIX declarations to expand the prefixed names with
+            errors(list): list to append the errors to (if any)
+
+        Yields:
+            str: the N-Triples lines of a record
+        """
+        if errors is None:
+            errors = []
+        prefixMap = self.getPrefixMap(prefixes)
+        prefix, _sep, _local = entityType.partition(":")
+        if prefix not in prefixMap:
+            raise Exception(
+                f"N-Triples need full IRIs - the prefix of {entityType} is not declared in {prefixes}"
+            )
+        namespace = prefixMap[prefix]
+        rdfType = "<http://www.w3.org/1999/02/22-rdf-syntax-ns#type>"
+        typeObject = '"%s"' % entityType.translate(SPARQL.nTriplesEscapeTable)
+        iris = {}
+        for tSubject, predicateObjects in self.recordTriplesGen(
+            listOfDicts, entityType, primaryKey, self.getNTriplesFormatters(), errors
+        ):
+            subject = f"<{namespace}{tSubject[len(prefix) + 1:]}>"
+            lines = [f"{subject} {rdfType} {typeObject} .\n"]
+            for tPredicate, tObject in predicateObjects:
+                predicate = iris.get(tPredicate)
+                if predicate is None:
+                    predicate = f"<{namespace}{tPredicate[len(prefix) + 1:]}>"
+                    iris[tPredicate] = predicate
+                lines.append(f"{subject} {predicate} {tObject} .\n")
+            yield "".join(lines)
+
+    def getGraphStoreUrl(self) -> str:
+        """
+        get the Graph Store HTTP Protocol url derived from my url e.g.
+        http://localhost:3030/ds/query -> http://localhost:3030/ds/data
+        """
+        url = re.sub(r"/(query|update|sparql)/?$", "", self.url)
+        graphStoreUrl = f"{url}/data"
+        return graphStoreUrl
+
+    def uploadListOfDicts(
+        self,
+        listOfDicts,
+        entityType,
+        primaryKey,
+        prefixes,
+        graphStoreUrl: str = None,
+        graph: str = None,
+        method: str = "POST",
+        rdf_format: str = "n-triples",
+        batchSize: int = 10000,
+        timeout: float = 60,
+    ) -> List[BatchResult]:
+        """
+        upload the given list of dicts as chunks of N-Triples via the
+        SPARQL 1.1 Graph Store HTTP Protocol which is much faster than
+        INSERT DATA for large loads
+
+        Args:
+            listOfDicts(list): the records to upload
+            entityType(string): the prefixed entityType e.g. foaf:Person
+            primaryKey(string): the name of the primary key attribute to use
+            prefixes(string): the PREFIX declarations to expand the prefixed names with
+            graphStoreUrl(str): the Graph Store endpoint - default: derived from my url
+            graph(str): the IRI of the named graph - default: the default graph
+            method(str): POST to add to the graph or PUT to replace its content
+            rdf_format(str): n-triples or turtle (N-Triples are valid Turtle)
+            batchSize(int): the number of records per request
+            timeout(float): the timeout in seconds per request
+
+        Returns:
+            list: the BatchResults of the chunks
+        """
+        rdf_format = RdfFormat.by_label(rdf_format)
+        if rdf_format not in (RdfFormat.N_TRIPLES, RdfFormat.TURTLE):
+            raise ValueError(f"upload of {rdf_format.label} is not supported")
+        if graphStoreUrl is None:
+            graphStoreUrl = self.getGraphStoreUrl()
+        params = {"graph": graph} if graph else {"default": ""}
+        headers = {
+            "Content-Type": f"{rdf_format.mime_type}; charset=utf-8",
+            "User-Agent": SPARQL.get_user_agent(),
+        }
+        auth = self.getAuth()
+        total = len(listOfDicts)
+        startTime = time.time()
+        results = []
+        for batchIndex in range(0, total, batchSize):
+            batch = listOfDicts[batchIndex : batchIndex + batchSize]
+            result = BatchResult(batchIndex=batchIndex, rows=len(batch))
+            body = "".join(
+                self.nTriplesGen(batch, entityType, primaryKey, prefixes, result.errors)
+            ).encode("utf-8")
+            result.bytes = len(body)
+            # PUT replaces the graph - only the first chunk may do so
+            batchMethod = method.upper() if batchIndex == 0 else "POST"
+            result.attempts = 1
+            batchStartTime = time.time()
+            try:
+                response = self._rate_limited_call(
+                    lambda: HttpTransport.get_instance(graphStoreUrl).request(
+                        batchMethod,
+                        graphStoreUrl,
+                        params=params,
+                        data=body,
+                        headers=headers,
+                        auth=auth,
+                        timeout=timeout,
+                    )
+                )
+                if response.status_code not in (200, 201, 204):
+                    result.error = f"HTTP {response.status_code}: {response.text}"
+            except Exception as ex:
+                result.error = str(ex)
+            result.latency = time.time() - batchStartTime
+            if self.profile:
+                print(
+                    "%7s for %9d - %9d of %9d %s in %6.1f s -> %6.1f s"
+                    % (
+                        "upload",
+                        batchIndex + 1,
+                        batchIndex + result.rows,
+                        total,
+                        entityType,
+                        result.latency,
+                        time.time() - startTime,
+                    ),
+                    flush=True,
+                )
+            results.append(result)
+        return results
+
     def insertListOfDictsBatch(
         self,
         listOfDicts,
@@ -421,79 +1217,15 @@ class SPARQL(object):
         batchStartTime = time.time()
         if startTime is None:
             startTime = batchStartTime
-        rdfprefix = "PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>\n"
-        insertCommand = f"{rdfprefix}{prefixes}\nINSERT DATA {{\n"
-        for index, record in enumerate(listOfDicts):
-            if not primaryKey in record:
-                errors.append(f"missing primary key {primaryKey} in record {index}")
-            else:
-                primaryValue = record[primaryKey]
-                if primaryValue is None:
-                    errors.append(
-                        f"primary key {primaryKey} value is None in record {index}"
-                    )
-                else:
-                    encodedPrimaryValue = self.getLocalName(primaryValue)
-                    tSubject = f"{entityType}__{encodedPrimaryValue}"
-                    insertCommand += f'  {tSubject} rdf:type "{entityType}".\n'
-                    for keyValue in record.items():
-                        key, value = keyValue
-                        # convert key if necessary
-                        key = self.getLocalName(key)
-                        valueType = type(value)
-                        if self.debug:
-                            print("%s(%s)=%s" % (key, valueType, value))
-                        tPredicate = f"{entityType}_{key}"
-                        tObject = value
-                        if valueType == str:
-                            escapedString = self.controlEscape(value)
-                            tObject = '"%s"' % escapedString
-                        elif valueType == int:
-                            if self.typedLiterals:
-                                tObject = (
-                                    '"%d"^^<http://www.w3.org/2001/XMLSchema#integer>'
-                                    % value
-                                )
-                            pass
-                        elif valueType == float:
-                            if self.typedLiterals:
-                                tObject = (
-                                    '"%s"^^<http://www.w3.org/2001/XMLSchema#decimal>'
-                                    % value
-                                )
-                            pass
-                        elif valueType == bool:
-                            pass
-                        elif valueType == datetime.date:
-                            # if self.typedLiterals:
-                            tObject = (
-                                '"%s"^^<http://www.w3.org/2001/XMLSchema#date>' % value
-                            )
-                            pass
-                        elif valueType == datetime.datetime:
-                            tObject = (
-                                '"%s"^^<http://www.w3.org/2001/XMLSchema#dateTime>'
-                                % value
-                            )
-                            pass
-                        else:
-                            errors.append(
-                                "can't handle type %s in record %d" % (valueType, index)
-                            )
-                            tObject = None
-                        if tObject is not None:
-                            insertRecord = "  %s %s %s.\n" % (
-                                tSubject,
-                                tPredicate,
-                                tObject,
-                            )
-                            insertCommand += insertRecord
-        insertCommand += "\n}"
+        # linear time - the payload parts are joined once
+        insertCommand = "".join(
+            self.insertDataGen(listOfDicts, entityType, primaryKey, prefixes, errors)
+        )
         if self.debug:
             print(insertCommand, flush=True)
         response, ex = self.insert(insertCommand)
         if response is None and ex is not None:
-            errors.append("%s for record %d" % (str(ex), index))
+            errors.append("%s for record %d" % (str(ex), size - 1))
         if self.profile:
             print(
                 "%7s for %9d - %9d of %9d %s in %6.1f s -> %6.1f s"
@@ -511,25 +1243,36 @@ class SPARQL(object):
         return errors
 
     controlChars = [chr(c) for c in range(0x20)]
+    # translation table escaping control characters and double quotes
+    controlEscapeTable = str.maketrans(
+        {
+            **{c: c.encode("unicode_escape").decode("ascii") for c in controlChars},
+            '"': '\\"',
+        }
+    )
+
+    # N-Triples string escapes see https://www.w3.org/TR/n-triples/#grammar-production-ECHAR
+    nTriplesEscapeTable = str.maketrans(
+        {
+            **{c: "\\u%04X" % ord(c) for c in controlChars},
+            "\t": "\\t",
+            "\b": "\\b",
+            "\n": "\\n",
+            "\r": "\\r",
+            "\f": "\\f",
+            '"': '\\"',
+            "\\": "\\\\",
+        }
+    )
 
     @staticmethod
     def controlEscape(s):
         """
-        escape control characters
+        escape control characters and double quotes
 
         see https://stackoverflow.com/a/9778992/1497139
         """
-        escaped = "".join(
-            [
-                (
-                    c.encode("unicode_escape").decode("ascii")
-                    if c in SPARQL.controlChars
-                    else c
-                )
-                for c in s
-            ]
-        )
-        escaped = escaped.replace('"', '\\"')
+        escaped = s.translate(SPARQL.controlEscapeTable)
         return escaped
 
     def query(self, queryString, method=POST):
@@ -546,6 +1289,18 @@ class SPARQL(object):
         queryResult = self.rawQuery(queryString, method=method)
         if self.debug:
             print(queryString)
+        return self.getBindings(queryResult)
+
+    def getBindings(self, queryResult):
+        """
+        get the bindings of the given raw query result
+
+        Args:
+            queryResult: the raw query result
+
+        Returns:
+            list: list of bindings
+        """
         if hasattr(queryResult, "info"):
             if "content-type" in queryResult.info():
                 ct = queryResult.info()["content-type"]
@@ -563,6 +1318,11 @@ class SPARQL(object):
         fixNone: bool = False,
         sampleCount: int = None,
         param_dict: dict = None,
+        fast: bool = False,
+        resultFormat: str = "json",
+        output: List[Param] = None,
+        pageSize: int = None,
+        maxWorkers: int = 4,
     ):
         """
         Get a list of dicts for the given query (to allow round-trip results for insertListOfDicts)
@@ -572,6 +1332,11 @@ class SPARQL(object):
             fixNone (bool): if True add None values for empty columns in Dict
             sampleCount (int): the number of samples to check
             param_dict (dict): dictionary of parameter names and values to be applied to the query
+            fast (bool): if True decode the raw JSON result with orjson bypassing SPARQLWrapper
+            resultFormat (str): json, tsv or csv - tsv and csv are requested and decoded directly
+            output (list): the output Params of the query e.g. Query.output to type tsv/csv values
+            pageSize (int): if set fetch the result in pages of pageSize rows see SparqlPaginator
+            maxWorkers (int): the number of pages fetched concurrently in paged mode
 
         Returns:
             list: a list of Dicts
@@ -581,12 +1346,148 @@ class SPARQL(object):
         """
         params = Params(queryString)
         queryString = params.apply_parameters_with_check(param_dict)
+        variant = f"fixNone={fixNone},sampleCount={sampleCount}"
+        if resultFormat != "json":
+            outputTypes = [(param.name, param.type) for param in output or []]
+            variant += f",resultFormat={resultFormat},output={outputTypes}"
+        if self.cache is not None:
+            listOfDicts = self.cache.get(self.url, queryString, variant)
+            if listOfDicts is not None:
+                return listOfDicts
+
+        if pageSize:
+            paginator = SparqlPaginator(
+                self,
+                page_size=pageSize,
+                max_workers=maxWorkers,
+                result_format=resultFormat,
+                output=output,
+            )
+            listOfDicts = list(paginator.query_gen(queryString))
+            if fixNone:
+                fields = LOD.getFields(listOfDicts, sampleCount)
+                LOD.setNone4List(listOfDicts, fields)
+        elif resultFormat != "json":
+            mimeType = SparqlTsvDecoder.get_mime_type(resultFormat)
+            response = self.requestQuery(queryString, accept=mimeType)
+            listOfDicts = self.tsvDecoder.decode(
+                response.content,
+                result_format=resultFormat,
+                output=output,
+                fixNone=fixNone,
+                sampleCount=sampleCount,
+            )
+        elif fast:
+            response = self.requestQuery(queryString)
+            listOfDicts = self.decoder.decode(
+                response.content, fixNone=fixNone, sampleCount=sampleCount
+            )
+        else:
+            records = self.query(queryString, method=self.method)
+            listOfDicts = self.asListOfDicts(
+                records, fixNone=fixNone, sampleCount=sampleCount
+            )
+        if self.cache is not None:
+            self.cache.put(self.url, queryString, listOfDicts, variant)
+        return listOfDicts
+
+    def queryAsListOfDictsBatch(
+        self,
+        queryString: str,
+        paramDicts: List[dict],
+        fixNone: bool = False,
+        batchSize: int = 100,
+        targetSeconds: float = 5.0,
+        paramList: List[Param] = None,
+    ) -> List[List[dict]]:
+        """
+        run the given parameterized query for each of the given param dicts
+        with one request per batch via a VALUES block see SparqlValuesBatcher
 
-        records = self.query(queryString, method=self.method)
-        listOfDicts = self.asListOfDicts(
-            records, fixNone=fixNone, sampleCount=sampleCount
+        Args:
+            queryString (str): the SPARQL query with {{ param }} placeholders
+            paramDicts (list): one dictionary of parameter names and values per input
+            fixNone (bool): if True add None values for empty columns in Dict
+            batchSize (int): the size of the first batch - later batches adapt to the response time
+            targetSeconds (float): the response time per batch to aim for
+            paramList (list): Param definitions with default values for missing parameters
+
+        Returns:
+            list: the list of dicts per param dict in the order of the param dicts
+        """
+        batcher = SparqlValuesBatcher(
+            self,
+            batch_size=batchSize,
+            target_seconds=targetSeconds,
+            param_list=paramList,
         )
-        return listOfDicts
+        results = batcher.query_batches(queryString, paramDicts, fixNone=fixNone)
+        return results
+
+    def query_gen(
+        self,
+        sql: str,
+        params: dict = None,
+        row_format: Union[str, RowFormat] = "dict",
+        fetch_size: int = 1000,
+    ) -> Generator[Any, None, None]:
+        """
+        Execute a SPARQL SELECT query and yield the results one row at a time
+        while the JSON result document is still being received - same contract
+        as the query_gen of the SQL backends
+
+        Args:
+            sql (str): the SPARQL query to execute
+            params (dict): dictionary of parameter names and values to be applied to the query
+            row_format: dict, tuple, namedtuple or slots
+            fetch_size (int): the approximate number of rows to read from the HTTP stream at once
+
+        Yields:
+            one dict (or row in the given row_format) per result binding - unbound
+            variables are missing in dicts and None in the other row formats
+
+        Raises:
+            ValueError: if the result has no head vars and the row_format is not dict
+
+        Note:
+            if the head of the result follows the bindings the rows of the other
+            row formats can only be converted at the end of the document
+        """
+        query = Params(sql).apply_parameters_with_check(params)
+        row_format = RowFormat.of(row_format)
+        parser = SparqlJsonStreamParser()
+        decode_binding = self.decoder.decode_binding
+        convert = None
+        # records received before the head vars are known
+        pending = []
+        # a JSON binding typically takes a few hundred bytes
+        chunk_size = max(fetch_size, 1) * 256
+        response = self.requestQuery(query, stream=True)
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
+                for binding in parser.feed(chunk):
+                    record = decode_binding(binding)
+                    if row_format == RowFormat.DICT:
+                        yield record
+                        continue
+                    if convert is None:
+                        if parser.vars is None:
+                            pending.append(record)
+                            continue
+                        columns = parser.vars
+                        convert = RowFactory(columns, row_format).convert
+                    yield convert(tuple(record.get(column) for column in columns))
+        finally:
+            response.close()
+        if pending:
+            if parser.vars is None:
+                raise ValueError(
+                    f"SPARQL JSON result without head vars can not be returned as {row_format.value} rows"
+                )
+            columns = parser.vars
+            convert = RowFactory(columns, row_format).convert
+            for record in pending:
+                yield convert(tuple(record.get(column) for column in columns))
 
     @staticmethod
     def strToDatetime(value, debug=False):
@@ -597,15 +1498,7 @@ class SPARQL(object):
         Returns:
             datetime: the datetime
         """
-        dateFormat = "%Y-%m-%d %H:%M:%S.%f"
-        if "T" in value and "Z" in value:
-            dateFormat = "%Y-%m-%dT%H:%M:%SZ"
-        dt = None
-        try:
-            dt = datetime.datetime.strptime(value, dateFormat)
-        except ValueError as ve:
-            if debug:
-                print(str(ve))
+        dt = SparqlJsonDecoder.str_to_datetime(value, debug=debug)
         return dt
 
     def asListOfDicts(self, records, fixNone: bool = False, sampleCount: int = None):
@@ -624,30 +1517,11 @@ class SPARQL(object):
         fields = None
         if fixNone:
             fields = LOD.getFields(records, sampleCount)
+        convert = self.decoder.convert
         for record in records:
             resultDict = {}
-            for keyValue in record.items():
-                key, value = keyValue
-                datatype = value.datatype
-                if datatype is not None:
-                    if datatype == "http://www.w3.org/2001/XMLSchema#integer":
-                        resultValue = int(value.value)
-                    elif datatype == "http://www.w3.org/2001/XMLSchema#decimal":
-                        resultValue = float(value.value)
-                    elif datatype == "http://www.w3.org/2001/XMLSchema#boolean":
-                        resultValue = value.value in ["TRUE", "true"]
-                    elif datatype == "http://www.w3.org/2001/XMLSchema#date":
-                        dt = datetime.datetime.strptime(value.value, "%Y-%m-%d")
-                        resultValue = dt.date()
-                    elif datatype == "http://www.w3.org/2001/XMLSchema#dateTime":
-                        dt = SPARQL.strToDatetime(value.value, debug=self.debug)
-                        resultValue = dt
-                    else:
-                        # unsupported datatype
-                        resultValue = value.value
-                else:
-                    resultValue = value.value
-                resultDict[key] = resultValue
+            for key, value in record.items():
+                resultDict[key] = convert(value.value, value.datatype)
             if fixNone:
                 for field in fields:
                     if not field in resultDict:
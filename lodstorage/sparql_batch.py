@@ -0,0 +1,290 @@
+"""
+sparql_batch.py
+
+batched execution of a parameterized SPARQL query for many parameter
+dicts - the parameter values are folded into a VALUES block so that a
+batch needs a single round trip
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import re
+import socket
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import requests
+from SPARQLWrapper.SPARQLExceptions import EndPointInternalError
+
+from lodstorage.lod import LOD
+from lodstorage.params import Param, Params
+from lodstorage.sparql_paginator import SparqlPaginator
+
+
+class SparqlValuesBatcher:
+    """
+    run a query with {{ param }} placeholders for a list of parameter dicts
+    in batches whose size adapts to the observed response time
+
+    placeholders with the same value for all inputs are substituted as text
+    e.g. for wikibase:language "{{ lang }}" - only the varying ones are
+    turned into VALUES variables
+    """
+
+    INDEX_VAR = "__index"
+    # a placeholder with the rest of the RDF term it is part of e.g. wd:{{ qid }} or "{{ name }}"@en
+    TERM_RE = re.compile(
+        r"(<[^\s<>\"{}]*|[\"']|[\w.-]*:|)"
+        r"\{\{\s*(\w+)\s*\}\}"
+        r"(>|[\"'](?:@[\w-]+|\^\^(?:<[^\s<>]*>|[\w-]*:[\w-]*))?|[\w.:-]*)"
+    )
+    SELECT_RE = re.compile(r"\bSELECT\s+(?:DISTINCT\s+|REDUCED\s+)?", re.I)
+    GROUP_BY_RE = re.compile(r"\bGROUP\s+BY\s+", re.I)
+    AGGREGATE_RE = re.compile(
+        r"\b(?:COUNT|SUM|MIN|MAX|AVG|SAMPLE|GROUP_CONCAT)\s*\(", re.I
+    )
+
+    def __init__(
+        self,
+        sparql,
+        batch_size: int = 100,
+        min_batch_size: int = 1,
+        max_batch_size: int = 5000,
+        target_seconds: float = 5.0,
+        param_list: Optional[List[Param]] = None,
+        with_audit: bool = True,
+    ):
+        """
+        constructor
+
+        Args:
+            sparql (SPARQL): the SPARQL access to use
+            batch_size (int): the size of the first batch
+            min_batch_size (int): the smallest batch size - failing batches are halved down to it
+            max_batch_size (int): the largest batch size
+            target_seconds (float): the response time per batch to aim for
+            param_list (list): Param definitions with default values for missing parameters
+            with_audit (bool): if True audit the parameter values for illegal characters
+        """
+        self.sparql = sparql
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_seconds = target_seconds
+        self.param_list = param_list
+        self.with_audit = with_audit
+        # (batch size, seconds) of the executed batches
+        self.batches: List[Tuple[int, float]] = []
+
+    def prepare(self, query: str) -> Tuple[str, List[Tuple[str, str, str]]]:
+        """
+        replace the RDF terms containing placeholders by variables
+
+        Args:
+            query (str): the parameterized query
+
+        Returns:
+            tuple: the query with variables and the (prefix, param, suffix) term templates in variable order
+        """
+        if len(self.SELECT_RE.findall(query)) != 1:
+            raise ValueError("VALUES batching needs a SELECT query without subqueries")
+        terms: List[Tuple[str, str, str]] = []
+
+        def replace(match) -> str:
+            prefix, name, suffix = match.groups()
+            # an RDF term can not end with a dot - it ends the triple
+            stripped = suffix.rstrip(".")
+            tail = suffix[len(stripped) :]
+            suffix = stripped
+            if (prefix + suffix).count('"') % 2 or (prefix + suffix).count("'") % 2:
+                raise ValueError(
+                    f"placeholder {{{{ {name} }}}} must be a complete RDF term for VALUES batching"
+                )
+            term = (prefix, name, suffix)
+            if term not in terms:
+                terms.append(term)
+            return f"?__{name}_{terms.index(term)}{tail}"
+
+        query = self.TERM_RE.sub(replace, query)
+        return query, terms
+
+    def get_batch_query(
+        self,
+        query: str,
+        terms: List[Tuple[str, str, str]],
+        batch: List[Tuple[int, Dict[str, Any]]],
+    ) -> str:
+        """
+        get the query for the given batch of indexed parameter dicts
+
+        Args:
+            query (str): the prepared query
+            terms (list): the term templates of the prepared query
+            batch (list): (index, param dict) tuples
+
+        Returns:
+            str: the query with the VALUES block and the projected index variable
+        """
+        variables = [f"?{self.INDEX_VAR}"] + [
+            f"?__{name}_{i}" for i, (_prefix, name, _suffix) in enumerate(terms)
+        ]
+        rows = []
+        for index, param_dict in batch:
+            values = [str(index)] + [
+                f"{prefix}{param_dict[name]}{suffix}" for prefix, name, suffix in terms
+            ]
+            rows.append(f"  ({' '.join(values)})")
+        values_block = f"VALUES ({' '.join(variables)}) {{\n" + "\n".join(rows) + "\n}"
+        select_match = self.SELECT_RE.search(query)
+        group_start = query.index("{", select_match.end())
+        has_aggregate = bool(
+            self.AGGREGATE_RE.search(query[select_match.end() : group_start])
+        )
+        query = f"{query[:group_start + 1]}\n{values_block}{query[group_start + 1:]}"
+        if not query[select_match.end() :].lstrip().startswith("*"):
+            query = f"{query[:select_match.end()]}?{self.INDEX_VAR} {query[select_match.end():]}"
+        group_by_match = self.GROUP_BY_RE.search(query)
+        if group_by_match:
+            query = f"{query[:group_by_match.end()]}?{self.INDEX_VAR} {query[group_by_match.end():]}"
+        elif has_aggregate:
+            # an aggregate needs a group per input
+            end = query.rindex("}") + 1
+            query = f"{query[:end]}\nGROUP BY ?{self.INDEX_VAR}{query[end:]}"
+        return query
+
+    def get_variables(self, terms: List[Tuple[str, str, str]]) -> Set[str]:
+        """
+        get the names of the variables added for the given term templates
+        """
+        variables = {self.INDEX_VAR}
+        for i, (_prefix, name, _suffix) in enumerate(terms):
+            variables.add(f"__{name}_{i}")
+        return variables
+
+    @staticmethod
+    def get_constants(
+        names: List[str], param_dicts: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """
+        get the parameters with the same value for all given param dicts
+
+        Args:
+            names (list): the names of the parameters
+            param_dicts (list): the param dicts
+
+        Returns:
+            dict: the constant values by parameter name
+        """
+        constants = {}
+        if param_dicts:
+            for name in names:
+                value = param_dicts[0][name]
+                if all(pd[name] == value for pd in param_dicts[1:]):
+                    constants[name] = value
+        return constants
+
+    @staticmethod
+    def is_retryable(ex: Exception) -> bool:
+        """
+        check whether a failed batch might succeed in smaller batches
+        i.e. the request timed out or the endpoint failed with a 5xx status
+
+        Args:
+            ex (Exception): the exception of the failed batch
+        """
+        if isinstance(ex, (requests.Timeout, socket.timeout, EndPointInternalError)):
+            return True
+        response = getattr(ex, "response", None)
+        status = getattr(response, "status_code", None) or getattr(ex, "code", None)
+        retryable = isinstance(status, int) and status >= 500
+        return retryable
+
+    def get_param_dict(self, params: Params, param_dict: Dict[str, Any]) -> Dict:
+        """
+        complete the given param dict by the default values and audit it
+        """
+        merged = {}
+        for param in self.param_list or []:
+            if param.default_value is not None:
+                merged[param.name] = param.default_value
+        merged.update(param_dict)
+        missing = [name for name in params.params if name not in merged]
+        if missing:
+            raise Exception(f"missing parameter(s): {', '.join(missing)}")
+        if self.with_audit:
+            params.set(merged)
+            params.audit()
+        return merged
+
+    def adapt(self, size: int, elapsed: float):
+        """
+        adapt the batch size to the observed response time of a batch
+        """
+        self.batches.append((size, elapsed))
+        if elapsed <= 0:
+            return
+        ideal = self.target_seconds * size / elapsed
+        # smooth the estimate and grow at most by doubling
+        new_size = min((self.batch_size + ideal) / 2, self.batch_size * 2)
+        self.batch_size = int(
+            max(self.min_batch_size, min(self.max_batch_size, new_size))
+        )
+
+    def query_batches(
+        self, query: str, param_dicts: List[Dict[str, Any]], fixNone: bool = False
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        run the given query for all given parameter dicts
+
+        Args:
+            query (str): the query with {{ param }} placeholders
+            param_dicts (list): one dict of parameter values per input
+            fixNone (bool): if True add None values for empty columns in Dict
+
+        Returns:
+            list: the list of dicts per input in the order of the inputs
+        """
+        params = Params(query)
+        param_dicts = [self.get_param_dict(params, pd) for pd in param_dicts]
+        constants = self.get_constants(sorted(set(params.params)), param_dicts)
+        if constants:
+            # already audited by get_param_dict
+            constant_params = Params(query, with_audit=False)
+            constant_params.set(constants)
+            query = constant_params.apply_parameters()
+        base_query, limit, offset = SparqlPaginator.split(query)
+        prepared, terms = self.prepare(base_query)
+        variables = self.get_variables(terms)
+        results: List[List[Dict[str, Any]]] = [[] for _pd in param_dicts]
+        pos = 0
+        while pos < len(param_dicts):
+            end = min(pos + self.batch_size, len(param_dicts))
+            batch = [(index, param_dicts[index]) for index in range(pos, end)]
+            batch_query = self.get_batch_query(prepared, terms, batch)
+            start = time.perf_counter()
+            try:
+                lod = self.sparql.queryAsListOfDicts(batch_query, fast=True)
+            except Exception as ex:
+                if self.batch_size <= self.min_batch_size or not self.is_retryable(ex):
+                    raise
+                # e.g. a timeout - retry with a smaller batch
+                self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+                continue
+            self.adapt(len(batch), time.perf_counter() - start)
+            for row in lod:
+                index = int(row[self.INDEX_VAR])
+                # e.g. SELECT * projects the VALUES variables
+                for variable in variables.intersection(row):
+                    del row[variable]
+                results[index].append(row)
+            pos += len(batch)
+        if limit is not None or offset:
+            end = None if limit is None else offset + limit
+            results = [rows[offset:end] for rows in results]
+        if fixNone:
+            all_rows = [row for rows in results for row in rows]
+            fields = LOD.getFields(all_rows)
+            LOD.setNone4List(all_rows, fields)
+        return results
@@ -0,0 +1,267 @@
+"""
+sparql_cache.py
+
+persistent SPARQL result cache stored in a SQLite file - the results
+are stored as JSON so that reading a cache file can not execute code
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from lodstorage.storageconfig import StorageConfig
+
+
+class SparqlResultCache:
+    """
+    cache for the results of SPARQL queries keyed by the endpoint url
+    and the normalized query text - entries expire after ttl seconds and
+    the least recently used entries are evicted beyond max_bytes
+
+    The results are stored as JSON with date and datetime values encoded
+    as {"$date": isoformat} and {"$datetime": isoformat} - results with
+    other non JSON values are not cached.
+
+    Example:
+
+    .. code-block:: python
+
+        with SparqlResultCache(db_path) as cache:
+            lod = cache.get(endpoint, query)
+    """
+
+    def __init__(
+        self,
+        db_path: str = None,
+        ttl: float = 24 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        """
+        constructor
+
+        Args:
+            db_path (str): the path of the SQLite cache file - default: sparql_cache.db in the StorageConfig cache path
+            ttl (float): the time to live of an entry in seconds
+            max_bytes (int): the maximum total size of the cached results
+        """
+        if db_path is None:
+            cache_path = StorageConfig.getDefault().getCachePath()
+            db_path = os.path.join(cache_path, "sparql_cache.db")
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("""CREATE TABLE IF NOT EXISTS sparql_cache (
+  key TEXT PRIMARY KEY,
+  endpoint TEXT,
+  query TEXT,
+  created REAL,
+  accessed REAL,
+  hits INTEGER,
+  size INTEGER,
+  result TEXT
+)""")
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sparql_cache_accessed ON sparql_cache(accessed)"
+        )
+        self.connection.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def encode_value(value: Any) -> Dict[str, str]:
+        """
+        json.dumps default hook encoding date and datetime values
+
+        Args:
+            value: a value json can not serialize
+
+        Returns:
+            dict: the tagged isoformat of the value
+
+        Raises:
+            TypeError: if the value is neither a date nor a datetime
+        """
+        if isinstance(value, datetime.datetime):
+            return {"$datetime": value.isoformat()}
+        if isinstance(value, datetime.date):
+            return {"$date": value.isoformat()}
+        raise TypeError(f"can't cache value of type {type(value).__name__}")
+
+    @staticmethod
+    def decode_object(obj: Dict[str, Any]) -> Any:
+        """
+        json.loads object hook decoding the values tagged by encode_value
+        """
+        if len(obj) == 1:
+            if "$datetime" in obj:
+                return datetime.datetime.fromisoformat(obj["$datetime"])
+            if "$date" in obj:
+                return datetime.date.fromisoformat(obj["$date"])
+        return obj
+
+    @staticmethod
+    def normalize_query(query: str) -> str:
+        """
+        normalize the given query text so that queries only differing in
+        indentation, trailing whitespace, blank lines or comment lines share an entry
+
+        Args:
+            query (str): the query text
+
+        Returns:
+            str: the normalized query
+        """
+        lines = []
+        for line in query.splitlines():
+            line = line.strip()
+            if line and not line.startswith("#"):
+                lines.append(line)
+        normalized = "\n".join(lines)
+        return normalized
+
+    @classmethod
+    def get_key(cls, endpoint: str, query: str, variant: str = "") -> str:
+        """
+        get the cache key for the given endpoint and query
+
+        Args:
+            endpoint (str): the url of the endpoint
+            query (str): the query text after parameter and prefix application
+            variant (str): further options influencing the result e.g. fixNone
+
+        Returns:
+            str: the sha256 hex digest key
+        """
+        material = f"{endpoint}\n{variant}\n{cls.normalize_query(query)}"
+        key = hashlib.sha256(material.encode("utf-8")).hexdigest()
+        return key
+
+    def get(self, endpoint: str, query: str, variant: str = "") -> Optional[Any]:
+        """
+        get the cached result for the given endpoint and query
+
+        Returns:
+            the result or None if there is no valid entry
+        """
+        key = self.get_key(endpoint, query, variant)
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT created,result FROM sparql_cache WHERE key=?", (key,)
+            ).fetchone()
+            result = None
+            if row is not None and now - row[0] <= self.ttl:
+                try:
+                    result = json.loads(row[1], object_hook=self.decode_object)
+                except ValueError:
+                    # e.g. an entry of an older cache format
+                    result = None
+            if row is not None and result is None:
+                self.connection.execute("DELETE FROM sparql_cache WHERE key=?", (key,))
+                self.connection.commit()
+            if result is None:
+                self.misses += 1
+                return None
+            self.connection.execute(
+                "UPDATE sparql_cache SET accessed=?,hits=hits+1 WHERE key=?",
+                (now, key),
+            )
+            self.connection.commit()
+            self.hits += 1
+        return result
+
+    def put(self, endpoint: str, query: str, result: Any, variant: str = ""):
+        """
+        store the given result for the given endpoint and query
+
+        Args:
+            endpoint (str): the url of the endpoint
+            query (str): the query text
+            result: the JSON serializable result e.g. a list of dicts - date
+                and datetime values are allowed, results with other values are not cached
+            variant (str): further options influencing the result
+        """
+        key = self.get_key(endpoint, query, variant)
+        try:
+            text = json.dumps(result, default=self.encode_value)
+        except (TypeError, ValueError):
+            return
+        size = len(text.encode("utf-8"))
+        now = time.time()
+        with self.lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO sparql_cache VALUES (?,?,?,?,?,0,?,?)",
+                (key, endpoint, query, now, now, size, text),
+            )
+            self.evict()
+            self.connection.commit()
+
+    def evict(self):
+        """
+        remove the least recently used entries beyond max_bytes
+        """
+        total = self.connection.execute(
+            "SELECT COALESCE(SUM(size),0) FROM sparql_cache"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.connection.execute(
+            "SELECT key,size FROM sparql_cache ORDER BY accessed"
+        ).fetchall()
+        expired_keys = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            expired_keys.append((key,))
+            total -= size
+        self.connection.executemany(
+            "DELETE FROM sparql_cache WHERE key=?", expired_keys
+        )
+
+    def clear(self):
+        """
+        remove all entries
+        """
+        with self.lock:
+            self.connection.execute("DELETE FROM sparql_cache")
+            self.connection.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        get the statistics of this cache
+        """
+        with self.lock:
+            entries, size = self.connection.execute(
+                "SELECT COUNT(*),COALESCE(SUM(size),0) FROM sparql_cache"
+            ).fetchone()
+        stats = {
+            "entries": entries,
+            "bytes": size,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+        return stats
+
+    def close(self):
+        """
+        close the cache file
+        """
+        self.connection.close()
@@ -0,0 +1,301 @@
+"""
+sparql_failover.py
+
+hedged SPARQL requests with failover across mirror endpoints serving
+the same data e.g. wikidata and wikidata-qlever
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, List, Optional
+
+from lodstorage.params import Params
+from lodstorage.query import Endpoint
+from lodstorage.sparql import SPARQL
+
+
+class EndpointStats:
+    """
+    latency and error statistics of an endpoint
+    """
+
+    def __init__(self, name: str, window: int = 100, min_samples: int = 5):
+        """
+        constructor
+
+        Args:
+            name (str): the name of the endpoint
+            window (int): the number of recent requests to keep
+            min_samples (int): the number of latencies needed for percentiles
+        """
+        self.name = name
+        self.min_samples = min_samples
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_errors = 0
+        self.last_error_time = 0.0
+        self.hedges = 0
+        self.wins = 0
+
+    def record_success(self, latency: float):
+        with self.lock:
+            self.requests += 1
+            self.latencies.append(latency)
+            self.outcomes.append(True)
+            self.consecutive_errors = 0
+
+    def record_error(self):
+        with self.lock:
+            self.requests += 1
+            self.errors += 1
+            self.outcomes.append(False)
+            self.consecutive_errors += 1
+            self.last_error_time = time.time()
+
+    def percentile(self, p: float) -> Optional[float]:
+        """
+        get the given percentile of the recent latencies
+
+        Args:
+            p (float): the percentile e.g. 95
+
+        Returns:
+            float: the latency in seconds or None if there are not enough samples
+        """
+        with self.lock:
+            latencies = sorted(self.latencies)
+        if len(latencies) < self.min_samples:
+            return None
+        index = max(math.ceil(p / 100 * len(latencies)) - 1, 0)
+        return latencies[index]
+
+    @property
+    def error_rate(self) -> float:
+        """
+        the share of failed recent requests
+        """
+        with self.lock:
+            if not self.outcomes:
+                return 0.0
+            return self.outcomes.count(False) / len(self.outcomes)
+
+    def is_cooling_down(self, max_errors: int, cooldown: float) -> bool:
+        """
+        check whether the endpoint failed max_errors times in a row
+        within the last cooldown seconds
+        """
+        return (
+            self.consecutive_errors >= max_errors
+            and time.time() - self.last_error_time < cooldown
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = {
+            "name": self.name,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.error_rate,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "hedges": self.hedges,
+            "wins": self.wins,
+        }
+        return stats
+
+
+class HedgedSPARQL:
+    """
+    send a query to the primary endpoint and - if the primary takes longer
+    than its p95 latency or fails - to the next mirror, taking the first
+    successful result
+    """
+
+    def __init__(
+        self,
+        endpoints: List[Endpoint],
+        hedge_delay: float = 1.0,
+        max_hedges: int = 1,
+        max_error_rate: float = 0.5,
+        max_errors: int = 3,
+        cooldown: float = 60.0,
+        window: int = 100,
+        min_samples: int = 5,
+    ):
+        """
+        constructor
+
+        Args:
+            endpoints (list): the primary endpoint followed by its mirrors
+            hedge_delay (float): the seconds to wait before hedging while an endpoint has no p95 yet
+            max_hedges (int): the maximum number of backup requests per query
+            max_error_rate (float): endpoints with a higher recent error rate are tried last
+            max_errors (int): the number of consecutive errors after which an endpoint cools down
+            cooldown (float): the seconds an endpoint is tried last after max_errors
+            window (int): the number of recent requests per endpoint for the statistics
+            min_samples (int): the number of latencies needed to use the p95
+        """
+        if not endpoints:
+            raise ValueError("at least one endpoint must be specified")
+        self.endpoints = endpoints
+        self.hedge_delay = hedge_delay
+        self.max_hedges = max_hedges
+        self.max_error_rate = max_error_rate
+        self.max_errors = max_errors
+        self.cooldown = cooldown
+        self.sparqls: Dict[str, SPARQL] = {}
+        self.stats: Dict[str, EndpointStats] = {}
+        for endpoint in endpoints:
+            self.sparqls[endpoint.name] = SPARQL.fromEndpointConf(endpoint)
+            self.stats[endpoint.name] = EndpointStats(
+                endpoint.name, window=window, min_samples=min_samples
+            )
+        self.executor = ThreadPoolExecutor(
+            max_workers=len(endpoints) * (max_hedges + 1),
+            thread_name_prefix="hedged-sparql",
+        )
+
+    @classmethod
+    def from_endpoints(
+        cls, endpoints: Dict[str, Endpoint], name: str, **kwargs
+    ) -> "HedgedSPARQL":
+        """
+        create a hedged client for the endpoint with the given name and
+        its configured mirrors
+
+        Args:
+            endpoints (dict): the endpoints by name e.g. from EndpointManager.getEndpoints
+            name (str): the name of the primary endpoint
+            **kwargs: further constructor arguments
+        """
+        primary = endpoints[name]
+        endpoint_list = [primary]
+        for mirror_name in primary.mirrors or []:
+            mirror = endpoints.get(mirror_name)
+            if mirror is not None:
+                endpoint_list.append(mirror)
+        hedged = cls(endpoint_list, **kwargs)
+        return hedged
+
+    def rank(self) -> List[str]:
+        """
+        get the names of my endpoints in the order to try them - endpoints
+        cooling down or with a high error rate move behind the healthy ones
+        """
+
+        def key(indexed):
+            index, endpoint = indexed
+            stats = self.stats[endpoint.name]
+            cooling = stats.is_cooling_down(self.max_errors, self.cooldown)
+            return (cooling, stats.error_rate > self.max_error_rate, index)
+
+        ranked = sorted(enumerate(self.endpoints), key=key)
+        names = [endpoint.name for _index, endpoint in ranked]
+        return names
+
+    def get_hedge_delay(self, name: str) -> float:
+        """
+        get the seconds to wait for the given endpoint before hedging
+        """
+        p95 = self.stats[name].percentile(95)
+        delay = p95 if p95 is not None else self.hedge_delay
+        return delay
+
+    def fetch(self, name: str, query: str, fixNone: bool) -> List[dict]:
+        """
+        run the query on the endpoint with the given name recording the statistics
+        """
+        stats = self.stats[name]
+        start = time.perf_counter()
+        try:
+            lod = self.sparqls[name].queryAsListOfDicts(
+                query, fixNone=fixNone, fast=True
+            )
+        except Exception:
+            stats.record_error()
+            raise
+        stats.record_success(time.perf_counter() - start)
+        return lod
+
+    def query_as_lod(
+        self, query: str, fixNone: bool = False, param_dict: Dict = None
+    ) -> List[dict]:
+        """
+        get a list of dicts for the given query from the first endpoint answering
+
+        Args:
+            query (str): the SPARQL query to execute
+            fixNone (bool): if True add None values for empty columns in Dict
+            param_dict (dict): dictionary of parameter names and values to be applied to the query
+
+        Returns:
+            list: a list of Dicts
+
+        Raises:
+            Exception: the last error if all endpoints failed
+        """
+        query = Params(query).apply_parameters_with_check(param_dict)
+        names = self.rank()
+        pending = {}
+        last_error = None
+        hedges = 0
+
+        def launch(name: str, hedge: bool):
+            future = self.executor.submit(self.fetch, name, query, fixNone)
+            pending[future] = name
+            if hedge:
+                self.stats[name].hedges += 1
+
+        launch(names.pop(0), hedge=False)
+        delay = self.get_hedge_delay(next(iter(pending.values())))
+        while pending:
+            done, _not_done = wait(pending, timeout=delay, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    lod = future.result()
+                except Exception as ex:
+                    last_error = ex
+                    continue
+                self.stats[name].wins += 1
+                # the slower requests finish in the background and still feed the statistics
+                return lod
+            if not names:
+                delay = None
+                continue
+            if done:
+                # failover after an error
+                name = names.pop(0)
+                launch(name, hedge=False)
+                delay = self.get_hedge_delay(name)
+            elif hedges < self.max_hedges:
+                # the request is slower than its p95 - hedge
+                hedges += 1
+                name = names.pop(0)
+                launch(name, hedge=True)
+                delay = self.get_hedge_delay(name)
+            else:
+                delay = None
+        raise last_error
+
+    def get_stats(self) -> List[Dict[str, Any]]:
+        """
+        get the statistics of my endpoints
+        """
+        stats = [self.stats[endpoint.name].as_dict() for endpoint in self.endpoints]
+        return stats
+
+    def close(self):
+        """
+        stop my worker threads without waiting for running requests
+        """
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,285 @@
+"""
+sparql_json.py
+
+fast decoding of SPARQL 1.1 query results in JSON format
+see https://www.w3.org/TR/sparql11-results-json/
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import datetime
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+
+from lodstorage.lod import LOD
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+class SparqlJsonDecoder:
+    """
+    convert SPARQL JSON result bindings to python native values
+    via a precomputed datatype -> converter table
+    """
+
+    def __init__(self, debug: bool = False):
+        """
+        constructor
+
+        Args:
+            debug (bool): if True show conversion problems
+        """
+        self.debug = debug
+        self.converters: Dict[str, Callable[[str], Any]] = {
+            f"{XSD}integer": int,
+            f"{XSD}decimal": float,
+            f"{XSD}boolean": self.to_bool,
+            f"{XSD}date": self.to_date,
+            f"{XSD}dateTime": self.to_datetime,
+        }
+
+    @staticmethod
+    def to_bool(value: str) -> bool:
+        return value == "true" or value == "TRUE"
+
+    @staticmethod
+    def to_date(value: str) -> datetime.date:
+        return datetime.date.fromisoformat(value)
+
+    def to_datetime(self, value: str) -> Optional[datetime.datetime]:
+        """
+        convert a xsd:dateTime value e.g. 2022-09-08T00:00:00Z to a naive datetime
+        """
+        if value.endswith("Z"):
+            try:
+                return datetime.datetime.fromisoformat(value[:-1])
+            except ValueError:
+                pass
+        return self.str_to_datetime(value, debug=self.debug)
+
+    @staticmethod
+    def str_to_datetime(value: str, debug: bool = False) -> Optional[datetime.datetime]:
+        """
+        convert a string to a datetime
+
+        Args:
+            value (str): the value to convert
+            debug (bool): if True show the conversion error
+
+        Returns:
+            datetime: the datetime or None if the value can not be converted
+        """
+        dateFormat = "%Y-%m-%d %H:%M:%S.%f"
+        if "T" in value and "Z" in value:
+            dateFormat = "%Y-%m-%dT%H:%M:%SZ"
+        dt = None
+        try:
+            dt = datetime.datetime.strptime(value, dateFormat)
+        except ValueError as ve:
+            if debug:
+                print(str(ve))
+        return dt
+
+    def convert(self, value: str, datatype: Optional[str]) -> Any:
+        """
+        convert the given value of the given datatype
+
+        Args:
+            value (str): the lexical value
+            datatype (str): the datatype IRI if any
+
+        Returns:
+            the python native value - unsupported datatypes keep the lexical value
+        """
+        if datatype is None:
+            return value
+        converter = self.converters.get(datatype)
+        if converter is None:
+            return value
+        return converter(value)
+
+    def decode_binding(self, binding: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+        """
+        decode a single JSON result binding
+
+        Args:
+            binding (dict): the variable -> RDF term dict of a result row
+
+        Returns:
+            dict: the variable -> python native value dict
+        """
+        converters = self.converters
+        record = {}
+        for key, term in binding.items():
+            value = term["value"]
+            datatype = term.get("datatype")
+            if datatype is not None:
+                converter = converters.get(datatype)
+                if converter is not None:
+                    value = converter(value)
+            record[key] = value
+        return record
+
+    def decode_bindings(
+        self,
+        bindings: Iterable[Dict[str, Dict[str, str]]],
+        fixNone: bool = False,
+        sampleCount: int = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        decode the given JSON result bindings
+
+        Args:
+            bindings (list): the result bindings
+            fixNone (bool): if True add None values for empty columns in Dict
+            sampleCount (int): the number of samples to check
+
+        Returns:
+            list: a list of Dicts
+        """
+        lod = [self.decode_binding(binding) for binding in bindings]
+        if fixNone:
+            fields = LOD.getFields(lod, sampleCount)
+            LOD.setNone4List(lod, fields)
+        return lod
+
+    def decode(
+        self, raw: bytes, fixNone: bool = False, sampleCount: int = None
+    ) -> List[Dict[str, Any]]:
+        """
+        decode the given raw SPARQL JSON result document
+
+        Args:
+            raw (bytes): the JSON document
+            fixNone (bool): if True add None values for empty columns in Dict
+            sampleCount (int): the number of samples to check
+
+        Returns:
+            list: a list of Dicts
+        """
+        result = orjson.loads(raw)
+        bindings = result.get("results", {}).get("bindings", [])
+        lod = self.decode_bindings(bindings, fixNone=fixNone, sampleCount=sampleCount)
+        return lod
+
+
+class SparqlJsonStreamParser:
+    """
+    incremental parser for SPARQL JSON results - the result bindings are
+    cut out of the byte stream one object at a time so that rows are
+    available before the whole document has been received
+    """
+
+    VARS_RE = re.compile(rb'"vars"\s*:\s*(\[[^\]]*\])')
+    BINDINGS_RE = re.compile(rb'"bindings"\s*:\s*\[')
+    # the characters that matter inside / outside of JSON strings
+    STRUCTURE_RE = re.compile(rb'[{}"]')
+    STRING_END_RE = re.compile(rb'["\\]')
+
+    def __init__(self):
+        self.buffer = b""
+        self.vars: Optional[List[str]] = None
+        self.in_bindings = False
+        self.done = False
+
+    def feed(self, chunk: bytes) -> Iterator[Dict[str, Dict[str, str]]]:
+        """
+        feed the next chunk of the document
+
+        Args:
+            chunk (bytes): the next bytes of the JSON document
+
+        Yields:
+            dict: the complete bindings found so far
+        """
+        self.buffer += chunk
+        if not self.in_bindings:
+            self.parse_vars()
+            match = self.BINDINGS_RE.search(self.buffer)
+            if not match:
+                return
+            self.in_bindings = True
+            self.buffer = self.buffer[match.end() :]
+        if not self.done:
+            yield from self.scan()
+        if self.done:
+            # the head may follow the results
+            self.parse_vars()
+
+    def scan(self) -> Iterator[Dict[str, Dict[str, str]]]:
+        """
+        cut the complete binding objects out of my buffer
+        """
+        buffer = self.buffer
+        pos = 0
+        size = len(buffer)
+        while pos < size:
+            # skip whitespace and separators between the objects
+            char = buffer[pos : pos + 1]
+            if char in b" \t\r\n,":
+                pos += 1
+                continue
+            if char == b"]":
+                self.done = True
+                pos += 1
+                break
+            if char != b"{":
+                raise ValueError(f"unexpected {char!r} in SPARQL JSON bindings")
+            end = self.find_object_end(buffer, pos)
+            if end < 0:
+                break
+            yield orjson.loads(buffer[pos:end])
+            pos = end
+        self.buffer = buffer[pos:]
+
+    def find_object_end(self, buffer: bytes, start: int) -> int:
+        """
+        find the end of the JSON object starting at the given position
+
+        Returns:
+            int: the index after the closing brace or -1 if the object is incomplete
+        """
+        depth = 0
+        pos = start
+        while True:
+            match = self.STRUCTURE_RE.search(buffer, pos)
+            if not match:
+                return -1
+            char = match.group(0)
+            pos = match.end()
+            if char == b'"':
+                # skip the string content including escaped characters
+                while True:
+                    string_match = self.STRING_END_RE.search(buffer, pos)
+                    if not string_match:
+                        return -1
+                    pos = string_match.end()
+                    if string_match.group(0) == b'"':
+                        break
+                    # backslash escape - skip the escaped character
+                    pos += 1
+            elif char == b"{":
+                depth += 1
+            else:
+                depth -= 1
+                if depth == 0:
+                    return pos
+
+    def parse_vars(self) -> Optional[List[str]]:
+        """
+        get the head vars - the head usually precedes the results but may
+        also follow them in which case the vars are only known after the
+        end of the bindings has been fed
+
+        Returns:
+            list: the vars or None if they are not known yet
+        """
+        if self.vars is None:
+            vars_match = self.VARS_RE.search(self.buffer)
+            if vars_match:
+                self.vars = orjson.loads(vars_match.group(1))
+        return self.vars
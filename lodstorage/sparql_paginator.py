@@ -0,0 +1,359 @@
+"""
+sparql_paginator.py
+
+paged execution of large SPARQL SELECT queries - the query is rewritten
+with a stable ORDER BY plus LIMIT/OFFSET (or a keyset FILTER) and the pages
+are fetched concurrently while the rows are yielded in order
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Generator, List, Optional, Tuple
+
+from lodstorage.params import Param, Params
+
+
+class SparqlPaginator:
+    """
+    split a SPARQL SELECT query in pages of page_size rows
+    """
+
+    # trailing LIMIT/OFFSET solution modifiers of the outermost query
+    TAIL_RE = re.compile(r"(?:\s*\b(?:LIMIT|OFFSET)\s+\d+)+\s*$", re.I)
+    LIMIT_RE = re.compile(r"\bLIMIT\s+(\d+)", re.I)
+    OFFSET_RE = re.compile(r"\bOFFSET\s+(\d+)", re.I)
+    ORDER_BY_RE = re.compile(r"\bORDER\s+BY\b", re.I)
+    SELECT_RE = re.compile(
+        r"\bSELECT\s+(?:DISTINCT\s+|REDUCED\s+)?(.*?)(?:\bWHERE\b|\{|\bFROM\b)",
+        re.I | re.S,
+    )
+    VAR_RE = re.compile(r"[?$](\w+)")
+    PAREN_RE = re.compile(r"\(([^()]*)\)")
+    AS_RE = re.compile(r"\bAS\s+([?$]\w+)\s*$", re.I)
+    IRI_RE = re.compile(r"<[^<>\s]*>")
+
+    def __init__(
+        self,
+        sparql,
+        page_size: int = 10000,
+        max_workers: int = 4,
+        keyset: str = None,
+        state_path: str = None,
+        result_format: str = "json",
+        output: List[Param] = None,
+    ):
+        """
+        constructor
+
+        Args:
+            sparql (SPARQL): the SPARQL access to use for the pages
+            page_size (int): the number of rows per page
+            max_workers (int): the number of pages fetched concurrently (offset paging only)
+            keyset (str): the name of a variable with unique values to page by instead of OFFSET
+            state_path (str): the path of a JSON file recording the progress for resuming
+            result_format (str): json, tsv or csv see SPARQL.queryAsListOfDicts
+            output (list): the output Params of the query to type tsv/csv values
+        """
+        self.sparql = sparql
+        self.page_size = page_size
+        self.max_workers = max(max_workers, 1)
+        self.keyset = keyset.lstrip("?$") if keyset else None
+        self.state_path = state_path
+        self.result_format = result_format
+        self.output = output
+        self.pages = 0
+
+    @classmethod
+    def split(cls, query: str) -> Tuple[str, Optional[int], int]:
+        """
+        split the trailing LIMIT/OFFSET of the given query
+
+        Args:
+            query (str): the SPARQL query
+
+        Returns:
+            tuple: the query without LIMIT/OFFSET, the limit or None and the offset
+        """
+        limit = None
+        offset = 0
+        match = cls.TAIL_RE.search(query)
+        if match:
+            tail = match.group(0)
+            limit_match = cls.LIMIT_RE.search(tail)
+            if limit_match:
+                limit = int(limit_match.group(1))
+            offset_match = cls.OFFSET_RE.search(tail)
+            if offset_match:
+                offset = int(offset_match.group(1))
+            query = query[: match.start()]
+        return query, limit, offset
+
+    @classmethod
+    def has_order_by(cls, query: str) -> bool:
+        """
+        check whether the outermost query already has an ORDER BY clause
+        """
+        tail = query[query.rfind("}") + 1 :]
+        return cls.ORDER_BY_RE.search(tail) is not None
+
+    @classmethod
+    def get_projection(cls, query: str) -> List[str]:
+        """
+        get the names of the projected variables of the given SELECT query
+
+        Args:
+            query (str): the SPARQL query
+
+        Returns:
+            list: the variable names in order - for SELECT * all variables of the query
+        """
+        # IRIs may contain # and ? which are not variables
+        text = cls.IRI_RE.sub(" ", query)
+        match = cls.SELECT_RE.search(text)
+        if not match:
+            raise ValueError("paging needs a SELECT query")
+        projection = match.group(1)
+        if projection.strip() == "*":
+            projection = text[match.end() :]
+        else:
+            # reduce the (expression AS ?var) parts to their ?var
+            while True:
+                reduced = cls.PAREN_RE.sub(cls.reduce_expression, projection)
+                if reduced == projection:
+                    break
+                projection = reduced
+        names = list(dict.fromkeys(cls.VAR_RE.findall(projection)))
+        return names
+
+    @classmethod
+    def reduce_expression(cls, match) -> str:
+        """
+        replace a parenthesized expression by the variable it is bound to if any
+        """
+        as_match = cls.AS_RE.search(match.group(1))
+        var = as_match.group(1) if as_match else ""
+        return f" {var} "
+
+    def get_base_query(self, query: str) -> Tuple[str, Optional[int], int]:
+        """
+        get the query to be paged with a stable ORDER BY
+
+        Args:
+            query (str): the SPARQL query
+
+        Returns:
+            tuple: the ordered query without LIMIT/OFFSET, the overall limit or None and the start offset
+        """
+        query, limit, offset = self.split(query)
+        if self.keyset:
+            if self.has_order_by(query):
+                raise ValueError(
+                    f"keyset paging orders by ?{self.keyset} - the query may not have an ORDER BY"
+                )
+        elif not self.has_order_by(query):
+            names = self.get_projection(query)
+            order_by = " ".join(f"?{name}" for name in names)
+            query = f"{query}\nORDER BY {order_by}"
+        return query, limit, offset
+
+    def get_keyset_query(self, query: str, last_key: Optional[str]) -> str:
+        """
+        get the keyset page query for the given last key
+
+        Args:
+            query (str): the query without solution modifiers
+            last_key (str): the key of the last row of the previous page
+
+        Returns:
+            str: the query ordered by the string value of the key
+        """
+        key = f"STR(?{self.keyset})"
+        if last_key is not None:
+            literal = json.dumps(last_key, ensure_ascii=False)
+            end = query.rfind("}")
+            query = f"{query[:end]}  FILTER({key} > {literal})\n{query[end:]}"
+        query = f"{query}\nORDER BY {key}"
+        return query
+
+    def fetch(self, query: str) -> List[Dict[str, Any]]:
+        """
+        fetch a single page
+        """
+        self.pages += 1
+        lod = self.sparql.queryAsListOfDicts(
+            query, fast=True, resultFormat=self.result_format, output=self.output
+        )
+        return lod
+
+    def get_query_hash(self, query: str) -> str:
+        """
+        get the hash identifying the given query in the resume state
+        """
+        material = f"{self.sparql.url}\n{self.page_size}\n{self.keyset}\n{query}"
+        query_hash = hashlib.sha256(material.encode("utf-8")).hexdigest()
+        return query_hash
+
+    def load_state(self, query_hash: str) -> Dict[str, Any]:
+        """
+        load the resume state for the query with the given hash
+        """
+        state = {"query": query_hash, "offset": 0, "last_key": None, "rows": 0}
+        if self.state_path and os.path.isfile(self.state_path):
+            with open(self.state_path, encoding="utf-8") as state_file:
+                saved_state = json.load(state_file)
+            if saved_state.get("query") == query_hash:
+                state = saved_state
+        return state
+
+    def save_state(self, state: Dict[str, Any]):
+        """
+        save the given resume state - atomically via a rename
+        """
+        if not self.state_path:
+            return
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as state_file:
+            json.dump(state, state_file)
+        os.replace(tmp_path, self.state_path)
+
+    def clear_state(self):
+        """
+        remove the resume state of a completed query
+        """
+        if self.state_path and os.path.isfile(self.state_path):
+            os.remove(self.state_path)
+
+    def query_gen(
+        self, query: str, param_dict: Dict = None
+    ) -> Generator[Dict[str, Any], None, None]:
+        """
+        run the given query page by page and yield the rows in order - with
+        a state_path an interrupted run continues after the last completed page
+
+        Args:
+            query (str): the SPARQL SELECT query
+            param_dict (dict): dictionary of parameter names and values to be applied to the query
+
+        Yields:
+            dict: one dict per row
+        """
+        query = Params(query).apply_parameters_with_check(param_dict)
+        base_query, limit, start_offset = self.get_base_query(query)
+        query_hash = self.get_query_hash(query)
+        state = self.load_state(query_hash)
+        if self.keyset:
+            pages = self.keyset_pages(base_query, limit, state)
+        else:
+            pages = self.offset_pages(base_query, limit, start_offset, state)
+        for lod in pages:
+            yield from lod
+        self.clear_state()
+
+    def remaining(self, limit: Optional[int], state: Dict[str, Any]) -> int:
+        """
+        get the size of the next page
+        """
+        if limit is None:
+            return self.page_size
+        return min(self.page_size, limit - state["rows"])
+
+    def get_last_key(
+        self, lod: List[Dict[str, Any]], previous_key: Optional[str]
+    ) -> str:
+        """
+        get the key of the last row of the given page
+
+        only IRI and string keys are supported - the decoded values of
+        other datatypes e.g. xsd:dateTime, xsd:decimal or xsd:boolean do not
+        match the STR() of the endpoint which would repeat rows
+
+        Args:
+            lod (list): the rows of the page
+            previous_key (str): the last key of the previous page
+
+        Returns:
+            str: the last key
+
+        Raises:
+            ValueError: if the key is unbound, not a string or not increasing
+        """
+        last_key = lod[-1].get(self.keyset)
+        if last_key is None:
+            raise ValueError(f"keyset variable ?{self.keyset} is unbound")
+        if not isinstance(last_key, str):
+            raise ValueError(
+                f"keyset variable ?{self.keyset} must be bound to IRIs or strings but has a {type(last_key).__name__} value - use e.g. BIND(STR(?{self.keyset}) AS ?key) or OFFSET paging"
+            )
+        if previous_key is not None and last_key <= previous_key:
+            raise ValueError(
+                f"keyset variable ?{self.keyset} does not increase after {previous_key}"
+            )
+        return last_key
+
+    def keyset_pages(
+        self, query: str, limit: Optional[int], state: Dict[str, Any]
+    ) -> Generator[List[Dict[str, Any]], None, None]:
+        """
+        fetch the pages one after the other filtering on the last key
+        """
+        while True:
+            page_size = self.remaining(limit, state)
+            if page_size <= 0:
+                break
+            page_query = self.get_keyset_query(query, state["last_key"])
+            lod = self.fetch(f"{page_query}\nLIMIT {page_size}")
+            if lod:
+                last_key = self.get_last_key(lod, state["last_key"])
+                yield lod
+                state["last_key"] = last_key
+                state["rows"] += len(lod)
+                self.save_state(state)
+            if len(lod) < page_size:
+                break
+
+    def offset_pages(
+        self,
+        query: str,
+        limit: Optional[int],
+        start_offset: int,
+        state: Dict[str, Any],
+    ) -> Generator[List[Dict[str, Any]], None, None]:
+        """
+        fetch up to max_workers pages concurrently and yield them in order
+        """
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        pending = deque()
+        next_rows = state["rows"]
+        try:
+            while True:
+                # keep max_workers pages in flight
+                while len(pending) < self.max_workers:
+                    if limit is not None and next_rows >= limit:
+                        break
+                    page_size = self.page_size
+                    if limit is not None:
+                        page_size = min(page_size, limit - next_rows)
+                    offset = start_offset + next_rows
+                    page_query = f"{query}\nLIMIT {page_size}\nOFFSET {offset}"
+                    pending.append((page_size, executor.submit(self.fetch, page_query)))
+                    next_rows += page_size
+                if not pending:
+                    break
+                page_size, future = pending.popleft()
+                lod = future.result()
+                yield lod
+                state["rows"] += len(lod)
+                state["offset"] = start_offset + state["rows"]
+                self.save_state(state)
+                if len(lod) < page_size:
+                    break
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,254 @@
+"""
+sparql_tsv.py
+
+decoding of SPARQL 1.1 query results in TSV and CSV format
+see https://www.w3.org/TR/sparql11-results-csv-tsv/
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import csv
+import io
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+from lodstorage.lod import LOD
+from lodstorage.params import Param
+from lodstorage.sparql_json import XSD, SparqlJsonDecoder
+
+
+class SparqlTsvDecoder:
+    """
+    convert SPARQL TSV and CSV results to a list of dicts - TSV terms carry
+    their datatype, CSV values are plain strings that may be typed via the
+    output parameters of the query
+    """
+
+    mime_types = {
+        "tsv": "text/tab-separated-values",
+        "csv": "text/csv",
+    }
+
+    # turtle abbreviated literals allowed in TSV
+    INTEGER_RE = re.compile(r"[+-]?\d+")
+    DECIMAL_RE = re.compile(r"[+-]?\d*\.\d+")
+    DOUBLE_RE = re.compile(r"[+-]?(?:\d+\.?\d*|\.\d+)[eE][+-]?\d+")
+    ESCAPE_RE = re.compile(r"\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))")
+    escapes = {
+        "t": "\t",
+        "n": "\n",
+        "r": "\r",
+        "b": "\b",
+        "f": "\f",
+        '"': '"',
+        "'": "'",
+        "\\": "\\",
+    }
+
+    def __init__(self, decoder: SparqlJsonDecoder = None):
+        """
+        constructor
+
+        Args:
+            decoder (SparqlJsonDecoder): the decoder with the datatype converters to use
+        """
+        self.decoder = decoder or SparqlJsonDecoder()
+        self.type_converters: Dict[str, Callable[[str], Any]] = {
+            "str": str,
+            "int": int,
+            "float": float,
+            "bool": self.decoder.to_bool,
+            "date": self.decoder.to_date,
+            "datetime": self.decoder.to_datetime,
+        }
+
+    @classmethod
+    def get_mime_type(cls, result_format: str) -> str:
+        """
+        get the mime type for the given result format
+
+        Args:
+            result_format (str): tsv or csv
+
+        Raises:
+            ValueError: if the result format is not supported
+        """
+        mime_type = cls.mime_types.get(result_format)
+        if mime_type is None:
+            raise ValueError(f"unsupported result format {result_format}")
+        return mime_type
+
+    def get_output_converters(
+        self, output: Optional[List[Param]]
+    ) -> Dict[str, Callable[[str], Any]]:
+        """
+        get the converters by variable name for the given output parameters
+
+        Args:
+            output (list): the output Params of a query e.g. Query.output
+
+        Returns:
+            dict: the converter by variable name - unknown types are skipped
+        """
+        converters = {}
+        for param in output or []:
+            converter = self.type_converters.get(param.type)
+            if converter is not None and converter is not str:
+                converters[param.name] = converter
+        return converters
+
+    def unescape(self, lexical: str) -> str:
+        """
+        resolve the turtle string escapes of the given lexical value
+        """
+        if "\\" not in lexical:
+            return lexical
+
+        def replace(match) -> str:
+            code = match.group(1) or match.group(2)
+            if code:
+                return chr(int(code, 16))
+            char = match.group(3)
+            return self.escapes.get(char, char)
+
+        return self.ESCAPE_RE.sub(replace, lexical)
+
+    def parse_term(self, term: str) -> Any:
+        """
+        parse the given TSV RDF term
+
+        Args:
+            term (str): the term in turtle syntax e.g. "42"^^<http://www.w3.org/2001/XMLSchema#integer>
+
+        Returns:
+            the python native value - IRIs are returned without angle brackets
+        """
+        first = term[0]
+        if first == "<":
+            return term[1:-1]
+        if first == '"':
+            end = term.rfind('"')
+            value = self.unescape(term[1:end])
+            suffix = term[end + 1 :]
+            if suffix.startswith("^^"):
+                datatype = suffix[2:]
+                if datatype.startswith("<"):
+                    datatype = datatype[1:-1]
+                elif datatype.startswith("xsd:"):
+                    datatype = XSD + datatype[4:]
+                value = self.decoder.convert(value, datatype)
+            return value
+        if term == "true" or term == "false":
+            return term == "true"
+        if self.INTEGER_RE.fullmatch(term):
+            return int(term)
+        if self.DECIMAL_RE.fullmatch(term):
+            return float(term)
+        if self.DOUBLE_RE.fullmatch(term):
+            return self.decoder.convert(term, f"{XSD}double")
+        # blank nodes and anything else keep their lexical form
+        return term
+
+    def decode_tsv(
+        self, text: str, output: Optional[List[Param]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        decode the given TSV result document
+
+        Args:
+            text (str): the TSV document
+            output (list): the output Params used to type plain literals
+
+        Returns:
+            list: a list of Dicts - unbound variables are missing
+        """
+        lines = text.split("\n")
+        header = lines[0].rstrip("\r").split("\t")
+        columns = [name[1:] if name[:1] in "?$" else name for name in header]
+        output_converters = self.get_output_converters(output)
+        parse_term = self.parse_term
+        lod = []
+        for line in lines[1:]:
+            if line.endswith("\r"):
+                line = line[:-1]
+            if not line:
+                continue
+            record = {}
+            for column, term in zip(columns, line.split("\t")):
+                if not term:
+                    continue
+                value = parse_term(term)
+                if isinstance(value, str):
+                    converter = output_converters.get(column)
+                    if converter is not None:
+                        value = converter(value)
+                record[column] = value
+            lod.append(record)
+        return lod
+
+    def decode_csv(
+        self, text: str, output: Optional[List[Param]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        decode the given CSV result document - CSV can not distinguish
+        an empty string from an unbound variable, both are treated as unbound
+
+        Args:
+            text (str): the CSV document
+            output (list): the output Params used to type the values
+
+        Returns:
+            list: a list of Dicts - unbound variables are missing
+        """
+        reader = csv.reader(io.StringIO(text, newline=""))
+        columns = next(reader, [])
+        output_converters = self.get_output_converters(output)
+        lod = []
+        for row in reader:
+            if not row:
+                continue
+            record = {}
+            for column, value in zip(columns, row):
+                if value == "":
+                    continue
+                converter = output_converters.get(column)
+                if converter is not None:
+                    value = converter(value)
+                record[column] = value
+            lod.append(record)
+        return lod
+
+    def decode(
+        self,
+        raw: bytes,
+        result_format: str = "tsv",
+        output: Optional[List[Param]] = None,
+        fixNone: bool = False,
+        sampleCount: int = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        decode the given raw TSV or CSV result document
+
+        Args:
+            raw (bytes): the result document
+            result_format (str): tsv or csv
+            output (list): the output Params of the query
+            fixNone (bool): if True add None values for empty columns in Dict
+            sampleCount (int): the number of samples to check
+
+        Returns:
+            list: a list of Dicts
+        """
+        text = raw.decode("utf-8")
+        if result_format == "tsv":
+            lod = self.decode_tsv(text, output)
+        elif result_format == "csv":
+            lod = self.decode_csv(text, output)
+        else:
+            raise ValueError(f"unsupported result format {result_format}")
+        if fixNone:
+            fields = LOD.getFields(lod, sampleCount)
+            LOD.setNone4List(lod, fields)
+        return lod
@@ -6,14 +6,23 @@ Created on 2020-08-24
 
 import datetime
 import io
+import itertools
+import os
 import re
 
 # python standard library
 import sqlite3
 import sys
 import time
+import urllib.parse
+from contextlib import contextmanager
+from typing import Union
 
+from lodstorage.index_advisor import IndexAdvisor
 from lodstorage.lod import LOD
+from lodstorage.query_log import QueryLog
+from lodstorage.row_format import RowFactory, RowFormat
+from lodstorage.sql_cache import SQLResultCache
 from lodstorage.sqlite_api import SQLiteApiFixer
 
 
@@ -36,6 +45,9 @@ class SQLDB(object):
         timeout=5,
         debug=False,
         errorDebug=False,
+        readOnly: bool = False,
+        immutable: bool = False,
+        mmapSize: int = None,
     ):
         """
         Construct me for the given dbname and debug
@@ -48,21 +60,107 @@ class SQLDB(object):
            timeout(float): number of seconds for connection timeout
            debug(boolean): if True switch on debug
            errorDebug(boolean): True if debug info should be provided on errors (should not be used for production since it might reveal data)
+           readOnly(boolean): if True open the database file with mode=ro and reject all writes
+           immutable(boolean): if True (and readOnly) the file is assumed to never change so no locking is done
+           mmapSize(int): if set the number of bytes of the database file to access via memory mapping
         """
         self.dbname = dbname
         self.debug = debug
         self.errorDebug = errorDebug
+        self.check_same_thread = check_same_thread
+        self.timeout = timeout
+        self.readOnly = readOnly
+        self.immutable = immutable
+        self.mmapSize = mmapSize
+        # entityInfos with deferred primary keys while in bulk_load mode
+        self.bulkLoadEntityInfos = None
+        # names of the tables stored with replace=True while in bulk_load mode
+        self.bulkLoadReplace = None
+        # tableType -> (schema_version, schema rows) see getTableList
+        self.schemaCache = {}
+        # optional result cache see enableQueryCache
+        self.queryCache = None
+        # optional slow query log see enableQueryLog
+        self.queryLog = None
+        # optional index advisor see enableIndexAdvisor
+        self.indexAdvisor = None
         SQLiteApiFixer.install(lenient=debug)
         if connection is None:
-            self.c = sqlite3.connect(
-                dbname,
-                detect_types=sqlite3.PARSE_DECLTYPES,
-                check_same_thread=check_same_thread,
-                timeout=timeout,
-            )
+            self.c = self.connect()
         else:
+            self.configure(connection)
             self.c = connection
 
+    def connect(self) -> sqlite3.Connection:
+        """
+        open a new connection to my database
+
+        Returns:
+            sqlite3.Connection: the new connection
+        """
+        if self.readOnly and self.dbname != SQLDB.RAM:
+            database = SQLDB.getUri(self.dbname, self.readOnly, self.immutable)
+            uri = True
+        else:
+            database = self.dbname
+            uri = False
+        connection = sqlite3.connect(
+            database,
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=self.check_same_thread,
+            timeout=self.timeout,
+            uri=uri,
+        )
+        self.configure(connection)
+        return connection
+
+    def configure(self, connection: sqlite3.Connection):
+        """
+        apply my read only and memory mapping settings to the given connection
+
+        Args:
+            connection(Connection): the connection to configure
+        """
+        if self.readOnly:
+            connection.execute("PRAGMA query_only=ON")
+        if self.mmapSize is not None:
+            connection.execute(f"PRAGMA mmap_size={int(self.mmapSize)}")
+
+    @staticmethod
+    def getUri(dbname: str, readOnly: bool = True, immutable: bool = False) -> str:
+        """
+        get the sqlite URI for the given database file
+
+        see https://www.sqlite.org/uri.html
+
+        Args:
+            dbname(str): the path of the database file
+            readOnly(bool): if True use mode=ro
+            immutable(bool): if True add immutable=1
+
+        Returns:
+            str: the file: URI
+        """
+        path = urllib.parse.quote(os.path.abspath(dbname))
+        options = []
+        if readOnly:
+            options.append("mode=ro")
+        if immutable:
+            options.append("immutable=1")
+        query = "?" + "&".join(options) if options else ""
+        uri = f"file:{path}{query}"
+        return uri
+
+    def checkWritable(self):
+        """
+        make sure this database may be written to
+
+        Raises:
+            Exception: if the database has been opened read only
+        """
+        if self.readOnly:
+            raise Exception(f"{self.dbname} is opened read only")
+
     def logError(self, msg):
         """
         log the given error message to stderr
@@ -74,8 +172,17 @@ class SQLDB(object):
 
     def close(self):
         """close my connection"""
+        self.disableIndexAdvisor()
         self.c.close()
 
+    def commit(self):
+        """
+        commit my connection - while in bulk_load mode the commit is deferred
+        to the end of the bulk load transaction
+        """
+        if self.bulkLoadEntityInfos is None:
+            self.c.commit()
+
     def execute(self, ddlCmd):
         """
         execute the given Data Definition Command
@@ -97,17 +204,152 @@ class SQLDB(object):
         Returns:
             EntityInfo: The provided EntityInfo object.
         """
+        self.checkWritable()
         if withDrop:
             self.c.execute(entityInfo.dropTableCmd)
         if withCreate:
+            createTableCmd = entityInfo.createTableCmd
+            if self.bulkLoadEntityInfos is not None and entityInfo.primaryKey:
+                # the primary key is added at the end of the bulk load
+                createTableCmd = entityInfo.getTableDDL(withPrimaryKey=False)
+                self.bulkLoadEntityInfos.append(entityInfo)
             try:
-                self.c.execute(entityInfo.createTableCmd)
+                self.c.execute(createTableCmd)
             except sqlite3.OperationalError as oe:
                 raise Exception(
-                    f"createTable failed with error {oe} for {entityInfo.createTableCmd}"
+                    f"createTable failed with error {oe} for {createTableCmd}"
                 )
         return entityInfo
 
+    def createIndex(
+        self,
+        tableName: str,
+        columns,
+        unique: bool = False,
+        indexName: str = None,
+    ) -> str:
+        """
+        create an index for the given columns of the given table
+
+        Args:
+            tableName(str): the name of the table
+            columns(str|list): the column or the list of columns to index
+            unique(bool): if True create a UNIQUE index
+            indexName(str): the name of the index - default idx_<table>_<columns>
+
+        Returns:
+            str: the CREATE INDEX command that was executed
+        """
+        if isinstance(columns, str):
+            columns = [columns]
+        if indexName is None:
+            indexName = f"idx_{tableName}_{'_'.join(columns)}"
+        uniqueClause = " UNIQUE" if unique else ""
+        indexCmd = f"CREATE{uniqueClause} INDEX IF NOT EXISTS {indexName} ON {tableName}({','.join(columns)})"
+        if self.debug:
+            print(indexCmd)
+        self.c.execute(indexCmd)
+        return indexCmd
+
+    def addPrimaryKey(self, entityInfo, replace: bool = False):
+        """
+        add the primary key to the table of the given entityInfo that has been
+        created without it by rebuilding the table in primary key order
+
+        Args:
+            entityInfo(EntityInfo): the meta data of the table
+            replace(bool): if True keep the last stored row of each key instead of
+                failing on duplicate keys
+        """
+        name = entityInfo.name
+        columns = ",".join(entityInfo.typeMap.keys())
+        tmpName = f"{name}__bulk_load"
+        self.c.execute(f"ALTER TABLE {name} RENAME TO {tmpName}")
+        self.c.execute(entityInfo.createTableCmd)
+        if replace:
+            # insertion order so that later rows replace earlier ones
+            insertCmd = f"INSERT OR REPLACE INTO {name} ({columns}) SELECT {columns} FROM {tmpName} ORDER BY rowid"
+        else:
+            insertCmd = f"INSERT INTO {name} ({columns}) SELECT {columns} FROM {tmpName} ORDER BY {entityInfo.primaryKey}"
+        self.c.execute(insertCmd)
+        self.c.execute(f"DROP TABLE {tmpName}")
+
+    @contextmanager
+    def bulk_load(
+        self,
+        journal_mode: str = "WAL",
+        cache_size_kib: int = 512 * 1024,
+        indexes: dict = None,
+        profile: bool = False,
+    ):
+        """
+        context manager for loading large amounts of data fast
+
+        Switches the connection to a fast load profile (journal_mode,
+        synchronous=OFF, a large cache and temp_store=MEMORY) and runs all
+        stores in one explicit transaction. Tables created via createTable
+        get their primary key and the given secondary indexes only after
+        the data is in. Afterwards the original settings are restored.
+
+        Since there is no primary key while loading, duplicate keys are only
+        detected when the key is added: a table stored with replace=True keeps
+        the last stored row per key just like INSERT OR REPLACE would, for all
+        other tables a duplicate key fails the whole bulk load with
+        a UNIQUE constraint error.
+
+        Args:
+            journal_mode(str): the journal mode to use while loading e.g. WAL or OFF
+            cache_size_kib(int): the page cache size in KiB to use while loading
+            indexes(dict): maps table names to a list of columns (or column lists) to index
+            profile(bool): if True show timing information
+
+        Example:
+
+        .. code-block:: python
+
+            with sqlDB.bulk_load(indexes={"City": ["country"]}):
+                entityInfo = sqlDB.createTable(cities[:10], "City", "name")
+                sqlDB.store(cities, entityInfo, executeMany=True)
+        """
+        startTime = time.time()
+        pragmas = ["journal_mode", "synchronous", "cache_size", "temp_store"]
+        saved = {}
+        for pragma in pragmas:
+            saved[pragma] = self.c.execute(f"PRAGMA {pragma}").fetchone()[0]
+        self.c.commit()
+        self.c.execute(f"PRAGMA journal_mode={journal_mode}")
+        self.c.execute("PRAGMA synchronous=OFF")
+        self.c.execute(f"PRAGMA cache_size=-{cache_size_kib}")
+        self.c.execute("PRAGMA temp_store=MEMORY")
+        self.bulkLoadEntityInfos = []
+        self.bulkLoadReplace = set()
+        self.c.execute("BEGIN")
+        try:
+            yield self
+            loadTime = time.time()
+            for entityInfo in self.bulkLoadEntityInfos:
+                self.addPrimaryKey(
+                    entityInfo, replace=entityInfo.name in self.bulkLoadReplace
+                )
+            if indexes:
+                for tableName, indexColumns in indexes.items():
+                    for columns in indexColumns:
+                        self.createIndex(tableName, columns)
+            self.c.commit()
+            if profile:
+                print(
+                    "bulk load took %5.1f s + %5.1f s for keys and indexes"
+                    % (loadTime - startTime, time.time() - loadTime)
+                )
+        except BaseException:
+            self.c.rollback()
+            raise
+        finally:
+            self.bulkLoadEntityInfos = None
+            self.bulkLoadReplace = None
+            for pragma in pragmas:
+                self.c.execute(f"PRAGMA {pragma}={saved[pragma]}")
+
     def createTable(
         self,
         listOfRecords,
@@ -169,8 +411,26 @@ class SQLDB(object):
                 debugInfo = "\nrecord #%d" % index
         return debugInfo
 
+    def noteBulkLoadReplace(self, entityInfo, replace: bool):
+        """
+        remember that the table of the given entityInfo is stored with replace
+        while in bulk_load mode so that addPrimaryKey keeps the last row per key
+
+        Args:
+            entityInfo(EntityInfo): the meta data to be used for storing
+            replace(bool): True if the insert allows replace
+        """
+        if replace and self.bulkLoadReplace is not None:
+            self.bulkLoadReplace.add(entityInfo.name)
+
     def store(
-        self, listOfRecords, entityInfo, executeMany=False, fixNone=False, replace=False
+        self,
+        listOfRecords,
+        entityInfo,
+        executeMany=False,
+        fixNone=False,
+        replace=False,
+        commit: bool = True,
     ):
         """
         store the given list of records based on the given entityInfo
@@ -182,7 +442,10 @@ class SQLDB(object):
            executeMany(bool): if True the insert command is done with many/all records at once
            fixNone(bool): if True make sure empty columns in the listOfDict are filled with "None" values
            replace(bool): if True allow replace for insert
+           commit(bool): if True commit the connection after storing
         """
+        self.checkWritable()
+        self.noteBulkLoadReplace(entityInfo, replace)
         insertCmd = entityInfo.getInsertCmd(replace=replace)
         record = None
         index = 0
@@ -197,7 +460,8 @@ class SQLDB(object):
                     if fixNone:
                         LOD.setNone(record, entityInfo.typeMap.keys())
                     self.c.execute(insertCmd, record)
-            self.c.commit()
+            if commit:
+                self.commit()
         except sqlite3.ProgrammingError as pe:
             msg = pe.args[0]
             if "You did not supply a value for binding" in msg:
@@ -234,22 +498,385 @@ class SQLDB(object):
             msg = "%s\nfailed:%s%s" % (insertCmd, str(ex), debugInfo)
             raise Exception(msg)
 
-    def queryGen(self, sqlQuery, params=None):
+    def storeIterable(
+        self,
+        records,
+        entityName: str,
+        primaryKey: str = None,
+        entityInfo: "EntityInfo" = None,
+        withCreate: bool = True,
+        withDrop: bool = False,
+        sampleRecordCount: int = 1,
+        chunkSize: int = 10000,
+        commitSize: int = 100000,
+        fixNone: bool = False,
+        replace: bool = False,
+        profile: bool = False,
+    ) -> "EntityInfo":
+        """
+        store the records of the given iterable (e.g. a generator) in chunks
+        without materializing the whole list of records in memory
+
+        If no entityInfo is given the first sampleRecordCount records are peeked
+        to derive the EntityInfo and the table is created via createTable4EntityInfo
+
+        Args:
+            records(Iterable): an iterable of Dicts e.g. a list or a generator
+            entityName(str): the entity / table name to use
+            primaryKey(str): the key/column to use as a primary key
+            entityInfo(EntityInfo): the meta data to be used - if given no table is created
+            withCreate(bool): True if the create Table command should be executed
+            withDrop(bool): True if the existing Table should be dropped
+            sampleRecordCount(int): number of records to peek for deriving the EntityInfo
+            chunkSize(int): number of records per executemany call
+            commitSize(int): number of records after which a commit is done
+            fixNone(bool): if True make sure empty columns are filled with "None" values
+            replace(bool): if True allow replace for insert
+            profile(bool): if True show the progress in records/s at each commit
+
+        Returns:
+            EntityInfo: Meta data information for the table the records were stored in
+        """
+        iterator = iter(records)
+        if entityInfo is None:
+            if sampleRecordCount < 1:
+                raise Exception(
+                    f"storeIterable needs a positive sampleRecordCount but got {sampleRecordCount}"
+                )
+            sampleRecords = list(itertools.islice(iterator, sampleRecordCount))
+            if len(sampleRecords) == 0:
+                raise Exception(
+                    f"no sample records to derive the {entityName} table from available"
+                )
+            entityInfo = EntityInfo(
+                sampleRecords, entityName, primaryKey, debug=self.debug
+            )
+            self.createTable4EntityInfo(entityInfo, withDrop, withCreate)
+            # put the peeked sample records back in front
+            iterator = itertools.chain(sampleRecords, iterator)
+        startTime = time.time()
+        total = 0
+        uncommitted = 0
+        while True:
+            chunk = list(itertools.islice(iterator, chunkSize))
+            if len(chunk) == 0:
+                break
+            self.store(
+                chunk,
+                entityInfo,
+                executeMany=True,
+                fixNone=fixNone,
+                replace=replace,
+                commit=False,
+            )
+            total += len(chunk)
+            uncommitted += len(chunk)
+            if uncommitted >= commitSize:
+                self.commit()
+                uncommitted = 0
+                if profile:
+                    self.storeProgress(entityInfo.name, total, startTime)
+        self.commit()
+        if profile:
+            self.storeProgress(entityInfo.name, total, startTime, done=True)
+        return entityInfo
+
+    def storeProgress(self, entityName: str, count: int, startTime: float, done=False):
+        """
+        show the progress of storing records
+
+        Args:
+            entityName(str): the name of the entity being stored
+            count(int): the number of records stored so far
+            startTime(float): the time the storing started
+            done(bool): True if storing is finished
+        """
+        elapsed = time.time() - startTime
+        rate = count / elapsed if elapsed > 0 else 0
+        print(
+            "Store %s %s %9d records in %5.1f s => %8.0f records/s"
+            % (entityName, "done" if done else "... ", count, elapsed, rate),
+            flush=True,
+        )
+
+    @staticmethod
+    def chunkedValues(column, chunkSize: int = 10000):
+        """
+        generate the python values of the given array like column
+        by converting chunkSize slices at a time
+
+        Args:
+            column: an array like column with a tolist() method e.g. a NumPy array
+            chunkSize(int): the number of values to convert at once
+        """
+        for i in range(0, len(column), chunkSize):
+            yield from column[i : i + chunkSize].tolist()
+
+    @staticmethod
+    def columnRows(columns, columnNames, chunkSize: int = 10000):
+        """
+        get an iterator of row tuples for the given columns without creating
+        per row dicts
+
+        Args:
+            columns(dict): maps column names to sequences e.g. lists or NumPy arrays
+            columnNames(list): the column names in the order of the row tuples -
+                columns not available are filled with None
+            chunkSize(int): number of values to convert at once for array like columns
+
+        Returns:
+            Iterator: an iterator of tuples in columnNames order
+        """
+        iterators = []
+        size = None
+        available = 0
+        for columnName in columnNames:
+            if columnName not in columns:
+                iterators.append(itertools.repeat(None))
+                continue
+            available += 1
+            column = columns[columnName]
+            if hasattr(column, "__len__"):
+                if size is None:
+                    size = len(column)
+                elif len(column) != size:
+                    raise Exception(
+                        f"column {columnName} has {len(column)} values but {size} are expected"
+                    )
+            if hasattr(column, "tolist"):
+                # NumPy arrays and the like - convert slices to python scalars chunk by chunk
+                values = SQLDB.chunkedValues(column, chunkSize)
+            else:
+                values = iter(column)
+            iterators.append(values)
+        if available == 0:
+            raise Exception(f"none of the columns {list(columnNames)} is available")
+        return zip(*iterators)
+
+    def storeColumns(
+        self,
+        columns,
+        entityInfo,
+        replace: bool = False,
+        chunkSize: int = 10000,
+        commit: bool = True,
+    ):
+        """
+        store the given columnar data based on the given entityInfo using
+        positional parameters so that no dict per record is needed
+
+        Args:
+            columns: either a dict of column name to sequence (e.g. list or NumPy array)
+                or a sequence/iterable of tuples in entityInfo.typeMap order
+            entityInfo(EntityInfo): the meta data to be used for storing
+            replace(bool): if True allow replace for insert
+            chunkSize(int): number of values to convert at once for array like columns
+            commit(bool): if True commit the connection after storing
+        """
+        self.checkWritable()
+        self.noteBulkLoadReplace(entityInfo, replace)
+        insertCmd = entityInfo.getInsertCmd(replace=replace, positional=True)
+        if hasattr(columns, "keys"):
+            rows = SQLDB.columnRows(columns, entityInfo.typeMap.keys(), chunkSize)
+        else:
+            rows = columns
+        try:
+            self.c.executemany(insertCmd, rows)
+            if commit:
+                self.commit()
+        except Exception as ex:
+            msg = "%s\nfailed:%s" % (insertCmd, str(ex))
+            raise Exception(msg)
+
+    def queryGen(
+        self,
+        sqlQuery,
+        params=None,
+        row_format: Union[str, RowFormat] = "dict",
+        fetch_size: int = 1000,
+    ):
         """
         run the given sqlQuery a a generator for dicts
 
+        If the query cache is enabled via enableQueryCache the results of
+        SELECT queries are served from and added to the cache
+
         Args:
 
             sqlQuery(string): the SQL query to be executed
             params(tuple): the query params, if any
+            row_format(str|RowFormat): dict, tuple, namedtuple or slots
+            fetch_size(int): the number of rows to fetch at once
 
         Returns:
-            a generator of dicts
+            a generator of dicts (or rows in the given row_format)
+        """
+        key = None
+        if self.queryCache is not None and self.isCacheable(sqlQuery):
+            key = SQLResultCache.getKey(
+                sqlQuery, params, RowFormat.of(row_format).value
+            )
+        if key is None:
+            yield from self.rawQueryGen(sqlQuery, params, row_format, fetch_size)
+            return
+        version = self.getDataVersion()
+        rows = self.queryCache.get(key, version)
+        if rows is not None:
+            yield from rows
+            return
+        rows = []
+        for row in self.rawQueryGen(sqlQuery, params, row_format, fetch_size):
+            if rows is not None:
+                rows.append(row)
+                if len(rows) > self.queryCache.maxRows:
+                    # too large to be cached
+                    rows = None
+            yield row
+        # only completely consumed results end up here
+        if rows is not None:
+            self.queryCache.put(key, version, rows)
+
+    def enableQueryCache(self, maxEntries: int = 256, maxRows: int = 100000):
+        """
+        enable the least recently used cache for the results of SELECT queries
+
+        cache entries are invalidated automatically when the database changes
+        see getDataVersion
+
+        Args:
+            maxEntries(int): maximum number of cached queries
+            maxRows(int): maximum number of cached rows over all queries
+
+        Returns:
+            SQLResultCache: the query cache
+        """
+        self.queryCache = SQLResultCache(maxEntries=maxEntries, maxRows=maxRows)
+        return self.queryCache
+
+    def disableQueryCache(self):
+        """
+        disable the query cache
+        """
+        self.queryCache = None
+
+    def enableQueryLog(
+        self, maxEntries: int = 1000, threshold: float = 0.5, withExplain: bool = True
+    ) -> QueryLog:
+        """
+        enable logging the latency and row count of the executed statements
+
+        Args:
+            maxEntries(int): the size of the ring buffer of the log
+            threshold(float): the latency in seconds above which the EXPLAIN QUERY PLAN is captured
+            withExplain(bool): if True capture the query plan of slow statements
+
+        Returns:
+            QueryLog: the query log
+        """
+        self.queryLog = QueryLog(
+            max_entries=maxEntries, threshold=threshold, with_explain=withExplain
+        )
+        return self.queryLog
+
+    def disableQueryLog(self):
+        """
+        disable the query log
+        """
+        self.queryLog = None
+
+    def enableIndexAdvisor(
+        self,
+        minHits: int = 2,
+        minRows: int = 1000,
+        autoApply: bool = False,
+        watchLookups: bool = False,
+    ) -> IndexAdvisor:
+        """
+        enable observing the WHERE/JOIN/ORDER BY columns of the executed queries
+        to suggest or automatically create indexes
+
+        Args:
+            minHits(int): the minimum number of uses of a column to suggest an index
+            minRows(int): the minimum number of rows of a table to suggest an index
+            autoApply(bool): if True create the indexes automatically
+            watchLookups(bool): if True also observe the attributes of LOD.getLookup calls
+
+        Returns:
+            IndexAdvisor: the index advisor
+        """
+        self.disableIndexAdvisor()
+        self.indexAdvisor = IndexAdvisor(
+            self, min_hits=minHits, min_rows=minRows, auto_apply=autoApply
+        )
+        if watchLookups:
+            self.indexAdvisor.watch_lookups()
+        return self.indexAdvisor
+
+    def disableIndexAdvisor(self):
+        """
+        disable the index advisor
+        """
+        if self.indexAdvisor is not None:
+            self.indexAdvisor.unwatch_lookups()
+        self.indexAdvisor = None
+
+    @staticmethod
+    def isCacheable(sqlQuery: str) -> bool:
+        """
+        check whether the results of the given query may be cached
+
+        Args:
+            sqlQuery(str): the SQL query
+
+        Returns:
+            bool: True for SELECT and WITH queries
+        """
+        keyword = sqlQuery.lstrip()[:6].upper()
+        return keyword.startswith("SELECT") or keyword.startswith("WITH")
+
+    def getDataVersion(self) -> tuple:
+        """
+        get the current version of my database content
+
+        PRAGMA data_version detects commits of other connections,
+        total_changes the changes of my own connection and
+        PRAGMA schema_version any schema change
+
+        Returns:
+            tuple: the version tuple
+        """
+        dataVersion = self.c.execute("PRAGMA data_version").fetchone()[0]
+        schemaVersion = self.c.execute("PRAGMA schema_version").fetchone()[0]
+        version = (dataVersion, self.c.total_changes, schemaVersion)
+        return version
+
+    def rawQueryGen(
+        self,
+        sqlQuery,
+        params=None,
+        row_format: Union[str, RowFormat] = "dict",
+        fetch_size: int = 1000,
+    ):
+        """
+        run the given sqlQuery a a generator for dicts bypassing the query cache
+
+        Args:
+
+            sqlQuery(string): the SQL query to be executed
+            params(tuple): the query params, if any
+            row_format(str|RowFormat): dict, tuple, namedtuple or slots
+            fetch_size(int): the number of rows to fetch at once
+
+        Returns:
+            a generator of dicts (or rows in the given row_format)
         """
         if self.debug:
             print(sqlQuery)
             if params is not None:
                 print(params)
+        if self.indexAdvisor is not None:
+            self.indexAdvisor.observe(sqlQuery)
+        startTime = time.perf_counter()
         # https://stackoverflow.com/a/13735506/1497139
         cur = self.c.cursor()
         if params is not None:
@@ -260,33 +887,83 @@ class SQLDB(object):
         # (e.g. CREATE TABLE, INSERT, UPDATE, DELETE)
         if query.description is None:
             cur.close()
+            if self.queryLog is not None:
+                elapsed = time.perf_counter() - startTime
+                self.queryLog.record("sqlite", sqlQuery, params, elapsed, 0)
             return
-        colname = [d[0] for d in query.description]
+        rowFactory = RowFactory.of_description(query.description, row_format)
+        rows = rowFactory.iter_cursor(query, fetch_size)
+        if self.queryLog is not None:
+            rows = self.queryLog.track(
+                "sqlite",
+                sqlQuery,
+                params,
+                rows,
+                explain=lambda: self.explain(sqlQuery, params),
+                start_time=startTime,
+            )
         try:
             # loop over all rows
-            for row in query:
-                record = dict(zip(colname, row))
-                yield record
+            yield from rows
         except Exception as ex:
             msg = str(ex)
             self.logError(msg)
             pass
-        cur.close()
+        finally:
+            cur.close()
+
+    def explain(self, sqlQuery, params=None) -> str:
+        """
+        get the EXPLAIN QUERY PLAN output for the given sqlQuery
+
+        Args:
+            sqlQuery(string): the SQL query to explain
+            params(tuple): the query params, if any
 
-    def query_gen(self, sql: str, params=None):
+        Returns:
+            str: the query plan - one line per plan step
+        """
+        explainQuery = f"EXPLAIN QUERY PLAN {sqlQuery}"
+        cur = self.c.cursor()
+        try:
+            if params is not None:
+                cur.execute(explainQuery, params)
+            else:
+                cur.execute(explainQuery)
+            # columns are id, parent, notused, detail
+            lines = [row[3] for row in cur.fetchall()]
+        finally:
+            cur.close()
+        return "\n".join(lines)
+
+    def query_gen(
+        self,
+        sql: str,
+        params=None,
+        row_format: Union[str, RowFormat] = "dict",
+        fetch_size: int = 1000,
+    ):
         """
         SQLBackend protocol alias for queryGen.
 
         Args:
             sql: the SQL query to be executed
             params: the query params, if any
+            row_format: dict, tuple, namedtuple or slots
+            fetch_size: the number of rows to fetch at once
 
         Returns:
-            a generator of dicts
+            a generator of dicts (or rows in the given row_format)
         """
-        return self.queryGen(sql, params)
+        return self.queryGen(sql, params, row_format=row_format, fetch_size=fetch_size)
 
-    def query(self, sql, params=None, commit: bool = False):
+    def query(
+        self,
+        sql,
+        params=None,
+        commit: bool = False,
+        row_format: Union[str, RowFormat] = "dict",
+    ):
         """
         run the given sql query and return a list of Dicts
 
@@ -296,15 +973,16 @@ class SQLDB(object):
             params(tuple): the query params, if any
             commit(bool): if True, commit the connection after execution
                 (required for DDL/DML statements such as CREATE/INSERT/UPDATE)
+            row_format(str|RowFormat): dict, tuple, namedtuple or slots
 
         Returns:
-            list: a list of Dicts
+            list: a list of Dicts (or rows in the given row_format)
         """
-        resultList = []
-        for record in self.queryGen(sql, params):
-            resultList.append(record)
+        resultList = list(self.queryGen(sql, params, row_format=row_format))
         if commit:
-            self.c.commit()
+            self.commit()
+        if self.indexAdvisor is not None:
+            resultList = self.indexAdvisor.tag(sql, resultList)
         return resultList
 
     def queryAll(self, entityInfo, fixDates=True):
@@ -325,19 +1003,43 @@ class SQLDB(object):
         """
         get the schema information from this database
 
+        all columns of all tables are retrieved with a single query joining
+        sqlite_master with pragma_table_info - the result is cached until
+        the PRAGMA schema_version changes
+
         Args:
             tableType(str): table or view
 
         Return:
             list: a list as derived from PRAGMA table_info
         """
-        tableQuery = f"SELECT name FROM sqlite_master WHERE type='{tableType}'"
-        tableList = self.query(tableQuery)
-        for table in tableList:
-            tableName = table["name"]
-            columnQuery = f"PRAGMA table_info('{tableName}')"
-            columns = self.query(columnQuery)
-            table["columns"] = columns
+        schemaVersion = self.c.execute("PRAGMA schema_version").fetchone()[0]
+        cached = self.schemaCache.get(tableType)
+        if cached is None or cached[0] != schemaVersion:
+            schemaQuery = """SELECT m.name,p.cid,p.name,p.type,p."notnull",p.dflt_value,p.pk
+FROM sqlite_master AS m JOIN pragma_table_info(m.name) AS p
+WHERE m.type=?
+ORDER BY m.rowid,p.cid"""
+            if self.debug:
+                print(schemaQuery)
+            rows = self.c.execute(schemaQuery, (tableType,)).fetchall()
+            cached = (schemaVersion, rows)
+            self.schemaCache[tableType] = cached
+        tableList = []
+        table = None
+        for tableName, cid, name, colType, notnull, dflt_value, pk in cached[1]:
+            if table is None or table["name"] != tableName:
+                table = {"name": tableName, "columns": []}
+                tableList.append(table)
+            column = {
+                "cid": cid,
+                "name": name,
+                "type": colType,
+                "notnull": notnull,
+                "dflt_value": dflt_value,
+                "pk": pk,
+            }
+            table["columns"].append(column)
         return tableList
 
     def getTableDict(self, tableType="table"):
@@ -481,28 +1183,137 @@ class SQLDB(object):
             )
         return errors
 
-    def copyTo(self, copyDB, profile=True):
+    def executeDumpStatements(
+        self,
+        connection,
+        statements,
+        title,
+        batchSize: int = 10000,
+        maxErrors=100,
+        errorDisplayLimit=12,
+        profile=True,
+    ):
         """
-        copy my content to another database
+        execute the given dump statements for the given connection in batched
+        transactions without materializing the dump
 
-        Args:
+        The copy is not all or nothing: each batch of batchSize statements is
+        committed on its own. Failing statements are skipped and reported. When
+        maxErrors is reached only the current batch is rolled back, and the
+        batches committed before it stay in the target database. The last error
+        in the returned list then says so and how many statements are committed.
+        Any other exception rolls back the current batch and is raised.
 
-           copyDB(Connection): the target database
-           profile(boolean): if True show profile information
+        Args:
+            connection(Connection): the sqlite3 connection to use
+            statements(Iterable): the SQL statements of the dump e.g. from iterdump()
+            title(string): the title of the dump
+            batchSize(int): the number of statements per transaction
+            maxErrors(int): maximum number of errors to be tolerated before stopping and rolling back the current batch
+            errorDisplayLimit(int): maximum number of errors to display
+            profile(boolean): True if progress and throughput should be shown
+        Returns:
+            a list of errors - empty if all statements have been committed
         """
         startTime = time.time()
-        dump = "\n".join(self.c.iterdump())
-        # cursor.executescript(dump)
-        if profile:
+        errors = []
+        index = 0
+        committed = 0
+        size = 0
+
+        def showProgress(state: str):
+            elapsed = time.time() - startTime
+            elapsed = elapsed if elapsed > 0 else 1e-9
             print(
-                "finished getting dump of %s in %5.1f s"
-                % (self.dbname, time.time() - startTime)
+                "dump %s %s %9d statements %7.1f MB in %5.1f s => %8.0f statements/s %5.1f MB/s"
+                % (
+                    title,
+                    state,
+                    index,
+                    size / 1024 / 1024,
+                    elapsed,
+                    index / elapsed,
+                    size / 1024 / 1024 / elapsed,
+                ),
+                flush=True,
             )
-        dumpErrors = self.executeDump(copyDB.c, dump, self.dbname, profile=profile)
+
+        if connection.in_transaction:
+            connection.commit()
+        connection.execute("BEGIN")
+        try:
+            for statement in statements:
+                # the transactions are handled here
+                if statement in ("BEGIN TRANSACTION;", "COMMIT;"):
+                    continue
+                try:
+                    connection.execute(statement)
+                except sqlite3.Error as se:
+                    msg = "SQL error %s in line %d:\n\t%s" % (se, index, statement)
+                    errors.append(msg)
+                    if len(errors) <= errorDisplayLimit:
+                        print(msg)
+                    if len(errors) >= maxErrors:
+                        connection.rollback()
+                        msg = (
+                            "stopped after %d errors: rolled back the current batch, %d statements of earlier batches stay committed"
+                            % (len(errors), committed)
+                        )
+                        errors.append(msg)
+                        print(msg)
+                        break
+                index += 1
+                size += len(statement)
+                if index % batchSize == 0:
+                    connection.commit()
+                    committed = index
+                    connection.execute("BEGIN")
+                    if profile:
+                        showProgress("...")
+            if connection.in_transaction:
+                connection.commit()
+                committed = index
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+        if profile:
+            showProgress("finished with %d errors" % len(errors))
+        return errors
+
+    def copyTo(self, copyDB, profile=True, batchSize: int = 10000):
+        """
+        copy my content to another database by streaming my dump
+        into it in batched transactions
+
+        for a full copy of a database see backup which uses the
+        sqlite backup API
+
+        Args:
+
+           copyDB(SQLDB): the target database
+           profile(boolean): if True show profile information
+           batchSize(int): the number of statements per transaction
+        """
+        dumpErrors = self.executeDumpStatements(
+            copyDB.c,
+            self.c.iterdump(),
+            self.dbname,
+            batchSize=batchSize,
+            profile=profile,
+        )
         return dumpErrors
 
     @staticmethod
-    def restore(backupDB, restoreDB, profile=False, showProgress=200, debug=False):
+    def restore(
+        backupDB,
+        restoreDB,
+        profile=False,
+        showProgress=200,
+        debug=False,
+        readOnly: bool = False,
+        immutable: bool = False,
+        mmapSize: int = None,
+    ):
         """
         restore the restoreDB from the given backup DB
 
@@ -511,6 +1322,9 @@ class SQLDB(object):
             restoreDB(string): path to the restoreDB or in Memory SQLDB.RAM
             profile(boolean): True if timing information should be shown
             showProgress(int): show progress at each showProgress page (0=show no progress)
+            readOnly(boolean): if True serve the restored database read only
+            immutable(boolean): if True (and readOnly) open the restored file as immutable
+            mmapSize(int): if set the number of bytes to access via memory mapping
         """
         backupSQLDB = SQLDB(backupDB)
         connection = backupSQLDB.backup(
@@ -520,7 +1334,19 @@ class SQLDB(object):
             showProgress=showProgress,
             doClose=False,
         )
-        restoreSQLDB = SQLDB(restoreDB, connection=connection, debug=debug)
+        backupSQLDB.close()
+        if readOnly and restoreDB != SQLDB.RAM:
+            # reopen the published file via a read only URI
+            connection.close()
+            connection = None
+        restoreSQLDB = SQLDB(
+            restoreDB,
+            connection=connection,
+            debug=debug,
+            readOnly=readOnly,
+            immutable=immutable,
+            mmapSize=mmapSize,
+        )
         return restoreSQLDB
 
 
@@ -577,8 +1403,6 @@ class EntityInfo(object):
             CREATE TABLE Person(name TEXT PRIMARY KEY,born DATE,numberInLine INTEGER,wikidataurl TEXT,age FLOAT,ofAge BOOLEAN)
 
         """
-        ddlCmd = "CREATE TABLE %s(" % self.name
-        delim = ""
         for sampleRecord in sampleRecords:
             for key, value in sampleRecord.items():
                 sqlType = None
@@ -609,22 +1433,40 @@ class EntityInfo(object):
                         print(msg)
                 if sqlType is not None and valueType is not None:
                     self.addType(key, valueType, sqlType)
+        ddlCmd = self.getTableDDL()
+        if self.debug and not self.quiet:
+            print(ddlCmd)
+        return ddlCmd
+
+    def getTableDDL(self, withPrimaryKey: bool = True) -> str:
+        """
+        get the CREATE TABLE DDL command from my sqlTypeMap
+
+        Args:
+            withPrimaryKey(bool): if False the PRIMARY KEY constraint is omitted
+
+        Returns:
+            string: CREATE TABLE DDL command for this entity info
+        """
+        ddlCmd = "CREATE TABLE %s(" % self.name
+        delim = ""
         for key, sqlType in self.sqlTypeMap.items():
-            is_primary = " PRIMARY KEY" if key == self.primaryKey else ""
+            is_primary = (
+                " PRIMARY KEY" if withPrimaryKey and key == self.primaryKey else ""
+            )
             ddl_col = f"{delim}{key} {sqlType}{is_primary}"
             ddlCmd += ddl_col
             delim = ","
         ddlCmd += ")"
-        if self.debug and not self.quiet:
-            print(ddlCmd)
         return ddlCmd
 
-    def getInsertCmd(self, replace: bool = False) -> str:
+    def getInsertCmd(self, replace: bool = False, positional: bool = False) -> str:
         """
         get the INSERT command for this entityInfo
 
         Args:
              replace(bool): if True allow replace for insert
+             positional(bool): if True use positional ? placeholders in typeMap order instead of named ones
 
         Returns:
             str: the INSERT INTO SQL command for his entityInfo e.g.
@@ -637,7 +1479,10 @@ class EntityInfo(object):
 
         """
         columns = ",".join(self.typeMap.keys())
-        placeholders = ":" + ",:".join(self.typeMap.keys())
+        if positional:
+            placeholders = ",".join("?" for _key in self.typeMap.keys())
+        else:
+            placeholders = ":" + ",:".join(self.typeMap.keys())
         replaceClause = " OR REPLACE" if replace else ""
         insertCmd = f"INSERT{replaceClause} INTO {self.name} ({columns}) values ({placeholders})"
         if self.debug and not self.quiet:
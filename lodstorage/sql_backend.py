@@ -13,9 +13,19 @@ Created on 2026-02-21
 @author: wf
 """
 
-from typing import Any, Generator, Optional, Protocol, Type, runtime_checkable
-
+from typing import (
+    Any,
+    Generator,
+    Optional,
+    Protocol,
+    Type,
+    Union,
+    runtime_checkable,
+)
+
+from lodstorage.row_format import RowFormat
 from lodstorage.sql import SQLDB
+from lodstorage.sql_pool import PooledSQLDB
 
 try:
     from lodstorage.mysql import MySqlQuery
@@ -43,12 +53,19 @@ class SQLBackend(Protocol):
 
     Currently implemented by:
         - lodstorage.sql.SQLDB              (SQLite, always available)
+        - lodstorage.sql_pool.PooledSQLDB   (SQLite shared between threads, always available)
         - lodstorage.mysql.MySqlQuery       (MySQL/MariaDB, optional: pip install pyLodStorage[mysql])
         - lodstorage.duckdb_query.DuckDBQuery (DuckDB, optional: pip install pyLodStorage[duckdb])
         - lodstorage.postgresql.PostgreSqlQuery (PostgreSQL, optional: pip install pyLodStorage[postgresql])
     """
 
-    def query(self, sql: str, params: Any = None, commit: bool = False) -> list[dict]:
+    def query(
+        self,
+        sql: str,
+        params: Any = None,
+        commit: bool = False,
+        row_format: Union[str, RowFormat] = "dict",
+    ) -> list:
         """
         Execute an SQL query and return all results eagerly.
 
@@ -57,27 +74,36 @@ class SQLBackend(Protocol):
             params: optional query parameters (support depends on backend)
             commit: if True, commit the underlying connection after execution
                 (required for DDL/DML statements such as CREATE/INSERT/UPDATE)
+            row_format: dict (default), tuple, namedtuple or slots - see RowFormat
 
         Returns:
-            list of dicts, one per row
+            list of dicts (or rows in the given row_format), one per row
         """
         pass
 
-    def query_gen(self, sql: str, params: Any = None) -> Generator[dict, None, None]:
+    def query_gen(
+        self,
+        sql: str,
+        params: Any = None,
+        row_format: Union[str, RowFormat] = "dict",
+        fetch_size: int = 1000,
+    ) -> Generator[Any, None, None]:
         """
         Execute an SQL query and yield results one row at a time.
 
         Args:
             sql: the SQL query string to execute
             params: optional query parameters (support depends on backend)
+            row_format: dict (default), tuple, namedtuple or slots - see RowFormat
+            fetch_size: the number of rows to fetch from the database at once
 
         Yields:
-            one dict per row
+            one dict (or row in the given row_format) per row
         """
         pass
 
 
-def get_sql_backend(endpoint, debug: bool = False) -> SQLBackend:
+def get_sql_backend(endpoint, debug: bool = False, pooled: bool = False) -> SQLBackend:
     """
     Return the appropriate SQL backend for the given endpoint.
 
@@ -88,15 +114,16 @@ def get_sql_backend(endpoint, debug: bool = False) -> SQLBackend:
     Args:
         endpoint: a str (SQLite path / ':memory:') or lodstorage.query.Endpoint
         debug: enable debug output on the returned backend
+        pooled: for SQLite return a PooledSQLDB that can be shared between threads
 
     Returns:
-        SQLBackend — SQLDB, MySqlQuery, DuckDBQuery, or PostgreSqlQuery depending on endpoint
+        SQLBackend — SQLDB, PooledSQLDB, MySqlQuery, DuckDBQuery, or PostgreSqlQuery depending on endpoint
 
     Raises:
         Exception: if the requested backend's optional dependency is not installed
     """
     if isinstance(endpoint, str):
-        backend = SQLDB(dbname=endpoint, debug=debug)
+        backend = get_sqlite_backend(endpoint, debug=debug, pooled=pooled)
         return backend
 
     # Endpoint object — route on the connection URL prefix
@@ -129,5 +156,24 @@ def get_sql_backend(endpoint, debug: bool = False) -> SQLBackend:
         backend = PostgreSqlQuery(endpoint=endpoint, debug=debug)
         return backend
 
-    backend = SQLDB(dbname=url, debug=debug)
+    backend = get_sqlite_backend(url, debug=debug, pooled=pooled)
+    return backend
+
+
+def get_sqlite_backend(dbname: str, debug: bool = False, pooled: bool = False) -> SQLDB:
+    """
+    Return the SQLite backend for the given database name.
+
+    Args:
+        dbname: the SQLite path or ':memory:'
+        debug: enable debug output on the returned backend
+        pooled: if True return a PooledSQLDB with one connection per thread
+
+    Returns:
+        SQLDB or PooledSQLDB
+    """
+    if pooled:
+        backend = PooledSQLDB(dbname=dbname, debug=debug)
+    else:
+        backend = SQLDB(dbname=dbname, debug=debug)
     return backend
@@ -0,0 +1,162 @@
+"""
+sql_cache.py
+
+In memory LRU cache for SQL query results with invalidation by
+database version.
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional
+
+
+class SQLResultCache:
+    """
+    a memory bounded least recently used cache for query results
+
+    Each entry is stored together with the version of the database
+    it was computed for - an entry with an outdated version is
+    invalidated on lookup.
+
+    :ivar maxEntries(int): maximum number of cached queries
+    :ivar maxRows(int): maximum number of cached rows over all queries
+    """
+
+    def __init__(self, maxEntries: int = 256, maxRows: int = 100000):
+        """
+        construct me with the given bounds
+
+        Args:
+            maxEntries(int): maximum number of cached queries
+            maxRows(int): maximum number of cached rows over all queries
+        """
+        self.maxEntries = maxEntries
+        self.maxRows = maxRows
+        self.entries = OrderedDict()
+        self.rowCount = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def getKey(sql: str, params: Any, rowFormat: str) -> Optional[Hashable]:
+        """
+        get the cache key for the given query
+
+        Args:
+            sql(str): the SQL query
+            params: the query params if any
+            rowFormat(str): the label of the row format
+
+        Returns:
+            the key or None if the params are not hashable
+        """
+        if isinstance(params, dict):
+            params = tuple(sorted(params.items()))
+        elif isinstance(params, list):
+            params = tuple(params)
+        key = (sql, params, rowFormat)
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+        return key
+
+    @staticmethod
+    def copyRows(rows: List[Any]) -> List[Any]:
+        """
+        copy the given rows so that callers can not modify the cached rows
+
+        Args:
+            rows(list): dicts, tuples or __slots__ rows
+        """
+        if not rows or isinstance(rows[0], tuple):
+            return list(rows)
+        if isinstance(rows[0], dict):
+            return [dict(row) for row in rows]
+        return [type(row)(*row) for row in rows]
+
+    def get(self, key: Hashable, version: Any) -> Optional[List[Any]]:
+        """
+        get a copy of the cached rows for the given key and database version
+
+        Args:
+            key: the cache key
+            version: the current version of the database
+
+        Returns:
+            list: the rows or None if there is no valid entry
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] != version:
+                self.remove(key)
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            rows = entry[1]
+        return SQLResultCache.copyRows(rows)
+
+    def put(self, key: Hashable, version: Any, rows: List[Any]):
+        """
+        cache a copy of the given rows for the given key and database version
+
+        Args:
+            key: the cache key
+            version: the version of the database the rows were computed for
+            rows(list): the result rows
+        """
+        if len(rows) > self.maxRows:
+            return
+        rows = SQLResultCache.copyRows(rows)
+        with self.lock:
+            if key in self.entries:
+                self.remove(key)
+            self.entries[key] = (version, rows)
+            self.rowCount += len(rows)
+            while len(self.entries) > self.maxEntries or self.rowCount > self.maxRows:
+                oldestKey = next(iter(self.entries))
+                self.remove(oldestKey)
+                self.evictions += 1
+
+    def remove(self, key: Hashable):
+        """
+        remove the entry for the given key - the caller needs to hold the lock
+        """
+        _version, rows = self.entries.pop(key)
+        self.rowCount -= len(rows)
+
+    def clear(self):
+        """
+        remove all entries
+        """
+        with self.lock:
+            self.entries.clear()
+            self.rowCount = 0
+
+    def getStats(self) -> dict:
+        """
+        get the statistics of this cache
+
+        Returns:
+            dict: entries, rows, hits, misses, evictions and invalidations
+        """
+        stats = {
+            "entries": len(self.entries),
+            "rows": self.rowCount,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+        return stats
@@ -0,0 +1,257 @@
+"""
+sql_pool.py
+
+Thread safe SQLite access for pyLoDStorage with one connection per thread,
+WAL mode for concurrent readers and a single serialized writer.
+
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import sqlite3
+import threading
+import weakref
+from contextlib import contextmanager
+
+from lodstorage.sql import SQLDB
+
+
+class ThreadConnection:
+    """
+    thread local holder of a connection - when the thread ends its
+    thread local data and thus this holder is released which closes
+    the connection
+
+    :ivar seen(tuple): the data_version and total_changes of the connection
+        at the last getDataVersion call
+    """
+
+    __slots__ = ("connection", "seen", "__weakref__")
+
+    def __init__(self, connection: sqlite3.Connection):
+        self.connection = connection
+        self.seen = None
+
+
+class PooledSQLDB(SQLDB):
+    """
+    SQLDB variant that can be shared between threads
+
+    Each thread gets its own connection to the same database file which is
+    opened in WAL mode so that readers do not block each other or the writer.
+    All write operations are serialized via a lock. The connection of
+    a thread is closed when the thread ends.
+
+    :ivar writeLock(RLock): the lock serializing the writers
+    :ivar writeVersion(int): the number of write operations done via this pool
+    :ivar connections(dict): the open connections with their finalizers
+    """
+
+    def __init__(
+        self,
+        dbname: str,
+        timeout=30,
+        debug=False,
+        errorDebug=False,
+    ):
+        """
+        Construct me for the given dbname
+
+        Args:
+           dbname(string): path of the database file - RAM databases can not be pooled
+           timeout(float): number of seconds to wait for a locked database
+           debug(boolean): if True switch on debug
+           errorDebug(boolean): True if debug info should be provided on errors (should not be used for production since it might reveal data)
+        """
+        if dbname == SQLDB.RAM:
+            raise Exception(
+                "PooledSQLDB needs a database file - a RAM database can not be shared between connections"
+            )
+        self.local = threading.local()
+        self.connections = {}
+        self.connectionsLock = threading.RLock()
+        self.writeLock = threading.RLock()
+        self.versionLock = threading.Lock()
+        # database wide version of the content see getDataVersion
+        self.writeVersion = 0
+        super().__init__(
+            dbname,
+            check_same_thread=False,
+            timeout=timeout,
+            debug=debug,
+            errorDebug=errorDebug,
+        )
+        self.c.execute("PRAGMA journal_mode=WAL")
+
+    @property
+    def c(self) -> sqlite3.Connection:
+        """
+        get the connection of the current thread - opening it on first use
+        """
+        holder = getattr(self.local, "holder", None)
+        if holder is None:
+            self.c = self.connect()
+            holder = self.local.holder
+        return holder.connection
+
+    @c.setter
+    def c(self, connection: sqlite3.Connection):
+        """
+        set the connection of the current thread
+        """
+        holder = ThreadConnection(connection)
+        # the finalizer must not refer to self to not keep me alive
+        finalizer = weakref.finalize(
+            holder,
+            PooledSQLDB.releaseConnection,
+            self.connections,
+            self.connectionsLock,
+            connection,
+        )
+        with self.connectionsLock:
+            self.connections[connection] = finalizer
+        self.local.holder = holder
+
+    @staticmethod
+    def releaseConnection(
+        connections: dict, connectionsLock, connection: sqlite3.Connection
+    ):
+        """
+        close the given connection and remove it from the given connections
+        """
+        with connectionsLock:
+            connections.pop(connection, None)
+        connection.close()
+
+    def close(self):
+        """close the connections of all threads"""
+        self.disableIndexAdvisor()
+        with self.connectionsLock:
+            finalizers = list(self.connections.values())
+        for finalizer in finalizers:
+            finalizer()
+        self.local = threading.local()
+
+    @contextmanager
+    def writing(self):
+        """
+        context manager for a serialized write operation - increments the
+        writeVersion when the operation is finished
+        """
+        with self.writeLock:
+            try:
+                yield
+            finally:
+                self.bumpWriteVersion()
+
+    def bumpWriteVersion(self):
+        """
+        increment the writeVersion
+        """
+        with self.versionLock:
+            self.writeVersion += 1
+
+    def getDataVersion(self) -> tuple:
+        """
+        get the current version of my database content
+
+        PRAGMA data_version and total_changes are counters of a single
+        connection and can not be compared between the connections of
+        different threads. The writeVersion shared by all connections is
+        used instead. It is also incremented when the counters of the calling
+        connection have changed since its last call, and on the first call of
+        a connection. This way the version also changes for writes that bypass
+        the writing paths, e.g. query("INSERT ...") followed by commit() or
+        plain self.c.execute. It also changes for commits of other processes.
+
+        Returns:
+            tuple: the version tuple
+        """
+        connection = self.c
+        holder = self.local.holder
+        dataVersion = connection.execute("PRAGMA data_version").fetchone()[0]
+        schemaVersion = connection.execute("PRAGMA schema_version").fetchone()[0]
+        seen = (dataVersion, connection.total_changes)
+        if holder.seen != seen:
+            holder.seen = seen
+            self.bumpWriteVersion()
+        version = (self.writeVersion, schemaVersion)
+        return version
+
+    @contextmanager
+    def writer(self):
+        """
+        context manager for a serialized write transaction on the connection
+        of the current thread - commits on success and rolls back on failure
+        """
+        with self.writing():
+            try:
+                yield self.c
+                self.commit()
+            except BaseException:
+                self.c.rollback()
+                raise
+
+    def execute(self, ddlCmd):
+        """
+        execute the given command as the single writer and commit it
+
+        Args:
+            ddlCmd(string): e.g. a CREATE TABLE or CREATE View command
+        """
+        with self.writer():
+            super().execute(ddlCmd)
+
+    def createTable4EntityInfo(self, entityInfo, withDrop=False, withCreate=True):
+        """
+        create the table for the given entityInfo as the single writer
+        """
+        with self.writer():
+            return super().createTable4EntityInfo(entityInfo, withDrop, withCreate)
+
+    def createIndex(self, tableName: str, columns, unique=False, indexName=None):
+        """
+        create the given index as the single writer
+        """
+        with self.writer():
+            return super().createIndex(tableName, columns, unique, indexName)
+
+    def store(self, listOfRecords, entityInfo, *args, **kwargs):
+        """
+        store the given list of records as the single writer
+        """
+        with self.writing():
+            return super().store(listOfRecords, entityInfo, *args, **kwargs)
+
+    def storeColumns(self, columns, entityInfo, *args, **kwargs):
+        """
+        store the given columns as the single writer
+        """
+        with self.writing():
+            return super().storeColumns(columns, entityInfo, *args, **kwargs)
+
+    def storeIterable(self, records, entityName, *args, **kwargs):
+        """
+        store the given iterable of records as the single writer
+        """
+        with self.writing():
+            return super().storeIterable(records, entityName, *args, **kwargs)
+
+    def query(self, sql, params=None, commit: bool = False, **kwargs):
+        """
+        run the given sql query - as the single writer if commit is requested
+        """
+        if commit:
+            with self.writing():
+                return super().query(sql, params, commit=commit, **kwargs)
+        return super().query(sql, params, **kwargs)
+
+    @contextmanager
+    def bulk_load(self, *args, **kwargs):
+        """
+        bulk load as the single writer - other writers wait until the bulk load is finished
+        """
+        with self.writing():
+            with super().bulk_load(*args, **kwargs) as sqlDB:
+                yield sqlDB
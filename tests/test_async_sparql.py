@@ -0,0 +1,75 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import asyncio
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from lodstorage.async_sparql import AsyncSPARQL, AsyncTokenBucket
+from tests.basetest import Basetest
+from tests.test_http_transport import SparqlStandIn
+
+
+class TestAsyncSPARQL(Basetest):
+    """
+    test the asyncio SPARQL client
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.server = ThreadingHTTPServer(("localhost", 0), SparqlStandIn)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://localhost:{self.server.server_address[1]}/sparql"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        Basetest.tearDown(self)
+
+    def testTokenBucket(self):
+        """
+        the token bucket must pace the calls without blocking the event loop
+        """
+
+        async def run():
+            bucket = AsyncTokenBucket(calls_per_minute=1200, burst=2)
+            ticks = []
+
+            async def ticker():
+                # keeps running while the bucket waits
+                for _i in range(5):
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.01)
+
+            start = time.monotonic()
+            ticker_task = asyncio.create_task(ticker())
+            for _i in range(6):
+                await bucket.acquire()
+            elapsed = time.monotonic() - start
+            await ticker_task
+            return elapsed, bucket.waited, ticks
+
+        elapsed, waited, ticks = asyncio.run(run())
+        # 2 burst calls then 4 calls at 20 calls/s
+        self.assertGreaterEqual(elapsed, 0.19)
+        self.assertGreater(waited, 0.15)
+        self.assertEqual(5, len(ticks))
+
+    def testGather(self):
+        """
+        queries must run concurrently and return results in order
+        """
+        async_sparql = AsyncSPARQL(self.url, calls_per_minute=6000, burst=10)
+        queries = [f"SELECT ?answer WHERE {{ BIND({i} AS ?i) }}" for i in range(10)]
+        results = asyncio.run(async_sparql.gather(queries))
+        self.assertEqual(10, len(results))
+        for lod in results:
+            self.assertEqual([{"answer": 42}], lod)
+        # a second event loop may reuse the client
+        lod = asyncio.run(async_sparql.query_as_lod("SELECT ?answer WHERE {}"))
+        self.assertEqual([{"answer": 42}], lod)
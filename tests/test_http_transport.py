@@ -0,0 +1,163 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+
+from lodstorage.http_transport import HttpTransport
+from lodstorage.sparql import SPARQL
+from tests.basetest import Basetest
+
+
+class SparqlStandIn(BaseHTTPRequestHandler):
+    """
+    minimal SPARQL endpoint stand in answering every query with one binding
+    """
+
+    protocol_version = "HTTP/1.1"
+    clients = []
+    accept_encodings = []
+
+    def answer(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.rfile.read(length)
+        SparqlStandIn.clients.append(self.client_address)
+        SparqlStandIn.accept_encodings.append(self.headers.get("Accept-Encoding"))
+        if self.path.startswith("/slow"):
+            time.sleep(0.5)
+        if self.path.startswith("/missing"):
+            body = b"not found"
+            content_type = "text/plain"
+            status = 404
+        elif "n-triples" in self.headers.get("Accept", ""):
+            lines = [
+                "<http://example.org/s> <http://example.org/p> _:b0 .",
+                '_:b0 <http://example.org/label> "caf\\u00E9 \\"42\\""@fr .',
+            ]
+            for i in range(100):
+                lines.append(
+                    f'<http://example.org/s{i}> <http://example.org/i> "{i}"^^<http://www.w3.org/2001/XMLSchema#integer> .'
+                )
+            body = ("\n".join(lines) + "\n").encode("utf-8")
+            content_type = "application/n-triples"
+            status = 200
+        elif "turtle" in self.headers.get("Accept", ""):
+            body = b"<http://example.org/s> <http://example.org/p> 42 ."
+            content_type = "text/turtle"
+            status = 200
+        elif "tab-separated-values" in self.headers.get("Accept", ""):
+            body = b'?answer\n"42"^^<http://www.w3.org/2001/XMLSchema#integer>\n'
+            content_type = "text/tab-separated-values"
+            status = 200
+        elif "csv" in self.headers.get("Accept", ""):
+            body = b"answer\r\n42\r\n"
+            content_type = "text/csv"
+            status = 200
+        else:
+            result = {
+                "head": {"vars": ["answer"]},
+                "results": {
+                    "bindings": [
+                        {
+                            "answer": {
+                                "type": "literal",
+                                "datatype": "http://www.w3.org/2001/XMLSchema#integer",
+                                "value": "42",
+                            }
+                        }
+                    ]
+                },
+            }
+            body = json.dumps(result).encode("utf-8")
+            content_type = "application/sparql-results+json"
+            status = 200
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = answer
+    do_POST = answer
+
+    def log_message(self, *args):
+        pass
+
+
+class TestHttpTransport(Basetest):
+    """
+    test the pooled keep-alive HTTP transport
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        SparqlStandIn.clients.clear()
+        SparqlStandIn.accept_encodings.clear()
+        self.server = HTTPServer(("localhost", 0), SparqlStandIn)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://localhost:{self.server.server_address[1]}/sparql"
+
+    def tearDown(self):
+        HttpTransport.get_instance(self.url).close()
+        self.server.shutdown()
+        self.server.server_close()
+        Basetest.tearDown(self)
+
+    def testSharedInstance(self):
+        """
+        there must be one transport per endpoint host
+        """
+        transport = HttpTransport.get_instance(self.url)
+        self.assertIs(transport, HttpTransport.get_instance(self.url + "?x=1"))
+        self.assertIsNot(
+            transport, HttpTransport.get_instance("https://query.wikidata.org/sparql")
+        )
+
+    def testKeepAlive(self):
+        """
+        queries, direct posts and raw requests must reuse one pooled connection
+        """
+        sparql = SPARQL(self.url)
+        for _i in range(2):
+            lod = sparql.queryAsListOfDicts("SELECT ?answer WHERE {}")
+            self.assertEqual([{"answer": 42}], lod)
+        rdf = sparql.post_query_direct("CONSTRUCT {?s ?p ?o} WHERE {}", "turtle")
+        self.assertIn("42", rdf)
+        self.assertEqual(3, len(SparqlStandIn.clients))
+        # all requests came via the same client socket
+        self.assertEqual(1, len(set(SparqlStandIn.clients)))
+        for accept_encoding in SparqlStandIn.accept_encodings:
+            self.assertIn("gzip", accept_encoding)
+
+    def testErrors(self):
+        """
+        HTTP errors must be raised as for SPARQLWrapper
+        """
+        sparql = SPARQL(self.url.replace("/sparql", "/missing"))
+        with self.assertRaises(Exception) as context:
+            sparql.queryAsListOfDicts("SELECT ?answer WHERE {}")
+        self.assertEqual("EndPointNotFound", type(context.exception).__name__)
+
+    def testTimeout(self):
+        """
+        there must be no timeout unless one is configured
+        """
+        self.assertIsNone(HttpTransport.get_instance(self.url).timeout)
+        slow_url = self.url.replace("/sparql", "/slow")
+        sparql = SPARQL(slow_url)
+        self.assertIsNone(sparql.sparql.timeout)
+        lod = sparql.queryAsListOfDicts("SELECT ?answer WHERE {}")
+        self.assertEqual([{"answer": 42}], lod)
+        sparql = SPARQL(slow_url, timeout=0.2)
+        with self.assertRaises(requests.exceptions.Timeout):
+            sparql.queryAsListOfDicts("SELECT ?answer WHERE {}")
+        with self.assertRaises(requests.exceptions.Timeout):
+            sparql.requestQuery("SELECT ?answer WHERE {}")
@@ -0,0 +1,173 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import gc
+import threading
+import weakref
+
+from lodstorage.index_advisor import IndexAdvisor
+from lodstorage.lod import LOD
+from lodstorage.sample2 import Sample
+from lodstorage.sql import SQLDB
+from tests.basetest import Basetest
+
+
+class TestIndexAdvisor(Basetest):
+    """
+    test the index advisor
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.sqlDB = SQLDB()
+        listOfRecords = Sample.getSample(2000)
+        self.entityInfo = self.sqlDB.createTable(listOfRecords, "sample", "pkey")
+        self.sqlDB.store(listOfRecords, self.entityInfo)
+
+    def testParse(self):
+        """
+        the columns of WHERE, JOIN ... ON and ORDER BY clauses must be found
+        """
+        tables = {
+            "city": {"name", "country_id", "population"},
+            "country": {"id", "name"},
+        }
+        sql = """SELECT c.name FROM city AS c JOIN country co ON c.country_id=co.id
+WHERE co.name='population' AND population > 1000 ORDER BY c.name"""
+        uses = IndexAdvisor.parse(sql, tables)
+        if self.debug:
+            print(uses)
+        self.assertEqual(
+            {
+                ("city", "country_id"),
+                ("country", "id"),
+                ("country", "name"),
+                ("city", "population"),
+                ("city", "name"),
+            },
+            set(uses),
+        )
+
+    def testSuggestAndApply(self):
+        """
+        repeatedly filtered columns must be suggested and indexed
+        """
+        advisor = self.sqlDB.enableIndexAdvisor(minHits=2, minRows=1000)
+        for i in range(3):
+            self.sqlDB.query("SELECT * FROM sample WHERE cindex=?", (i,))
+        # the primary key is already indexed
+        self.sqlDB.query("SELECT * FROM sample WHERE pkey='index1'")
+        self.sqlDB.query("SELECT * FROM sample WHERE pkey='index2'")
+        suggestions = advisor.suggest()
+        self.assertEqual(1, len(suggestions))
+        suggestion = suggestions[0]
+        self.assertEqual("cindex", suggestion.column)
+        self.assertEqual(3, suggestion.hits)
+        self.assertEqual(2000, suggestion.rows)
+        plan = self.sqlDB.explain("SELECT * FROM sample WHERE cindex=?", (1,))
+        self.assertIn("SCAN", plan)
+        commands = advisor.apply()
+        self.assertEqual([suggestion.ddl], commands)
+        plan = self.sqlDB.explain("SELECT * FROM sample WHERE cindex=?", (1,))
+        self.assertIn("USING INDEX idx_sample_cindex", plan)
+        self.assertEqual([], advisor.suggest())
+
+    def testAutoApplyLookups(self):
+        """
+        LOD lookups must be observed and indexes created automatically
+        """
+        advisor = self.sqlDB.enableIndexAdvisor(
+            minHits=2, minRows=100, autoApply=True, watchLookups=True
+        )
+        lod = self.sqlDB.query("SELECT * FROM sample")
+        LOD.getLookup(lod, "cindex")
+        self.assertEqual([], advisor.applied)
+        LOD.getLookup(lod, "cindex")
+        self.assertEqual(1, len(advisor.applied))
+        self.sqlDB.disableIndexAdvisor()
+        self.assertEqual([], LOD.lookupObservers)
+
+    def testAutoApplyGrowingTable(self):
+        """
+        a column used while its table was too small must be indexed
+        as soon as the table has grown above minRows
+        """
+        advisor = self.sqlDB.enableIndexAdvisor(minHits=2, minRows=3000, autoApply=True)
+        for i in range(3):
+            self.sqlDB.query("SELECT * FROM sample WHERE cindex=?", (i,))
+        self.assertEqual([], advisor.applied)
+        records = [{"pkey": f"more{i}", "cindex": i} for i in range(1000)]
+        self.sqlDB.store(records, self.entityInfo, fixNone=True)
+        self.sqlDB.query("SELECT * FROM sample WHERE cindex=?", (1,))
+        self.assertEqual(1, len(advisor.applied))
+        # indexed columns are not checked and applied again
+        self.sqlDB.query("SELECT * FROM sample WHERE cindex=?", (2,))
+        self.assertEqual(1, len(advisor.applied))
+        self.assertIn(("sample", "cindex"), advisor.indexed)
+
+    def testLookupObserverIsWeak(self):
+        """
+        the lookup registration must not keep the advisor and its database alive
+        """
+        sqlDB = SQLDB()
+        sqlDB.enableIndexAdvisor(watchLookups=True)
+        self.assertEqual(1, len(LOD.lookupObservers))
+        sqlDBRef = weakref.ref(sqlDB)
+        del sqlDB
+        gc.collect()
+        self.assertIsNone(sqlDBRef())
+        LOD.getLookup([{"cindex": 1}], "cindex")
+        self.assertEqual([], LOD.lookupObservers)
+        # closing a database ends the registration
+        self.sqlDB.enableIndexAdvisor(watchLookups=True)
+        self.assertEqual(1, len(LOD.lookupObservers))
+        self.sqlDB.close()
+        self.assertEqual([], LOD.lookupObservers)
+
+    def testLookupsOnlyOnAdvisedResults(self):
+        """
+        only lookups on results of the advised database are credited - also
+        from other threads - and failing observers do not break lookups
+        """
+        advisor = self.sqlDB.enableIndexAdvisor(
+            minHits=2, minRows=100, autoApply=True, watchLookups=True
+        )
+        # a list of dicts that has not been queried from the database
+        LOD.getLookup([{"cindex": 1}], "cindex")
+        LOD.getLookup([{"cindex": 1}], "cindex")
+        self.assertEqual(0, advisor.hits[("sample", "cindex")])
+        lod = self.sqlDB.query("SELECT * FROM sample")
+        errors = []
+
+        def lookup():
+            try:
+                LOD.getLookup(lod, "cindex")
+            except Exception as ex:
+                errors.append(ex)
+
+        for _i in range(2):
+            thread = threading.Thread(target=lookup)
+            thread.start()
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertEqual(2, advisor.hits[("sample", "cindex")])
+        # the index is created by the thread of the database
+        self.assertEqual([], advisor.applied)
+        self.assertIn(("sample", "cindex"), advisor.pending)
+        self.sqlDB.query("SELECT COUNT(*) FROM sample")
+        self.assertEqual(1, len(advisor.applied))
+        self.assertEqual(set(), advisor.pending)
+
+        def failingObserver(lod, attrName):
+            raise ValueError("fail on purpose")
+
+        LOD.addLookupObserver(failingObserver)
+        try:
+            lookup, _duplicates = LOD.getLookup([{"cindex": 1}], "cindex")
+            self.assertEqual([1], list(lookup.keys()))
+        finally:
+            LOD.removeLookupObserver(failingObserver)
+        self.sqlDB.disableIndexAdvisor()
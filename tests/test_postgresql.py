@@ -12,6 +12,7 @@ import unittest
 from unittest.mock import MagicMock, patch
 
 from lodstorage.query import Endpoint
+from lodstorage.query_log import QueryLog
 from lodstorage.sql_backend import PostgreSqlQuery, SQLBackend, get_sql_backend
 from tests.basetest import Basetest
 
@@ -75,12 +76,11 @@ class TestPostgreSqlQuery(Basetest):
     @unittest.skipUnless(postgresql_available, "psycopg2 not installed")
     @patch("lodstorage.postgresql.psycopg2")
     def testQueryGen(self, mock_psycopg2):
-        """query_gen() yields rows one by one from mocked cursor."""
+        """query_gen() yields rows one by one from batches of the mocked cursor."""
         mock_cursor = MagicMock()
-        mock_cursor.fetchone.side_effect = [
-            {"datname": "template1"},
-            {"datname": "n8n"},
-            None,
+        mock_cursor.fetchmany.side_effect = [
+            [{"datname": "template1"}, {"datname": "n8n"}],
+            [],
         ]
         mock_connection = MagicMock()
         mock_psycopg2.connect.return_value = mock_connection
@@ -111,6 +111,55 @@ class TestPostgreSqlQuery(Basetest):
         self.assertEqual(1, len(rows))
         self.assertEqual("café", rows[0]["name"])
 
+    @unittest.skipUnless(postgresql_available, "psycopg2 not installed")
+    @patch("lodstorage.postgresql.psycopg2")
+    def testRowFormats(self, mock_psycopg2):
+        """query() and query_gen() support tuple and namedtuple rows."""
+        mock_cursor = MagicMock()
+        mock_cursor.description = [("name",), ("size",)]
+        mock_cursor.fetchall.return_value = [(b"caf\xc3\xa9", 1)]
+        mock_cursor.fetchmany.side_effect = [[("n8n", 2)], []]
+        mock_connection = MagicMock()
+        mock_psycopg2.connect.return_value = mock_connection
+        mock_connection.cursor.return_value = mock_cursor
+
+        pq = PostgreSqlQuery(endpoint=self.postgresql_endpoint())
+        rows = pq.query("SELECT name, size FROM test", row_format="tuple")
+        self.assertEqual([("café", 1)], rows)
+        rows = list(
+            pq.query_gen("SELECT name, size FROM test", row_format="namedtuple")
+        )
+        self.assertEqual("n8n", rows[0].name)
+        self.assertEqual(2, rows[0].size)
+
+    @unittest.skipUnless(postgresql_available, "psycopg2 not installed")
+    @patch("lodstorage.postgresql.psycopg2")
+    def testQueryLog(self, mock_psycopg2):
+        """query() records slow statements with their EXPLAIN output."""
+        mock_cursor = MagicMock()
+        mock_cursor.description = [("datname",)]
+        mock_cursor.fetchall.side_effect = [
+            [{"datname": "template1"}, {"datname": "n8n"}],
+            [("Seq Scan on pg_database  (cost=0.00..1.04 rows=4 width=64)",)],
+        ]
+        mock_connection = MagicMock()
+        mock_psycopg2.connect.return_value = mock_connection
+        mock_connection.cursor.return_value = mock_cursor
+
+        pq = PostgreSqlQuery(endpoint=self.postgresql_endpoint())
+        pq.query_log = QueryLog(threshold=0.0)
+        rows = pq.query("SELECT datname FROM pg_database")
+
+        self.assertEqual(2, len(rows))
+        entry = pq.query_log.entries[0]
+        self.assertEqual("postgresql", entry.backend)
+        self.assertEqual(2, entry.rows)
+        self.assertTrue(entry.slow)
+        self.assertIn("Seq Scan on pg_database", entry.explain)
+        mock_cursor.execute.assert_called_with(
+            "EXPLAIN SELECT datname FROM pg_database"
+        )
+
     def testFactoryRaisesWithoutPsycopg2(self):
         """Factory must raise if psycopg2 is not installed."""
         ep = self.postgresql_endpoint()
@@ -0,0 +1,126 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import unittest
+
+from lodstorage.query import Endpoint
+from lodstorage.query_log import QueryLog
+from lodstorage.sample2 import Sample
+from lodstorage.sql import SQLDB
+from lodstorage.sql_backend import DuckDBQuery
+from tests.basetest import Basetest
+
+duckdb_available = DuckDBQuery is not None
+
+
+class TestQueryLog(Basetest):
+    """
+    test the slow query log of the SQL backends
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.sqlDB = SQLDB()
+        listOfRecords = Sample.getSample(1000)
+        entityInfo = self.sqlDB.createTable(listOfRecords, "sample", "pkey")
+        self.sqlDB.store(listOfRecords, entityInfo)
+
+    def testRingBuffer(self):
+        """
+        the log must keep only the most recent entries
+        """
+        query_log = QueryLog(max_entries=3, threshold=1.0)
+        for i in range(5):
+            query_log.record("sqlite", f"SELECT {i}", None, i * 0.5, 1)
+        lod = query_log.as_lod()
+        self.assertEqual(3, len(lod))
+        self.assertEqual("SELECT 2", lod[0]["sql"])
+        slow = query_log.slow_queries()
+        self.assertEqual(["SELECT 4", "SELECT 3", "SELECT 2"], [e.sql for e in slow])
+
+    def testSQLDBQueryLog(self):
+        """
+        queries must be logged with their latency, row count and query plan
+        """
+        query_log = self.sqlDB.enableQueryLog(threshold=0.0)
+        lod = self.sqlDB.query("SELECT * FROM sample WHERE cindex < ?", (10,))
+        self.assertEqual(10, len(lod))
+        # a partially consumed generator is logged when closed
+        gen = self.sqlDB.queryGen("SELECT * FROM sample")
+        next(gen)
+        gen.close()
+        self.assertEqual(2, len(query_log.entries))
+        entry = query_log.entries[0]
+        if self.debug:
+            print(entry)
+        self.assertEqual(10, entry.rows)
+        self.assertTrue(entry.slow)
+        self.assertIn("SCAN sample", entry.explain)
+        self.assertEqual(1, query_log.entries[1].rows)
+        # the log can be persisted in a SQLite log table
+        logDB = SQLDB()
+        query_log.to_sqldb(logDB)
+        query_log.to_sqldb(logDB)
+        logLod = logDB.query("SELECT sql,rows FROM query_log")
+        self.assertEqual(4, len(logLod))
+        self.sqlDB.disableQueryLog()
+        self.sqlDB.query("SELECT 1")
+        self.assertEqual(2, len(query_log.entries))
+
+    def testThreshold(self):
+        """
+        fast queries must be logged without query plan
+        """
+        query_log = self.sqlDB.enableQueryLog(threshold=60.0)
+        self.sqlDB.query("SELECT * FROM sample WHERE pkey='index7'")
+        entry = query_log.entries[0]
+        self.assertFalse(entry.slow)
+        self.assertIsNone(entry.explain)
+        plan = self.sqlDB.explain("SELECT * FROM sample WHERE pkey=?", ("index7",))
+        self.assertIn("USING INDEX", plan)
+
+    @unittest.skipUnless(duckdb_available, "duckdb not installed")
+    def testDuckDBQueryLog(self):
+        """
+        DuckDB queries must be logged with their EXPLAIN output
+        """
+        ep = Endpoint()
+        ep.database = ":memory:"
+        duck = DuckDBQuery(endpoint=ep)
+        duck.query_log = QueryLog(threshold=0.0)
+        duck.query("CREATE TABLE t (i INTEGER)")
+        duck.query("INSERT INTO t SELECT * FROM range(100)")
+        lod = list(duck.query_gen("SELECT * FROM t WHERE i < ?", [5]))
+        self.assertEqual(5, len(lod))
+        entries = list(duck.query_log.entries)
+        self.assertEqual(3, len(entries))
+        self.assertEqual(5, entries[2].rows)
+        self.assertEqual("duckdb", entries[2].backend)
+        self.assertIsNotNone(entries[2].explain)
+
+    @unittest.skipUnless(duckdb_available, "duckdb not installed")
+    def testDuckDBExplain(self):
+        """
+        DuckDB explain must return the plan and eager queries must only
+        capture it for slow statements
+        """
+        ep = Endpoint()
+        ep.database = ":memory:"
+        duck = DuckDBQuery(endpoint=ep)
+        duck.query_log = QueryLog(threshold=60.0)
+        duck.query("CREATE TABLE t (i INTEGER)")
+        duck.query("INSERT INTO t SELECT * FROM range(100)")
+        plan = duck.explain("SELECT count(*) FROM t WHERE i < ?", [5])
+        if self.debug:
+            print(plan)
+        self.assertIn("FILTER", plan.upper())
+        rows = duck.query("SELECT * FROM t WHERE i < ?", [7], row_format="tuple")
+        self.assertEqual(7, len(rows))
+        entry = duck.query_log.entries[-1]
+        self.assertEqual(7, entry.rows)
+        self.assertFalse(entry.slow)
+        self.assertIsNone(entry.explain)
+        self.assertEqual(0, len(duck.query_log.slow_queries()))
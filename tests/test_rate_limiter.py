@@ -0,0 +1,130 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+
+from lodstorage.rate_limiter import RateLimiter, SqliteBucketStore
+from tests.basetest import Basetest
+
+
+class ThrottledResponse:
+    """
+    requests.Response stand in
+    """
+
+    def __init__(self, status_code: int, retry_after: str = None):
+        self.status_code = status_code
+        self.headers = {"Retry-After": retry_after} if retry_after else {}
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class TestRateLimiter(Basetest):
+    """
+    test the token bucket rate limiter
+    """
+
+    def testTokenBucket(self):
+        """
+        the burst must be granted at once and further calls paced
+        """
+        limiter = RateLimiter(calls_per_minute=1200, burst=2)
+        start = time.monotonic()
+        for _i in range(6):
+            limiter.acquire()
+        elapsed = time.monotonic() - start
+        stats = limiter.get_stats()
+        if self.debug:
+            print(stats)
+        # 2 burst calls then 4 calls at 20 calls/s
+        self.assertGreaterEqual(elapsed, 0.19)
+        self.assertEqual(6, stats["calls"])
+        self.assertEqual(4, stats["waits"])
+        self.assertGreater(stats["total_wait"], 0.15)
+        self.assertAlmostEqual(0.05, stats["max_wait"], delta=0.02)
+
+    def testRetryAfter(self):
+        """
+        throttled calls must be retried after lowering the rate
+        """
+        limiter = RateLimiter(calls_per_minute=6000, burst=10)
+        responses = [ThrottledResponse(429, "0.2"), ThrottledResponse(200)]
+        throttled = responses[0]
+
+        @limiter.rate_limited
+        def call():
+            return responses.pop(0)
+
+        start = time.monotonic()
+        response = call()
+        elapsed = time.monotonic() - start
+        self.assertEqual(200, response.status_code)
+        self.assertTrue(throttled.closed)
+        self.assertGreaterEqual(elapsed, 0.15)
+        stats = limiter.get_stats()
+        self.assertEqual(1, stats["throttled"])
+        # halved by the 429 and raised again by the success
+        self.assertAlmostEqual(6000 * 0.5 * 1.1, stats["calls_per_minute"])
+
+        # a raised HTTPError is retried as well
+        errors = [urllib.error.HTTPError("http://example.org", 503, "busy", {}, None)]
+
+        @limiter.rate_limited
+        def failing_call():
+            if errors:
+                raise errors.pop()
+            return "ok"
+
+        self.assertEqual("ok", failing_call())
+        self.assertEqual(2, limiter.get_stats()["throttled"])
+
+        # without retries the throttled response is handed to the caller
+        limiter.max_retries = 0
+        responses.append(ThrottledResponse(503))
+        self.assertEqual(503, call().status_code)
+        self.assertGreater(
+            RateLimiter.parse_retry_after("Wed, 21 Oct 2099 07:28:00 GMT"), 0
+        )
+        self.assertIsNone(RateLimiter.parse_retry_after("soon"))
+
+    def testSharedStore(self):
+        """
+        limiters of different processes must share the budget
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db_path = os.path.join(tmp_dir, "rate_limits.db")
+            limiter = RateLimiter(calls_per_minute=60, burst=3)
+            limiter.share(db_path, key="example.org")
+            # another process takes the burst
+            script = f"""
+from lodstorage.rate_limiter import RateLimiter
+limiter = RateLimiter(calls_per_minute=60, burst=3)
+limiter.share({db_path!r}, key="example.org")
+for _i in range(3):
+    limiter.acquire()
+"""
+            subprocess.run([sys.executable, "-c", script], check=True)
+            wait = limiter.reserve()
+            self.assertGreater(wait, 0.5)
+            # a penalty is seen by all sharing limiters
+            other = RateLimiter(
+                calls_per_minute=60,
+                burst=3,
+                store=SqliteBucketStore(db_path),
+                key="example.org",
+            )
+            other.penalize(retry_after=30)
+            self.assertGreater(limiter.reserve(), 25)
+            self.assertAlmostEqual(30, limiter.get_stats()["calls_per_minute"])
+            limiter.store.close()
+            other.store.close()
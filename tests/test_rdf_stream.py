@@ -0,0 +1,99 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import os
+import tempfile
+import threading
+from http.server import HTTPServer
+
+from rdflib import BNode, Graph, Literal, URIRef
+
+from lodstorage.http_transport import HttpTransport
+from lodstorage.rdf_format import RdfFormat
+from lodstorage.rdf_stream import RdfStreamer
+from lodstorage.sparql import SPARQL
+from tests.basetest import Basetest
+from tests.test_http_transport import SparqlStandIn
+
+
+class TestRdfStream(Basetest):
+    """
+    test streaming CONSTRUCT results to a file or an rdflib Graph
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.server = HTTPServer(("localhost", 0), SparqlStandIn)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = f"http://localhost:{self.server.server_address[1]}/sparql"
+        self.query = "CONSTRUCT { ?s ?p ?o } WHERE { ?s ?p ?o }"
+
+    def tearDown(self):
+        HttpTransport.get_instance(self.url).close()
+        self.server.shutdown()
+        self.server.server_close()
+        Basetest.tearDown(self)
+
+    def testStreamerChunks(self):
+        """
+        N-Triples must be parsed across arbitrary chunk boundaries
+        """
+        nt = '_:a <http://example.org/p> "été" .\n<http://example.org/s> <http://example.org/p> _:a .\n'
+        raw = nt.encode("utf-8")
+        chunks = [raw[i : i + 3] for i in range(0, len(raw), 3)]
+        graph = Graph()
+        stats = RdfStreamer(chunks, RdfFormat.N_TRIPLES).to_graph(graph)
+        self.assertEqual(2, stats.triples)
+        self.assertEqual(len(raw), stats.bytes)
+        # the blank node is the same in both triples
+        self.assertEqual(1, len({s for s in graph.subjects() if isinstance(s, BNode)}))
+        obj = graph.value(
+            URIRef("http://example.org/s"), URIRef("http://example.org/p")
+        )
+        self.assertEqual(
+            Literal("été"), graph.value(obj, URIRef("http://example.org/p"))
+        )
+
+    def testPostQueryToGraph(self):
+        """
+        a CONSTRUCT result must be streamed into a graph
+        """
+        sparql = SPARQL(self.url)
+        graph = Graph()
+        stats = sparql.post_query_to_graph(self.query, graph)
+        if self.debug:
+            print(stats)
+        self.assertEqual(102, stats.triples)
+        self.assertEqual(102, len(graph))
+        self.assertGreater(stats.bytes, 0)
+        self.assertGreater(stats.bytes_per_second, 0)
+        label = graph.value(
+            graph.value(URIRef("http://example.org/s"), URIRef("http://example.org/p")),
+            URIRef("http://example.org/label"),
+        )
+        self.assertEqual(Literal('café "42"', lang="fr"), label)
+        # other formats are spooled to a temporary file
+        turtle_graph = Graph()
+        stats = sparql.post_query_to_graph(self.query, turtle_graph, "turtle")
+        self.assertEqual(1, stats.triples)
+
+    def testPostQueryToFile(self):
+        """
+        a CONSTRUCT result must be streamed to a file
+        """
+        sparql = SPARQL(self.url)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "result.nt")
+            stats = sparql.post_query_to_file(self.query, path)
+            self.assertEqual(os.path.getsize(path), stats.bytes)
+            graph = Graph()
+            graph.parse(path, format=RdfFormat.N_TRIPLES.rdflib_format)
+            self.assertEqual(102, len(graph))
+        with self.assertRaises(Exception):
+            SPARQL(self.url.replace("/sparql", "/missing")).post_query_to_file(
+                self.query, path
+            )
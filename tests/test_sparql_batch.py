@@ -0,0 +1,225 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import json
+import re
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from lodstorage.http_transport import HttpTransport
+from lodstorage.sparql import SPARQL
+from lodstorage.sparql_batch import SparqlValuesBatcher
+from tests.basetest import Basetest
+
+
+class ValuesStandIn(BaseHTTPRequestHandler):
+    """
+    SPARQL endpoint stand in answering the labels of the items of a
+    VALUES block - Q0 has no label, Q2 has two and batches of more
+    than max_rows rows fail - queries containing BAD are rejected as malformed
+    """
+
+    protocol_version = "HTTP/1.1"
+    max_rows = 40
+    queries = []
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8"))
+        query = form["query"][0]
+        ValuesStandIn.queries.append(query)
+        rows = re.findall(r"\((\d+) wd:(Q\d+)\)", query)
+        bindings = []
+        for index, qid in rows:
+            labels = {"Q0": [], "Q2": ["two", "zwei"]}.get(qid, [f"label {qid}"])
+            for label in labels:
+                binding = {
+                    "__index": {
+                        "type": "literal",
+                        "datatype": "http://www.w3.org/2001/XMLSchema#integer",
+                        "value": index,
+                    },
+                    "label": {"type": "literal", "value": label},
+                }
+                if "SELECT *" in query:
+                    binding["__qid_0"] = {
+                        "type": "uri",
+                        "value": f"http://www.wikidata.org/entity/{qid}",
+                    }
+                bindings.append(binding)
+        if "BAD" in query:
+            status = 400
+            body = b"parse error"
+        elif len(rows) > ValuesStandIn.max_rows:
+            status = 500
+            body = b"timeout"
+        else:
+            status = 200
+            result = {
+                "head": {"vars": ["__index", "label"]},
+                "results": {"bindings": bindings},
+            }
+            body = json.dumps(result).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/sparql-results+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSparqlBatch(Basetest):
+    """
+    test the VALUES batching of parameterized queries
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        ValuesStandIn.queries.clear()
+        self.query = """PREFIX wd: <http://www.wikidata.org/entity/>
+SELECT ?label WHERE {
+  wd:{{ qid }} rdfs:label ?label.
+}"""
+
+    def testBatchQuery(self):
+        """
+        the placeholder terms must be folded into a VALUES block
+        """
+        batcher = SparqlValuesBatcher(None)
+        query = """SELECT DISTINCT ?item (COUNT(?x) AS ?count) WHERE {
+  ?item wdt:P31 wd:{{ qid }}.
+  <http://example.org/{{ qid }}> ?p "{{ count }}"^^xsd:integer.
+  FILTER(LANG(?label)="{{ lang }}")
+} GROUP BY ?item"""
+        prepared, terms = batcher.prepare(query)
+        self.assertEqual(
+            [
+                ("wd:", "qid", ""),
+                ("<http://example.org/", "qid", ">"),
+                ('"', "count", '"^^xsd:integer'),
+                ('"', "lang", '"'),
+            ],
+            terms,
+        )
+        batch = [(0, {"qid": "Q5", "count": 3, "lang": "en"})]
+        batch_query = batcher.get_batch_query(prepared, terms, batch)
+        if self.debug:
+            print(batch_query)
+        self.assertIn(
+            """VALUES (?__index ?__qid_0 ?__qid_1 ?__count_2 ?__lang_3) {
+  (0 wd:Q5 <http://example.org/Q5> "3"^^xsd:integer "en")
+}""",
+            batch_query,
+        )
+        self.assertIn("?item wdt:P31 ?__qid_0.", batch_query)
+        self.assertIn("SELECT DISTINCT ?__index ?item", batch_query)
+        self.assertIn("GROUP BY ?__index ?item", batch_query)
+        with self.assertRaises(ValueError):
+            batcher.prepare(
+                'SELECT ?x WHERE { ?x rdfs:label "{{ first }} {{ last }}" }'
+            )
+        # an aggregate without GROUP BY needs a group per input
+        prepared, terms = batcher.prepare(
+            "SELECT (COUNT(?x) AS ?count) WHERE { ?x wdt:P31 wd:{{ qid }} } ORDER BY ?count"
+        )
+        batch_query = batcher.get_batch_query(prepared, terms, batch)
+        self.assertIn("SELECT ?__index (COUNT(?x) AS ?count)", batch_query)
+        self.assertTrue(batch_query.endswith("}\nGROUP BY ?__index ORDER BY ?count"))
+
+    def testConstants(self):
+        """
+        only the parameters varying across the inputs must become variables
+        """
+        param_dicts = [
+            {"qid": "Q1", "lang": "en"},
+            {"qid": "Q2", "lang": "en"},
+        ]
+        constants = SparqlValuesBatcher.get_constants(["lang", "qid"], param_dicts)
+        self.assertEqual({"lang": "en"}, constants)
+        self.assertEqual(
+            {"lang": "en", "qid": "Q1"},
+            SparqlValuesBatcher.get_constants(["lang", "qid"], param_dicts[:1]),
+        )
+
+    def testAdapt(self):
+        """
+        the batch size must follow the response time
+        """
+        batcher = SparqlValuesBatcher(None, batch_size=100, target_seconds=1.0)
+        # fast batches grow by doubling at most
+        batcher.adapt(100, 0.01)
+        self.assertEqual(200, batcher.batch_size)
+        # slow batches shrink towards the target
+        batcher.adapt(200, 4.0)
+        self.assertEqual(125, batcher.batch_size)
+
+    def testQueryBatches(self):
+        """
+        the results must be split per input
+        """
+        server = HTTPServer(("localhost", 0), ValuesStandIn)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://localhost:{server.server_address[1]}/sparql"
+        try:
+            sparql = SPARQL(url, calls_per_minute=60000)
+            param_dicts = [{"qid": f"Q{i}"} for i in range(100)]
+            results = sparql.queryAsListOfDictsBatch(
+                self.query, param_dicts, batchSize=64
+            )
+            limited = sparql.queryAsListOfDictsBatch(
+                self.query + " LIMIT 1", param_dicts[:3]
+            )
+            batch_queries = list(ValuesStandIn.queries)
+            ValuesStandIn.queries.clear()
+            label_query = """PREFIX wd: <http://www.wikidata.org/entity/>
+SELECT * WHERE {
+  wd:{{ qid }} rdfs:label ?label.
+  SERVICE wikibase:label { bd:serviceParam wikibase:language "{{ lang }}". }
+}"""
+            star_results = sparql.queryAsListOfDictsBatch(
+                label_query, [{"qid": "Q1", "lang": "en"}, {"qid": "Q2", "lang": "en"}]
+            )
+            star_queries = list(ValuesStandIn.queries)
+            ValuesStandIn.queries.clear()
+            bad_status = None
+            try:
+                sparql.queryAsListOfDictsBatch(
+                    "# BAD\n" + self.query, param_dicts, batchSize=64
+                )
+            except Exception as ex:
+                # not kept - the traceback would keep the connection open
+                bad_status = ex.response.status_code
+            bad_queries = list(ValuesStandIn.queries)
+        finally:
+            HttpTransport.get_instance(url).close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(100, len(results))
+        self.assertEqual([], results[0])
+        self.assertEqual([{"label": "label Q1"}], results[1])
+        self.assertEqual([{"label": "two"}, {"label": "zwei"}], results[2])
+        self.assertEqual([{"label": "label Q99"}], results[99])
+        # the first batch of 64 failed and was halved
+        batch_sizes = [len(re.findall(r"\(\d+ wd:", query)) for query in batch_queries]
+        self.assertEqual([64, 32], batch_sizes[:2])
+        self.assertLess(len(batch_sizes), 10)
+        self.assertEqual([[], [{"label": "label Q1"}], [{"label": "two"}]], limited)
+        # the VALUES variables do not leak into the rows of SELECT *
+        self.assertEqual(
+            [[{"label": "label Q1"}], [{"label": "two"}, {"label": "zwei"}]],
+            star_results,
+        )
+        # the constant language is substituted as text
+        self.assertEqual(1, len(star_queries))
+        self.assertIn('wikibase:language "en"', star_queries[0])
+        self.assertIn("VALUES (?__index ?__qid_0)", star_queries[0])
+        # malformed queries are not retried in smaller batches
+        self.assertEqual(1, len(bad_queries))
+        self.assertEqual(400, bad_status)
@@ -0,0 +1,144 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import datetime
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from http.server import HTTPServer
+
+from lodstorage.http_transport import HttpTransport
+from lodstorage.sparql import SPARQL
+from lodstorage.sparql_cache import SparqlResultCache
+from tests.basetest import Basetest
+from tests.test_http_transport import SparqlStandIn
+
+
+class PickleBomb:
+    """
+    an object that records being unpickled
+    """
+
+    exploded = False
+
+    def __reduce__(self):
+        return (PickleBomb.explode, ())
+
+    @staticmethod
+    def explode():
+        PickleBomb.exploded = True
+
+
+class TestSparqlCache(Basetest):
+    """
+    test the persistent SPARQL result cache
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dbPath = os.path.join(self.tmpdir.name, "sparql_cache.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        Basetest.tearDown(self)
+
+    def testCacheEntries(self):
+        """
+        entries must be keyed by endpoint and normalized query, expire and be evicted
+        """
+        cache = SparqlResultCache(db_path=self.dbPath, ttl=0.2, max_bytes=2000)
+        query = "SELECT ?s\nWHERE {\n  ?s ?p ?o\n}"
+        lod = [{"s": "http://example.org/s", "n": 1}]
+        cache.put("http://a/sparql", query, lod)
+        self.assertEqual(
+            lod,
+            cache.get(
+                "http://a/sparql", "SELECT ?s\n# comment\nWHERE {\n?s ?p ?o   \n}\n"
+            ),
+        )
+        self.assertIsNone(cache.get("http://b/sparql", query))
+        time.sleep(0.3)
+        self.assertIsNone(cache.get("http://a/sparql", query))
+        cache.ttl = 60
+        big = [{"value": "x" * 800}]
+        for i in range(4):
+            cache.put("http://a/sparql", f"SELECT {i}", big)
+        stats = cache.get_stats()
+        if self.debug:
+            print(stats)
+        self.assertLessEqual(stats["bytes"], 2000)
+        # the least recently used entries are gone
+        self.assertIsNone(cache.get("http://a/sparql", "SELECT 0"))
+        self.assertEqual(big, cache.get("http://a/sparql", "SELECT 3"))
+        cache.close()
+
+    def testJsonEntries(self):
+        """
+        results must be stored as JSON - dates survive, pickled entries
+        are never loaded and the cache file is closed when done
+        """
+        lod = [
+            {
+                "date": datetime.date(2026, 10, 18),
+                "datetime": datetime.datetime(2026, 10, 18, 12, 30),
+                "value": 1.5,
+                "none": None,
+            }
+        ]
+        with SparqlResultCache(db_path=self.dbPath) as cache:
+            cache.put("http://a/sparql", "SELECT 1", lod)
+            self.assertEqual(lod, cache.get("http://a/sparql", "SELECT 1"))
+            # values that are not JSON serializable are not cached
+            cache.put("http://a/sparql", "SELECT 2", [{"value": object()}])
+            self.assertIsNone(cache.get("http://a/sparql", "SELECT 2"))
+            # an entry that would execute code when unpickled
+            key = cache.get_key("http://a/sparql", "SELECT 3")
+            blob = pickle.dumps(PickleBomb())
+            cache.connection.execute(
+                "INSERT INTO sparql_cache VALUES (?,?,?,?,?,0,?,?)",
+                (key, "http://a/sparql", "SELECT 3", 0, 0, len(blob), blob),
+            )
+            cache.ttl = float("inf")
+            self.assertIsNone(cache.get("http://a/sparql", "SELECT 3"))
+            self.assertFalse(PickleBomb.exploded)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            cache.get_stats()
+        # replacing the cache of a SPARQL instance closes the previous one
+        sparql = SPARQL("http://a/sparql")
+        first = sparql.enableCache(dbPath=self.dbPath)
+        sparql.enableCache(dbPath=self.dbPath)
+        with self.assertRaises(sqlite3.ProgrammingError):
+            first.get_stats()
+        sparql.disableCache()
+        self.assertIsNone(sparql.cache)
+
+    def testSparqlQueryCache(self):
+        """
+        repeated queries must be answered from the cache - also after a restart
+        """
+        SparqlStandIn.clients.clear()
+        server = HTTPServer(("localhost", 0), SparqlStandIn)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = f"http://localhost:{server.server_address[1]}/sparql"
+            for _run in range(2):
+                sparql = SPARQL(url)
+                cache = sparql.enableCache(dbPath=self.dbPath)
+                for _i in range(3):
+                    lod = sparql.queryAsListOfDicts("SELECT ?answer WHERE {}")
+                    self.assertEqual([{"answer": 42}], lod)
+                cache.close()
+        finally:
+            # close the keep-alive connection to let the server shut down
+            HttpTransport.get_instance(url).close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(1, len(SparqlStandIn.clients))
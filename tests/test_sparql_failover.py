@@ -0,0 +1,140 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+from lodstorage.http_transport import HttpTransport
+from lodstorage.query import Endpoint
+from lodstorage.sparql_failover import EndpointStats, HedgedSPARQL
+from tests.basetest import Basetest
+from tests.test_http_transport import SparqlStandIn
+
+
+class SlowStandIn(SparqlStandIn):
+    """
+    stand in answering after a delay
+    """
+
+    delay = 0.6
+
+    def answer(self):
+        time.sleep(SlowStandIn.delay)
+        SparqlStandIn.answer(self)
+
+    do_GET = answer
+    do_POST = answer
+
+
+class TestSparqlFailover(Basetest):
+    """
+    test hedged requests and failover across mirror endpoints
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.servers = []
+        self.slow_url = self.startServer(SlowStandIn)
+        self.fast_url = self.startServer(SparqlStandIn)
+        self.query = "SELECT ?answer WHERE {}"
+
+    def tearDown(self):
+        for server in self.servers:
+            HttpTransport.get_instance(
+                f"http://localhost:{server.server_address[1]}"
+            ).close()
+            server.shutdown()
+            server.server_close()
+        Basetest.tearDown(self)
+
+    def startServer(self, handler) -> str:
+        server = ThreadingHTTPServer(("localhost", 0), handler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.servers.append(server)
+        url = f"http://localhost:{server.server_address[1]}/sparql"
+        return url
+
+    def getEndpoint(self, name: str, url: str) -> Endpoint:
+        endpoint = Endpoint(name=name, endpoint=url, calls_per_minute=6000)
+        return endpoint
+
+    def testEndpointStats(self):
+        """
+        the percentiles need min_samples latencies
+        """
+        stats = EndpointStats("test", window=20, min_samples=5)
+        for latency in [0.1, 0.2, 0.3, 0.4]:
+            stats.record_success(latency)
+        self.assertIsNone(stats.percentile(95))
+        stats.record_success(1.0)
+        stats.record_error()
+        self.assertEqual(1.0, stats.percentile(95))
+        self.assertEqual(0.3, stats.percentile(50))
+        self.assertAlmostEqual(1 / 6, stats.error_rate)
+        self.assertFalse(stats.is_cooling_down(max_errors=2, cooldown=60))
+        stats.record_error()
+        self.assertTrue(stats.is_cooling_down(max_errors=2, cooldown=60))
+
+    def testHedge(self):
+        """
+        a slow primary must be hedged by the mirror
+        """
+        hedged = HedgedSPARQL(
+            [
+                self.getEndpoint("primary", self.slow_url),
+                self.getEndpoint("mirror", self.fast_url),
+            ],
+            hedge_delay=0.05,
+        )
+        start = time.monotonic()
+        lod = hedged.query_as_lod(self.query)
+        elapsed = time.monotonic() - start
+        self.assertEqual([{"answer": 42}], lod)
+        self.assertLess(elapsed, SlowStandIn.delay)
+        stats = {stat["name"]: stat for stat in hedged.get_stats()}
+        if self.debug:
+            print(stats)
+        self.assertEqual(1, stats["mirror"]["hedges"])
+        self.assertEqual(1, stats["mirror"]["wins"])
+        self.assertEqual(0, stats["primary"]["wins"])
+        hedged.close()
+
+    def testFailover(self):
+        """
+        a failing primary must fail over and be ranked last after max_errors
+        """
+        missing_url = self.fast_url.replace("/sparql", "/missing")
+        endpoints = {
+            "primary": self.getEndpoint("primary", missing_url),
+            "mirror": self.getEndpoint("mirror", self.fast_url),
+        }
+        # unknown mirrors are skipped
+        endpoints["primary"].mirrors = ["mirror", "unknown"]
+        hedged = HedgedSPARQL.from_endpoints(
+            endpoints, "primary", max_errors=2, max_error_rate=1.0
+        )
+        self.assertEqual(["primary", "mirror"], hedged.rank())
+        for _i in range(2):
+            lod = hedged.query_as_lod(self.query)
+            self.assertEqual([{"answer": 42}], lod)
+        # cooling down after max_errors consecutive errors
+        self.assertEqual(["mirror", "primary"], hedged.rank())
+        hedged.cooldown = 0
+        self.assertEqual(["primary", "mirror"], hedged.rank())
+        # ranked last by the error rate
+        hedged.max_error_rate = 0.5
+        self.assertEqual(["mirror", "primary"], hedged.rank())
+        stats = {stat["name"]: stat for stat in hedged.get_stats()}
+        self.assertEqual(2, stats["primary"]["errors"])
+        self.assertEqual(2, stats["mirror"]["wins"])
+        hedged.close()
+        # all endpoints failing raise the last error
+        hedged = HedgedSPARQL([endpoints["primary"]])
+        with self.assertRaises(Exception):
+            hedged.query_as_lod(self.query)
+        hedged.close()
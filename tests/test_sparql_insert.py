@@ -0,0 +1,268 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import datetime
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from unittest.mock import MagicMock
+
+import rdflib
+
+from lodstorage.http_transport import HttpTransport
+from lodstorage.sample2 import Sample
+from lodstorage.sparql import SPARQL
+from tests.basetest import Basetest
+
+
+class TestSparqlInsert(Basetest):
+    """
+    test the INSERT DATA serialization of lists of dicts
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.sparql = SPARQL("https://example.org/sparql", typedLiterals=True)
+        # no network access - capture the insert commands
+        self.sparql.insert = MagicMock(return_value=("ok", None))
+
+    def testControlEscape(self):
+        """
+        control characters and double quotes must be escaped
+        """
+        escaped = SPARQL.controlEscape('say "hi"\n\tnow\x01')
+        self.assertEqual('say \\"hi\\"\\n\\tnow\\x01', escaped)
+
+    def testInsertDataGen(self):
+        """
+        the payload must be generated as one part per record
+        """
+        lod = [
+            {
+                "name": "Elizabeth II",
+                "born": datetime.date(1926, 4, 21),
+                "age": 96,
+                "height": 1.63,
+                "alive": False,
+                "quote": 'a "line"\nbreak',
+            },
+            {"name": None},
+            {"nickname": "Lilibet"},
+        ]
+        errors = []
+        parts = list(
+            self.sparql.insertDataGen(lod, "Person", "name", "PREFIX ex: <ex:>", errors)
+        )
+        # header, one part per valid record and footer
+        self.assertEqual(3, len(parts))
+        self.assertEqual(2, len(errors))
+        expected = """  Person__ElizabethII rdf:type "Person".
+  Person__ElizabethII Person_name "Elizabeth II".
+  Person__ElizabethII Person_born "1926-04-21"^^<http://www.w3.org/2001/XMLSchema#date>.
+  Person__ElizabethII Person_age "96"^^<http://www.w3.org/2001/XMLSchema#integer>.
+  Person__ElizabethII Person_height "1.63"^^<http://www.w3.org/2001/XMLSchema#decimal>.
+  Person__ElizabethII Person_alive False.
+  Person__ElizabethII Person_quote "a \\"line\\"\\nbreak".
+"""
+        self.assertEqual(expected, parts[1])
+
+    def testInsertListOfDictsBatches(self):
+        """
+        the batches must be sent as single INSERT DATA commands
+        """
+        lod = Sample.getRoyals()
+        errors = self.sparql.insertListOfDicts(
+            lod,
+            "Royal",
+            "name",
+            "PREFIX Royal: <http://example.bitplan.com/Royal#>",
+            batchSize=2,
+        )
+        # the royals sample has None values e.g. for the date of death
+        for error in errors:
+            self.assertIn("NoneType", error)
+        self.assertEqual((len(lod) + 1) // 2, self.sparql.insert.call_count)
+        insertCommand = self.sparql.insert.call_args_list[0].args[0]
+        if self.debug:
+            print(insertCommand)
+        self.assertTrue(insertCommand.startswith("PREFIX rdf:"))
+        self.assertIn(
+            "INSERT DATA {\n  Royal__ElizabethAlexandraMaryWindsor", insertCommand
+        )
+        self.assertTrue(insertCommand.endswith("\n}"))
+
+    def testInsertParallel(self):
+        """
+        batches must be inserted concurrently via per thread SPARQLWrappers
+        sharing one rate limit budget and failed batches retried
+        if the failure is retryable
+        """
+        lod = Sample.getSample(100)
+        # a record that can not be serialized
+        del lod[45]["pkey"]
+        attempts = {}
+        lock = threading.Lock()
+
+        class UpdateHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers["Content-Length"])
+                body = self.rfile.read(length).decode("utf-8")
+                # the batch starting with index10 fails on the first attempt
+                # the batch starting with index20 always fails
+                # the batch starting with index30 is rejected as bad request
+                key = re.search(r"Sample__index\d+", body).group(0)
+                with lock:
+                    attempts[key] = attempts.get(key, 0) + 1
+                    count = attempts[key]
+                if key == "Sample__index20" or (
+                    key == "Sample__index10" and count == 1
+                ):
+                    status = 500
+                elif key == "Sample__index30":
+                    status = 400
+                else:
+                    status = 200
+                self.send_response(status)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(("localhost", 0), UpdateHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://localhost:{server.server_address[1]}/sparql"
+        sparql = SPARQL(url, calls_per_minute=60000)
+        wrappers = {}
+        getThreadSPARQL = sparql.getThreadSPARQL
+
+        def recordThreadSPARQL():
+            threadSparql = getThreadSPARQL()
+            with lock:
+                wrappers.setdefault(threading.current_thread(), []).append(threadSparql)
+            return threadSparql
+
+        sparql.getThreadSPARQL = recordThreadSPARQL
+        try:
+            results = sparql.insertListOfDictsParallel(
+                lod, "Sample", "pkey", "", batchSize=10, maxWorkers=4, backoff=0.01
+            )
+            requests = sum(attempts.values())
+            calls = sparql.rate_limiter.get_stats()["calls"]
+            # resume the failed batches only
+            failed = [r for r in results if not r.ok]
+            attempts.clear()
+            resumed = sparql.insertListOfDictsParallel(
+                lod,
+                "Sample",
+                "pkey",
+                "",
+                batchSize=10,
+                maxRetries=0,
+                batchIndices=[r.batchIndex for r in failed],
+            )
+        finally:
+            HttpTransport.get_instance(url).close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual(10, len(results))
+        self.assertEqual(list(range(0, 100, 10)), [r.batchIndex for r in results])
+        self.assertEqual([20, 30], [r.batchIndex for r in failed])
+        self.assertEqual(4, failed[0].attempts)
+        # a bad request is not retried
+        self.assertEqual(1, failed[1].attempts)
+        self.assertEqual(2, results[1].attempts)
+        self.assertTrue(results[1].ok)
+        self.assertEqual(10, results[0].rows)
+        self.assertEqual(9, results[4].rows)
+        self.assertEqual(1, len(results[4].errors))
+        self.assertGreater(results[0].bytes, 0)
+        # 7 batches succeeding at once, one after a retry, one failing 4 times
+        # and one failing once
+        self.assertEqual(14, requests)
+        # all requests of all threads went through the shared rate limiter
+        self.assertEqual(requests, calls)
+        # one SPARQLWrapper copy per worker thread - not the shared wrapper
+        thread_wrappers = []
+        for thread_sparqls in wrappers.values():
+            for thread_sparql in thread_sparqls:
+                self.assertIs(thread_sparqls[0], thread_sparql)
+            thread_wrappers.append(thread_sparqls[0])
+        self.assertEqual(len(wrappers), len(set(map(id, thread_wrappers))))
+        for thread_sparql in thread_wrappers:
+            self.assertIsNot(sparql.sparql, thread_sparql)
+        self.assertEqual(2, len(resumed))
+        self.assertEqual({"Sample__index20": 1, "Sample__index30": 1}, attempts)
+
+    def testUploadGraphStore(self):
+        """
+        records must be uploaded as N-Triples chunks via the Graph Store Protocol
+        """
+        requests_received = []
+
+        class GraphStoreHandler(BaseHTTPRequestHandler):
+            def handle_request(self):
+                length = int(self.headers["Content-Length"])
+                body = self.rfile.read(length).decode("utf-8")
+                requests_received.append(
+                    (self.command, self.path, self.headers["Content-Type"], body)
+                )
+                self.send_response(204)
+                self.end_headers()
+
+            do_POST = handle_request
+            do_PUT = handle_request
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("localhost", 0), GraphStoreHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            port = server.server_address[1]
+            sparql = SPARQL(f"http://localhost:{port}/ds/query")
+            self.assertEqual(
+                f"http://localhost:{port}/ds/data", sparql.getGraphStoreUrl()
+            )
+            lod = Sample.getRoyals()
+            prefixes = "PREFIX royal: <http://example.bitplan.com/royal#>"
+            results = sparql.uploadListOfDicts(
+                lod,
+                "royal:Royal",
+                "name",
+                prefixes,
+                graph="http://example.bitplan.com/royals",
+                method="PUT",
+                batchSize=2,
+            )
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertEqual((len(lod) + 1) // 2, len(results))
+        for result in results:
+            self.assertTrue(result.ok, result.error)
+        self.assertEqual(
+            ["PUT"] + ["POST"] * (len(results) - 1), [r[0] for r in requests_received]
+        )
+        method, path, content_type, body = requests_received[0]
+        self.assertIn("graph=http", path)
+        self.assertTrue(content_type.startswith("application/n-triples"))
+        self.assertEqual(results[0].bytes, len(body.encode("utf-8")))
+        if self.debug:
+            print(body)
+        # the payload must be valid N-Triples
+        graph = rdflib.Graph()
+        for _method, _path, _content_type, body in requests_received:
+            graph.parse(data=body, format="nt")
+        royal = rdflib.URIRef(
+            "http://example.bitplan.com/royal#Royal__ElizabethAlexandraMaryWindsor"
+        )
+        age = rdflib.URIRef("http://example.bitplan.com/royal#Royal_age")
+        self.assertEqual(96, graph.value(royal, age).toPython())
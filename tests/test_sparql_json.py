@@ -0,0 +1,240 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from lodstorage.http_transport import HttpTransport
+from lodstorage.sparql import SPARQL
+from lodstorage.sparql_json import SparqlJsonDecoder, SparqlJsonStreamParser
+from tests.basetest import Basetest
+from tests.test_http_transport import SparqlStandIn
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+class TestSparqlJson(Basetest):
+    """
+    test the fast SPARQL JSON result decoding
+    """
+
+    def getResult(self) -> dict:
+        """
+        get a SPARQL JSON result with all supported datatypes
+        """
+        result = {
+            "head": {
+                "vars": ["item", "label", "born", "died", "age", "height", "ofAge"]
+            },
+            "results": {
+                "bindings": [
+                    {
+                        "item": {
+                            "type": "uri",
+                            "value": "http://www.wikidata.org/entity/Q9682",
+                        },
+                        "label": {
+                            "type": "literal",
+                            "xml:lang": "en",
+                            "value": "Elizabeth II",
+                        },
+                        "born": {
+                            "type": "literal",
+                            "datatype": f"{XSD}dateTime",
+                            "value": "1926-04-21T00:00:00Z",
+                        },
+                        "died": {
+                            "type": "literal",
+                            "datatype": f"{XSD}date",
+                            "value": "2022-09-08",
+                        },
+                        "age": {
+                            "type": "literal",
+                            "datatype": f"{XSD}integer",
+                            "value": "96",
+                        },
+                        "height": {
+                            "type": "literal",
+                            "datatype": f"{XSD}decimal",
+                            "value": "1.63",
+                        },
+                        "ofAge": {
+                            "type": "literal",
+                            "datatype": f"{XSD}boolean",
+                            "value": "true",
+                        },
+                    },
+                    {
+                        "item": {
+                            "type": "uri",
+                            "value": "http://www.wikidata.org/entity/Q43274",
+                        },
+                        "born": {
+                            "type": "literal",
+                            "datatype": f"{XSD}dateTime",
+                            "value": "1948-11-14 20:30:00.0",
+                        },
+                        "height": {
+                            "type": "literal",
+                            "datatype": f"{XSD}double",
+                            "value": "1.78E0",
+                        },
+                    },
+                ]
+            },
+        }
+        return result
+
+    def testDecode(self):
+        """
+        the values must be converted by datatype
+        """
+        decoder = SparqlJsonDecoder()
+        raw = json.dumps(self.getResult()).encode("utf-8")
+        lod = decoder.decode(raw, fixNone=True)
+        if self.debug:
+            print(lod)
+        self.assertEqual(2, len(lod))
+        first, second = lod
+        self.assertEqual("http://www.wikidata.org/entity/Q9682", first["item"])
+        self.assertEqual("Elizabeth II", first["label"])
+        self.assertEqual(datetime.datetime(1926, 4, 21), first["born"])
+        self.assertEqual(datetime.date(2022, 9, 8), first["died"])
+        self.assertEqual(96, first["age"])
+        self.assertEqual(1.63, first["height"])
+        self.assertIs(True, first["ofAge"])
+        self.assertEqual(datetime.datetime(1948, 11, 14, 20, 30), second["born"])
+        # unsupported datatypes keep their lexical value
+        self.assertEqual("1.78E0", second["height"])
+        # fixNone adds the missing columns
+        self.assertIsNone(second["label"])
+        self.assertEqual(set(first.keys()), set(second.keys()))
+
+    def testFastQuery(self):
+        """
+        the fast path must give the same result as the SPARQLWrapper path
+        """
+        server = HTTPServer(("localhost", 0), SparqlStandIn)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://localhost:{server.server_address[1]}/sparql"
+        try:
+            sparql = SPARQL(url)
+            query = "SELECT ?answer WHERE {}"
+            lod = sparql.queryAsListOfDicts(query)
+            fast_lod = sparql.queryAsListOfDicts(query, fast=True)
+        finally:
+            HttpTransport.get_instance(url).close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual([{"answer": 42}], fast_lod)
+        self.assertEqual(lod, fast_lod)
+
+    def testStreamParser(self):
+        """
+        the bindings must be found whatever the chunk boundaries are
+        """
+        result = self.getResult()
+        # braces, quotes and escapes inside of string values
+        result["results"]["bindings"][1]["label"] = {
+            "type": "literal",
+            "value": 'a "quoted" {brace} \\ }',
+        }
+        raw = json.dumps(result, indent=1).encode("utf-8")
+        for chunk_size in [1, 2, 7, 64, len(raw)]:
+            parser = SparqlJsonStreamParser()
+            bindings = []
+            for pos in range(0, len(raw), chunk_size):
+                bindings.extend(parser.feed(raw[pos : pos + chunk_size]))
+            self.assertTrue(parser.done)
+            self.assertEqual(result["head"]["vars"], parser.vars)
+            self.assertEqual(result["results"]["bindings"], bindings, chunk_size)
+
+    def testQueryGen(self):
+        """
+        the streaming query must yield the same rows as queryAsListOfDicts
+        """
+        server = HTTPServer(("localhost", 0), SparqlStandIn)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://localhost:{server.server_address[1]}/sparql"
+        try:
+            sparql = SPARQL(url)
+            query = "SELECT ?answer WHERE {}"
+            lod = list(sparql.query_gen(query))
+            rows = list(sparql.query_gen(query, row_format="tuple"))
+            named_rows = list(sparql.query_gen(query, row_format="namedtuple"))
+        finally:
+            HttpTransport.get_instance(url).close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual([{"answer": 42}], lod)
+        self.assertEqual([(42,)], rows)
+        self.assertEqual(42, named_rows[0].answer)
+
+    def testHeadAfterResults(self):
+        """
+        the head vars may follow the results - rows of the non dict formats
+        must still have all columns even if the first binding misses some
+        """
+        # an OPTIONAL variable that is unbound in the first binding
+        body = (
+            b'{"results": {"bindings": ['
+            b'{"item": {"type": "literal", "value": "a"}},'
+            b'{"item": {"type": "literal", "value": "b"}, "label": {"type": "literal", "value": "B"}}'
+            b']}, "head": {"vars": ["item", "label"]}}'
+        )
+
+        class HeadLastHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            head = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                self.rfile.read(length)
+                content = (
+                    body if HeadLastHandler.head else body[: body.index(b"]}")] + b"]}}"
+                )
+                self.send_response(200)
+                self.send_header("Content-Type", "application/sparql-results+json")
+                self.send_header("Content-Length", str(len(content)))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, *args):
+                pass
+
+        for chunk_size in [1, 16, len(body)]:
+            parser = SparqlJsonStreamParser()
+            for pos in range(0, len(body), chunk_size):
+                list(parser.feed(body[pos : pos + chunk_size]))
+            self.assertEqual(["item", "label"], parser.vars, chunk_size)
+        server = HTTPServer(("localhost", 0), HeadLastHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://localhost:{server.server_address[1]}/sparql"
+        try:
+            sparql = SPARQL(url)
+            query = (
+                "SELECT ?item ?label WHERE { ?item ?p ?o OPTIONAL { ?item ?q ?label } }"
+            )
+            lod = list(sparql.query_gen(query))
+            rows = list(sparql.query_gen(query, row_format="tuple"))
+            HeadLastHandler.head = False
+            no_head_error = None
+            try:
+                list(sparql.query_gen(query, row_format="tuple"))
+            except ValueError as ex:
+                no_head_error = str(ex)
+        finally:
+            HttpTransport.get_instance(url).close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual([{"item": "a"}, {"item": "b", "label": "B"}], lod)
+        self.assertEqual([("a", None), ("b", "B")], rows)
+        self.assertIn("without head vars", no_head_error)
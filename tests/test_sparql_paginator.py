@@ -0,0 +1,207 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import json
+import os
+import re
+import tempfile
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from lodstorage.sparql import SPARQL
+from lodstorage.sparql_paginator import SparqlPaginator
+from tests.basetest import Basetest
+
+
+class PagingStandIn(BaseHTTPRequestHandler):
+    """
+    SPARQL endpoint stand in for a list of items honoring
+    LIMIT, OFFSET and a STR(?item) > "..." keyset FILTER
+    """
+
+    protocol_version = "HTTP/1.1"
+    items = [f"http://example.org/item{i:03d}" for i in range(95)]
+    # the datatype of literal items - None for IRIs
+    datatype = None
+    queries = []
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = urllib.parse.parse_qs(self.rfile.read(length).decode("utf-8"))
+        query = form["query"][0]
+        PagingStandIn.queries.append(query)
+        items = PagingStandIn.items
+        filter_match = re.search(r'FILTER\(STR\(\?item\) > "([^"]*)"\)', query)
+        if filter_match:
+            items = [item for item in items if item > filter_match.group(1)]
+        offset_match = re.search(r"OFFSET (\d+)", query)
+        if offset_match:
+            items = items[int(offset_match.group(1)) :]
+        limit_match = re.search(r"LIMIT (\d+)", query)
+        if limit_match:
+            items = items[: int(limit_match.group(1))]
+        result = {
+            "head": {"vars": ["item"]},
+            "results": {
+                "bindings": [{"item": PagingStandIn.get_term(item)} for item in items]
+            },
+        }
+        body = json.dumps(result).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/sparql-results+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    @classmethod
+    def get_term(cls, item: str) -> dict:
+        if cls.datatype is None:
+            term = {"type": "uri", "value": item}
+        else:
+            term = {"type": "literal", "datatype": cls.datatype, "value": item}
+        return term
+
+    def log_message(self, *args):
+        pass
+
+
+class TestSparqlPaginator(Basetest):
+    """
+    test the paged execution of SPARQL queries
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        PagingStandIn.queries.clear()
+        self.server = ThreadingHTTPServer(("localhost", 0), PagingStandIn)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        url = f"http://localhost:{self.server.server_address[1]}/sparql"
+        self.sparql = SPARQL(url, calls_per_minute=60000)
+        self.query = "SELECT ?item WHERE { ?item a <http://example.org/Item> }"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        Basetest.tearDown(self)
+
+    def getItems(self, lod) -> list:
+        return [record["item"] for record in lod]
+
+    def testRewrite(self):
+        """
+        the query must be split and ordered by its projection
+        """
+        query = """PREFIX wd: <http://www.wikidata.org/entity/>
+SELECT DISTINCT ?item (COUNT(?x) AS ?count) (SAMPLE(?l) as ?label)
+WHERE { ?item wdt:P31 wd:Q5 } GROUP BY ?item
+limit 100 OFFSET 5"""
+        base, limit, offset = SparqlPaginator.split(query)
+        self.assertEqual(100, limit)
+        self.assertEqual(5, offset)
+        self.assertTrue(base.endswith("GROUP BY ?item"))
+        self.assertEqual(
+            ["item", "count", "label"], SparqlPaginator.get_projection(query)
+        )
+        self.assertEqual(
+            ["s", "o"],
+            SparqlPaginator.get_projection(
+                "SELECT * WHERE { ?s <http://example.org/p#?x> ?o }"
+            ),
+        )
+        paginator = SparqlPaginator(self.sparql)
+        ordered, _limit, _offset = paginator.get_base_query(query)
+        self.assertTrue(ordered.endswith("ORDER BY ?item ?count ?label"))
+        # an existing ORDER BY is kept
+        ordered_query = f"{self.query} ORDER BY DESC(?item)"
+        self.assertEqual(ordered_query, paginator.get_base_query(ordered_query)[0])
+        keyset_paginator = SparqlPaginator(self.sparql, keyset="?item")
+        with self.assertRaises(ValueError):
+            keyset_paginator.get_base_query(ordered_query)
+        keyset_query = keyset_paginator.get_keyset_query(self.query, 'a"b')
+        self.assertIn('FILTER(STR(?item) > "a\\"b")', keyset_query)
+        self.assertTrue(keyset_query.endswith("}\nORDER BY STR(?item)"))
+
+    def testOffsetPaging(self):
+        """
+        concurrently fetched pages must be yielded in order
+        """
+        paginator = SparqlPaginator(self.sparql, page_size=10, max_workers=3)
+        lod = list(paginator.query_gen(self.query))
+        self.assertEqual(PagingStandIn.items, self.getItems(lod))
+        self.assertGreaterEqual(paginator.pages, 10)
+        for query in PagingStandIn.queries:
+            self.assertIn("ORDER BY ?item", query)
+        # an explicit LIMIT/OFFSET restricts the paged range
+        paginator = SparqlPaginator(self.sparql, page_size=10, max_workers=3)
+        lod = list(paginator.query_gen(f"{self.query} LIMIT 25 OFFSET 5"))
+        self.assertEqual(PagingStandIn.items[5:30], self.getItems(lod))
+        self.assertEqual(3, paginator.pages)
+        # paged mode of queryAsListOfDicts
+        lod = self.sparql.queryAsListOfDicts(self.query, pageSize=20)
+        self.assertEqual(PagingStandIn.items, self.getItems(lod))
+
+    def testKeysetPaging(self):
+        """
+        keyset pages must filter on the last key
+        """
+        paginator = SparqlPaginator(self.sparql, page_size=10, keyset="item")
+        lod = list(paginator.query_gen(self.query))
+        self.assertEqual(PagingStandIn.items, self.getItems(lod))
+        self.assertEqual(10, paginator.pages)
+        self.assertNotIn("OFFSET", PagingStandIn.queries[-1])
+
+    def testKeysetDatatype(self):
+        """
+        keyset paging must refuse keys whose decoded value differs from
+        the STR() of the endpoint instead of repeating rows
+        """
+        items = PagingStandIn.items
+        try:
+            PagingStandIn.items = [
+                f"2022-09-{day:02d}T00:00:00Z" for day in range(1, 29)
+            ]
+            PagingStandIn.datatype = "http://www.w3.org/2001/XMLSchema#dateTime"
+            paginator = SparqlPaginator(self.sparql, page_size=10, keyset="item")
+            with self.assertRaises(ValueError) as context:
+                list(paginator.query_gen(self.query))
+            self.assertIn("IRIs or strings", str(context.exception))
+            self.assertEqual(1, len(PagingStandIn.queries))
+            # string keys of the same values work
+            PagingStandIn.datatype = "http://www.w3.org/2001/XMLSchema#string"
+            PagingStandIn.queries.clear()
+            paginator = SparqlPaginator(self.sparql, page_size=10, keyset="item")
+            lod = list(paginator.query_gen(self.query))
+            self.assertEqual(PagingStandIn.items, self.getItems(lod))
+            self.assertEqual(3, len(PagingStandIn.queries))
+        finally:
+            PagingStandIn.items = items
+            PagingStandIn.datatype = None
+
+    def testResume(self):
+        """
+        an interrupted paged query must continue after the last completed page
+        """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            state_path = os.path.join(tmp_dir, "paging.json")
+            paginator = SparqlPaginator(
+                self.sparql, page_size=10, max_workers=2, state_path=state_path
+            )
+            rows = paginator.query_gen(self.query)
+            first_rows = [next(rows) for _i in range(25)]
+            rows.close()
+            with open(state_path) as state_file:
+                state = json.load(state_file)
+            # the third page is in progress - two pages are complete
+            self.assertEqual(20, state["rows"])
+            paginator = SparqlPaginator(
+                self.sparql, page_size=10, max_workers=2, state_path=state_path
+            )
+            rest = list(paginator.query_gen(self.query))
+            self.assertEqual(PagingStandIn.items[20:], self.getItems(rest))
+            self.assertEqual(PagingStandIn.items[:25], self.getItems(first_rows))
+            self.assertFalse(os.path.exists(state_path))
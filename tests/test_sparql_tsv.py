@@ -0,0 +1,107 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import datetime
+import threading
+from http.server import HTTPServer
+
+from lodstorage.http_transport import HttpTransport
+from lodstorage.params import Param
+from lodstorage.sparql import SPARQL
+from lodstorage.sparql_tsv import SparqlTsvDecoder
+from tests.basetest import Basetest
+from tests.test_http_transport import SparqlStandIn
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+
+class TestSparqlTsv(Basetest):
+    """
+    test the TSV and CSV SPARQL result decoding
+    """
+
+    def testDecodeTsv(self):
+        """
+        TSV terms must be converted by their datatype
+        """
+        tsv = (
+            "?item\t?label\t?born\t?age\t?height\t?ofAge\t?note\n"
+            f'<http://www.wikidata.org/entity/Q9682>\t"Elizabeth II"@en\t"1926-04-21T00:00:00Z"^^<{XSD}dateTime>\t96\t1.63\ttrue\t"tab\\there \\"quoted\\""\n'
+            f'_:b0\t\t"1948-11-14"^^xsd:date\t"73"^^<{XSD}integer>\t1.78E0\tfalse\t\n'
+        )
+        decoder = SparqlTsvDecoder()
+        lod = decoder.decode(tsv.encode("utf-8"), fixNone=True)
+        if self.debug:
+            print(lod)
+        self.assertEqual(2, len(lod))
+        first, second = lod
+        self.assertEqual("http://www.wikidata.org/entity/Q9682", first["item"])
+        self.assertEqual("Elizabeth II", first["label"])
+        self.assertEqual(datetime.datetime(1926, 4, 21), first["born"])
+        self.assertEqual(96, first["age"])
+        self.assertEqual(1.63, first["height"])
+        self.assertIs(True, first["ofAge"])
+        self.assertEqual('tab\there "quoted"', first["note"])
+        self.assertEqual("_:b0", second["item"])
+        self.assertIsNone(second["label"])
+        self.assertEqual(datetime.date(1948, 11, 14), second["born"])
+        self.assertEqual(73, second["age"])
+        # doubles keep their lexical value as in the JSON decoding
+        self.assertEqual("1.78E0", second["height"])
+        self.assertIs(False, second["ofAge"])
+
+    def testDecodeCsv(self):
+        """
+        CSV values must be typed by the output parameters
+        """
+        csv_text = 'name,age,born,remark\r\n"Smith, John",42,2001-02-03,"multi\nline"\r\nDoe,,2002-03-04,\r\n'
+        output = [
+            Param(name="age", type="int"),
+            Param(name="born", type="date"),
+            Param(name="remark", type="WikidataItem"),
+        ]
+        decoder = SparqlTsvDecoder()
+        lod = decoder.decode(csv_text.encode("utf-8"), "csv", output=output)
+        self.assertEqual(
+            [
+                {
+                    "name": "Smith, John",
+                    "age": 42,
+                    "born": datetime.date(2001, 2, 3),
+                    "remark": "multi\nline",
+                },
+                {"name": "Doe", "born": datetime.date(2002, 3, 4)},
+            ],
+            lod,
+        )
+        with self.assertRaises(ValueError):
+            decoder.decode(b"", "xml")
+
+    def testQueryResultFormats(self):
+        """
+        all result formats must give the same list of dicts
+        """
+        server = HTTPServer(("localhost", 0), SparqlStandIn)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        url = f"http://localhost:{server.server_address[1]}/sparql"
+        try:
+            sparql = SPARQL(url)
+            query = "SELECT ?answer WHERE {}"
+            json_lod = sparql.queryAsListOfDicts(query, fast=True)
+            tsv_lod = sparql.queryAsListOfDicts(query, resultFormat="tsv")
+            csv_lod = sparql.queryAsListOfDicts(
+                query,
+                resultFormat="csv",
+                output=[Param(name="answer", type="int")],
+            )
+        finally:
+            HttpTransport.get_instance(url).close()
+            server.shutdown()
+            server.server_close()
+        self.assertEqual([{"answer": 42}], json_lod)
+        self.assertEqual(json_lod, tsv_lod)
+        self.assertEqual(json_lod, csv_lod)
@@ -121,3 +121,34 @@ class TestSQLBackend(Basetest):
             r["name"] for r in duck.query_gen("SELECT name FROM person ORDER BY name")
         ]
         self.assertEqual(["Alice", "Bob"], names)
+
+    def testRowFormats(self):
+        """query() and query_gen() must support all row formats."""
+        sql = "SELECT name, age FROM person ORDER BY age"
+        self.assertEqual(
+            [("Bob", 25), ("Alice", 30)], self.db.query(sql, row_format="tuple")
+        )
+        rows = self.db.query(sql, row_format="namedtuple")
+        self.assertEqual("Bob", rows[0].name)
+        self.assertEqual(("Alice", 30), tuple(rows[1]))
+        rows = list(self.db.query_gen(sql, row_format="slots", fetch_size=1))
+        self.assertEqual(25, rows[0].age)
+        self.assertFalse(hasattr(rows[0], "__dict__"))
+        self.assertEqual({"name": "Alice", "age": 30}, rows[1]._asdict())
+        # the row classes are cached per column list
+        self.assertIs(type(rows[0]), type(self.db.query(sql, row_format="slots")[0]))
+        with self.assertRaises(ValueError):
+            self.db.query(sql, row_format="xml")
+
+    @unittest.skipUnless(duckdb_available, "duckdb not installed")
+    def testDuckDBRowFormats(self):
+        """DuckDBQuery must support all row formats."""
+        duck = DuckDBQuery(endpoint=self.duckdb_endpoint())
+        duck.con.execute("CREATE TABLE person (name TEXT, age INTEGER)")
+        duck.con.execute("INSERT INTO person VALUES ('Alice', 30), ('Bob', 25)")
+        sql = "SELECT name, age FROM person ORDER BY age"
+        self.assertEqual(
+            [("Bob", 25), ("Alice", 30)], duck.query(sql, row_format="tuple")
+        )
+        rows = list(duck.query_gen(sql, row_format="namedtuple", fetch_size=1))
+        self.assertEqual(["Bob", "Alice"], [row.name for row in rows])
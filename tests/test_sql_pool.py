@@ -0,0 +1,179 @@
+"""
+Created on 2026-10-18
+
+@author: wf
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from lodstorage.sql_backend import SQLBackend, get_sql_backend
+from lodstorage.sql_pool import PooledSQLDB
+from tests.basetest import Basetest
+
+
+class TestPooledSQLDB(Basetest):
+    """
+    test sharing a SQLite database between threads
+    """
+
+    def setUp(self, debug=False, profile=True):
+        Basetest.setUp(self, debug=debug, profile=profile)
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.dbFile = os.path.join(self.tmpdir.name, "pool.db")
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        Basetest.tearDown(self)
+
+    def testPooledBackend(self):
+        """
+        get_sql_backend must hand out a pooled SQLBackend in WAL mode
+        """
+        pool = get_sql_backend(self.dbFile, pooled=True)
+        self.assertIsInstance(pool, PooledSQLDB)
+        self.assertIsInstance(pool, SQLBackend)
+        journal_mode = pool.query("PRAGMA journal_mode")[0]["journal_mode"]
+        self.assertEqual("wal", journal_mode)
+        pool.close()
+        with self.assertRaises(Exception):
+            PooledSQLDB(PooledSQLDB.RAM)
+
+    def testConcurrentReadersAndWriter(self):
+        """
+        test concurrent readers with a single writer thread
+        """
+        pool = PooledSQLDB(self.dbFile, debug=self.debug)
+        records = [{"pkey": f"key{i}", "cindex": i} for i in range(100)]
+        entityInfo = pool.createTable(records[:1], "sample", "pkey")
+        pool.store(records, entityInfo, executeMany=True)
+        errors = []
+        counts = []
+
+        def read():
+            try:
+                for _i in range(20):
+                    rows = pool.query("SELECT count(*) AS count FROM sample")
+                    counts.append(rows[0]["count"])
+            except Exception as ex:
+                errors.append(ex)
+
+        def write():
+            try:
+                for i in range(100, 200):
+                    pool.store(
+                        [{"pkey": f"key{i}", "cindex": i}],
+                        entityInfo,
+                        executeMany=True,
+                    )
+            except Exception as ex:
+                errors.append(ex)
+
+        threads = [threading.Thread(target=read) for _i in range(8)]
+        threads.append(threading.Thread(target=write))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual([], errors)
+        self.assertEqual(160, len(counts))
+        for count in counts:
+            self.assertTrue(100 <= count <= 200)
+        rows = pool.query("SELECT count(*) AS count FROM sample")
+        self.assertEqual(200, rows[0]["count"])
+        # the connections of the ended threads have been closed
+        self.assertEqual(1, len(pool.connections))
+        pool.close()
+        self.assertEqual(0, len(pool.connections))
+
+    def testThreadPoolConnections(self):
+        """
+        test that recycled worker threads reuse their connection and
+        that the connections are closed when the workers end
+        """
+        pool = PooledSQLDB(self.dbFile, debug=self.debug)
+        pool.execute("CREATE TABLE sample (cindex INTEGER)")
+        with pool.writer() as connection:
+            connection.executemany(
+                "INSERT INTO sample VALUES (?)", [(i,) for i in range(10)]
+            )
+        connections = set()
+
+        def read(i: int):
+            connections.add(pool.c)
+            rows = pool.query("SELECT cindex FROM sample WHERE cindex=?", (i % 10,))
+            return rows[0]["cindex"]
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(executor.map(read, range(50)))
+            self.assertLessEqual(len(pool.connections), 3)
+        self.assertEqual([i % 10 for i in range(50)], results)
+        self.assertLessEqual(len(connections), 2)
+        # only the connection of the main thread is left
+        self.assertEqual(1, len(pool.connections))
+        for connection in connections:
+            with self.assertRaises(Exception):
+                connection.execute("SELECT 1")
+        pool.close()
+
+    def testQueryCacheAcrossThreads(self):
+        """
+        test that a write in one thread invalidates the results cached
+        by the connections of the other threads
+        """
+        pool = PooledSQLDB(self.dbFile, debug=self.debug)
+        queryCache = pool.enableQueryCache()
+        pool.execute("CREATE TABLE t (cindex INTEGER)")
+        with pool.writer() as connection:
+            connection.execute("INSERT INTO t VALUES (1)")
+        counts = []
+
+        def read():
+            counts.append(len(pool.query("SELECT cindex FROM t")))
+
+        def write():
+            with pool.writer() as connection:
+                connection.execute("INSERT INTO t VALUES (2)")
+
+        # a long lived reader thread - the first query of a new connection
+        # can not know which writes happened before and invalidates the cache
+        with ThreadPoolExecutor(max_workers=1) as reader:
+            for target in [read, write, read, read]:
+                if target is read:
+                    reader.submit(read).result()
+                else:
+                    thread = threading.Thread(target=target)
+                    thread.start()
+                    thread.join()
+        self.assertEqual([1, 2, 2], counts)
+        stats = queryCache.getStats()
+        self.assertEqual(1, stats["hits"])
+        self.assertEqual(1, stats["invalidations"])
+        pool.close()
+
+    def testQueryCacheUntrackedWrites(self):
+        """
+        test that writes bypassing the writing paths of the pool still
+        invalidate the query cache
+        """
+        pool = PooledSQLDB(self.dbFile, debug=self.debug)
+        pool.enableQueryCache()
+        pool.execute("CREATE TABLE t (cindex INTEGER)")
+        sql = "SELECT cindex FROM t"
+        self.assertEqual(0, len(pool.query(sql)))
+        pool.query("INSERT INTO t VALUES (1)")
+        pool.commit()
+        self.assertEqual(1, len(pool.query(sql)))
+        pool.c.execute("INSERT INTO t VALUES (2)")
+        pool.c.commit()
+        self.assertEqual(2, len(pool.query(sql)))
+        # a write of another process
+        otherProcess = sqlite3.connect(self.dbFile)
+        otherProcess.execute("INSERT INTO t VALUES (3)")
+        otherProcess.commit()
+        otherProcess.close()
+        self.assertEqual(3, len(pool.query(sql)))
+        pool.close()
@@ -6,7 +6,9 @@ Created on 2020-08-24
 
 import logging
 import os
+import sqlite3
 import sys
+import tempfile
 import time
 from datetime import datetime, timezone
 from io import StringIO
@@ -15,6 +17,7 @@ from lodstorage.sample2 import Sample
 from lodstorage.schema import Schema
 from lodstorage.sql import SQLDB, EntityInfo
 from lodstorage.sqlite_api import SQLiteApiFixer
+from lodstorage.storageconfig import StorageConfig
 from lodstorage.uml import UML
 from tests.basetest import Basetest
 
@@ -565,3 +568,281 @@ record  #3={'name': 'John Doe'}"""
         self.assertEqual(aware_dt, result["dt"])
 
         sqlDB.close()
+
+    def testStoreIterable(self):
+        """
+        test storing records from a generator in chunks
+        """
+        limit = 25000
+
+        def sampleGen():
+            for index in range(limit):
+                yield {"pKey": f"index{index}", "cindex": index}
+
+        sqlDB = SQLDB(debug=self.debug)
+        entityInfo = sqlDB.storeIterable(
+            sampleGen(),
+            "sample",
+            primaryKey="pKey",
+            chunkSize=1000,
+            commitSize=5000,
+            profile=self.debug,
+        )
+        self.assertEqual("sample", entityInfo.name)
+        self.assertEqual(["pKey", "cindex"], list(entityInfo.typeMap.keys()))
+        countRecords = sqlDB.query("SELECT count(*) AS count FROM sample")
+        self.assertEqual(limit, countRecords[0]["count"])
+        # the peeked sample record must have been stored, too
+        first = sqlDB.query("SELECT * FROM sample WHERE cindex=0")
+        self.assertEqual([{"pKey": "index0", "cindex": 0}], first)
+        sqlDB.close()
+
+    def testStoreColumns(self):
+        """
+        test storing columnar data without per record dicts
+        """
+        import numpy as np
+
+        sqlDB = SQLDB(debug=self.debug)
+        sample = [{"name": "a", "count": 1, "weight": 0.5, "remark": "x"}]
+        entityInfo = sqlDB.createTable(sample, "measure", "name")
+        self.assertEqual(
+            "INSERT INTO measure (name,count,weight,remark) values (?,?,?,?)",
+            entityInfo.getInsertCmd(positional=True),
+        )
+        limit = 1000
+        columns = {
+            "name": [f"n{i}" for i in range(limit)],
+            "count": np.arange(limit),
+            "weight": np.arange(limit) / 2.0,
+        }
+        # remark is missing and will be stored as NULL
+        sqlDB.storeColumns(columns, entityInfo, chunkSize=128)
+        # tuples in typeMap order
+        sqlDB.storeColumns([("t1", 7, 1.5, "tuple")], entityInfo)
+        rows = sqlDB.query("SELECT * FROM measure WHERE name IN ('n999','t1')")
+        self.assertEqual(
+            [
+                {"name": "n999", "count": 999, "weight": 499.5, "remark": None},
+                {"name": "t1", "count": 7, "weight": 1.5, "remark": "tuple"},
+            ],
+            rows,
+        )
+        try:
+            sqlDB.storeColumns({"name": ["x", "y"], "count": [1]}, entityInfo)
+            self.fail("There should be an exception for columns of different size")
+        except Exception as ex:
+            self.assertTrue("column count has 1 values but 2 are expected" in str(ex))
+        sqlDB.close()
+
+    def testBulkLoad(self):
+        """
+        test the bulk load mode with deferred primary key and index creation
+        """
+        dbFile = "/tmp/bulkLoadTest.db"
+        if os.path.exists(dbFile):
+            os.remove(dbFile)
+        sqlDB = SQLDB(dbFile, debug=self.debug)
+        synchronous = sqlDB.query("PRAGMA synchronous")[0]["synchronous"]
+        listOfRecords = Sample.getSample(5000)
+        with sqlDB.bulk_load(indexes={"sample": ["cindex"]}, profile=self.debug):
+            self.assertEqual(0, sqlDB.query("PRAGMA synchronous")[0]["synchronous"])
+            entityInfo = sqlDB.createTable(listOfRecords[:10], "sample", "pkey")
+            sqlDB.store(listOfRecords, entityInfo, executeMany=True)
+            columns = sqlDB.getTableDict()["sample"]["columns"]
+            self.assertEqual(0, columns["pkey"]["pk"])
+        columns = sqlDB.getTableDict()["sample"]["columns"]
+        self.assertEqual(1, columns["pkey"]["pk"])
+        indexList = sqlDB.query("PRAGMA index_list('sample')")
+        indexNames = [index["name"] for index in indexList]
+        self.assertTrue("idx_sample_cindex" in indexNames)
+        self.assertEqual(
+            synchronous, sqlDB.query("PRAGMA synchronous")[0]["synchronous"]
+        )
+        # the table has been rebuilt in primary key order
+        self.assertEqual(
+            listOfRecords, sqlDB.query("SELECT * FROM sample ORDER BY cindex")
+        )
+        # a failing bulk load is rolled back
+        try:
+            with sqlDB.bulk_load():
+                failInfo = sqlDB.createTable(listOfRecords[:10], "fail", "pkey")
+                sqlDB.store(listOfRecords, failInfo, executeMany=True)
+                raise ValueError("fail on purpose")
+        except ValueError:
+            pass
+        self.assertFalse("fail" in sqlDB.getTableDict())
+        sqlDB.close()
+
+    def testBulkLoadReplace(self):
+        """
+        test that replace=True keeps the last row per key in bulk load mode
+        and that duplicate keys without replace fail the bulk load
+        """
+        sqlDB = SQLDB(debug=self.debug)
+        records = [
+            {"pkey": "a", "value": 1},
+            {"pkey": "b", "value": 2},
+            {"pkey": "a", "value": 3},
+        ]
+        with sqlDB.bulk_load():
+            entityInfo = sqlDB.createTable(records[:1], "dup", "pkey")
+            sqlDB.store(records, entityInfo, executeMany=True, replace=True)
+        self.assertEqual(
+            [{"pkey": "a", "value": 3}, {"pkey": "b", "value": 2}],
+            sqlDB.query("SELECT * FROM dup ORDER BY pkey"),
+        )
+        with self.assertRaises(sqlite3.IntegrityError):
+            with sqlDB.bulk_load():
+                failInfo = sqlDB.createTable(records[:1], "dupfail", "pkey")
+                sqlDB.store(records, failInfo, executeMany=True)
+        self.assertFalse("dupfail" in sqlDB.getTableDict())
+        sqlDB.close()
+
+    def testStreamingCopy(self):
+        """
+        test copying a database by streaming its dump in batched transactions
+        """
+        listOfRecords = Sample.getSample(2500)
+        # a value that would break splitting the dump text at ";\n"
+        listOfRecords[0]["pkey"] = "tricky;\nvalue"
+        sourceDB = SQLDB(debug=self.debug)
+        entityInfo = sourceDB.createTable(listOfRecords[:10], "sample", "pkey")
+        sourceDB.store(listOfRecords, entityInfo, executeMany=True)
+        copyDB = SQLDB()
+        errors = sourceDB.copyTo(copyDB, profile=self.debug, batchSize=100)
+        self.assertEqual([], errors)
+        self.assertEqual(listOfRecords, copyDB.queryAll(entityInfo))
+        self.assertFalse(copyDB.c.in_transaction)
+        sourceDB.close()
+        copyDB.close()
+
+    def testDumpStatementsErrors(self):
+        """
+        test that stopping at maxErrors keeps the earlier batches committed
+        and reports this and that other errors do not leave a transaction open
+        """
+        sqlDB = SQLDB(debug=self.debug)
+        sqlDB.execute("CREATE TABLE t (id INTEGER PRIMARY KEY)")
+        statements = [f"INSERT INTO t VALUES({i});" for i in range(4)]
+        # an IntegrityError and an OperationalError
+        statements += ["INSERT INTO t VALUES(0);", "INSERT INTO nowhere VALUES(1);"]
+        errors = sqlDB.executeDumpStatements(
+            sqlDB.c, statements, "test", batchSize=2, maxErrors=2, profile=False
+        )
+        self.assertEqual(3, len(errors))
+        self.assertTrue("UNIQUE constraint failed" in errors[0])
+        self.assertTrue("4 statements of earlier batches stay committed" in errors[2])
+        self.assertEqual(4, sqlDB.query("SELECT count(*) AS n FROM t")[0]["n"])
+        self.assertFalse(sqlDB.c.in_transaction)
+
+        def failingStatements():
+            yield "INSERT INTO t VALUES(10);"
+            raise ValueError("fail on purpose")
+
+        with self.assertRaises(ValueError):
+            sqlDB.executeDumpStatements(
+                sqlDB.c, failingStatements(), "test", profile=False
+            )
+        self.assertFalse(sqlDB.c.in_transaction)
+        self.assertEqual(4, sqlDB.query("SELECT count(*) AS n FROM t")[0]["n"])
+        sqlDB.close()
+
+    def testSchemaSnapshot(self):
+        """
+        test the single query schema introspection and its invalidation
+        """
+        sqlDB = SQLDB(debug=self.debug)
+        sqlDB.execute("CREATE TABLE a (id INTEGER PRIMARY KEY, name TEXT NOT NULL)")
+        sqlDB.execute("CREATE VIEW v AS SELECT name FROM a")
+        tableList = sqlDB.getTableList()
+        self.assertEqual(["a"], [table["name"] for table in tableList])
+        self.assertEqual(sqlDB.query("PRAGMA table_info('a')"), tableList[0]["columns"])
+        viewList = sqlDB.getTableList(tableType="view")
+        self.assertEqual("name", viewList[0]["columns"][0]["name"])
+        # the cached snapshot is not shared with callers
+        sqlDB.getTableDict()
+        self.assertTrue(isinstance(sqlDB.getTableList()[0]["columns"], list))
+        # a schema change invalidates the snapshot
+        sqlDB.execute("CREATE TABLE b (id INTEGER)")
+        tableDict = sqlDB.getTableDict()
+        self.assertEqual(["a", "b"], list(tableDict.keys()))
+        self.assertEqual(1, tableDict["a"]["columns"]["id"]["pk"])
+        sqlDB.close()
+
+    def testReadOnlyCache(self):
+        """
+        test publishing a cache file and serving it read only and memory mapped
+        """
+        with tempfile.TemporaryDirectory(prefix="cache dir ") as tmpdir:
+            config = StorageConfig(cacheRootDir=tmpdir)
+            cacheFile = f"{config.getCachePath()}/sample.db"
+            backupFile = f"{tmpdir}/backup.db"
+            sqlDB = self.getSampleTableDB(sampleSize=100)
+            sqlDB.backup(backupFile, showProgress=0)
+            cacheDB = SQLDB.restore(
+                backupFile,
+                cacheFile,
+                showProgress=0,
+                readOnly=True,
+                immutable=True,
+                mmapSize=64 * 1024 * 1024,
+            )
+            self.assertTrue(cacheDB.readOnly)
+            mmapSize = cacheDB.query("PRAGMA mmap_size")[0]["mmap_size"]
+            self.assertEqual(64 * 1024 * 1024, mmapSize)
+            rows = cacheDB.query("SELECT count(*) AS count FROM sample")
+            self.assertEqual(100, rows[0]["count"])
+            with self.assertRaises(Exception):
+                cacheDB.execute("DELETE FROM sample")
+            entityInfo = EntityInfo(Sample.getSample(1), "sample2")
+            try:
+                cacheDB.createTable4EntityInfo(entityInfo)
+                self.fail("There should be an exception")
+            except Exception as ex:
+                self.assertTrue("opened read only" in str(ex))
+            readOnlyDB = SQLDB(cacheFile, readOnly=True)
+            self.assertEqual(100, len(readOnlyDB.query("SELECT * FROM sample")))
+            readOnlyDB.close()
+            cacheDB.close()
+
+    def testQueryCache(self):
+        """
+        test the LRU query result cache and its invalidation
+        """
+        sqlDB = self.getSampleTableDB(sampleSize=100)
+        queryCache = sqlDB.enableQueryCache(maxEntries=2, maxRows=150)
+        countQuery = "SELECT count(*) AS count FROM sample"
+        for _i in range(3):
+            rows = sqlDB.query(countQuery)
+            self.assertEqual(100, rows[0]["count"])
+        self.assertEqual(2, queryCache.hits)
+        # callers get copies of the cached rows
+        rows[0]["count"] = -1
+        self.assertEqual(100, sqlDB.query(countQuery)[0]["count"])
+        # writes invalidate the cache
+        sqlDB.execute("INSERT INTO sample (pkey, cindex) VALUES ('extra', 100)")
+        self.assertEqual(101, sqlDB.query(countQuery)[0]["count"])
+        self.assertEqual(1, queryCache.invalidations)
+        # a second connection writing is detected via PRAGMA data_version
+        dbFile = "/tmp/queryCacheTest.db"
+        if os.path.exists(dbFile):
+            os.remove(dbFile)
+        fileDB = SQLDB(dbFile)
+        fileDB.execute("CREATE TABLE t (v INTEGER)")
+        fileDB.enableQueryCache()
+        self.assertEqual([], fileDB.query("SELECT * FROM t"))
+        otherDB = SQLDB(dbFile)
+        otherDB.query("INSERT INTO t VALUES (1)", commit=True)
+        self.assertEqual([{"v": 1}], fileDB.query("SELECT * FROM t"))
+        otherDB.close()
+        fileDB.close()
+        # bounds
+        sqlDB.query("SELECT * FROM sample", row_format="tuple")
+        self.assertLessEqual(queryCache.rowCount, 150)
+        sqlDB.query("SELECT * FROM sample LIMIT 10")
+        sqlDB.query("SELECT * FROM sample LIMIT 20")
+        stats = queryCache.getStats()
+        self.assertEqual(2, stats["entries"])
+        self.assertTrue(stats["evictions"] > 0)
+        sqlDB.close()